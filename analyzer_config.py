@@ -0,0 +1,82 @@
+"""
+Analyzer Configuration
+Builds the SafetyAnalyzer described by the SAFETY_* environment variables
+and turns JSON request fields into its inputs; shared by the web app, the
+RPC server and the queue consumer so all score alike
+"""
+
+import math
+import os
+import time
+from typing import Optional
+
+from safety_analyzer import CrowdDensity, SafetyAnalyzer
+
+# Optional local POI file (CSV or JSON) of safe places suggested on High risk
+POI_FILE = os.environ.get('SAFETY_POI_FILE')
+# Optional hour-of-week crime grid file, used when requests send a weekday
+CRIME_GRID_FILE = os.environ.get('SAFETY_CRIME_GRID')
+# Optional GeoJSON timezone boundaries for deriving local time server-side
+TZ_BOUNDARIES_FILE = os.environ.get('SAFETY_TZ_BOUNDARIES')
+
+
+def build_analyzer():
+    """Analyzer with whichever optional indexes are configured
+
+    Index modules are imported only when their file is set, so a bare
+    deployment does not pay for loading them.
+    """
+    safe_places = crime_grid = tz_index = None
+    if POI_FILE:
+        from poi_index import SafePlaceIndex
+        safe_places = SafePlaceIndex.load(POI_FILE)
+    if CRIME_GRID_FILE:
+        from crime_grid import CrimeGrid
+        crime_grid = CrimeGrid(CRIME_GRID_FILE)
+    if TZ_BOUNDARIES_FILE:
+        from tz_index import TimezoneIndex
+        tz_index = TimezoneIndex.load(TZ_BOUNDARIES_FILE)
+    return SafetyAnalyzer(safe_places=safe_places, crime_grid=crime_grid, tz_index=tz_index)
+
+
+def _number(data: dict, field: str, default: float) -> float:
+    value = float(data.get(field, default))
+    if not math.isfinite(value):
+        raise ValueError(f"{field} must be a finite number")
+    return value
+
+
+def assess_inputs(analyzer: SafetyAnalyzer, data: dict, now: Optional[float] = None) -> dict:
+    """
+    assess_safety keyword arguments for /api/assess request fields
+
+    Like /api/assess, hour and weekday are derived from utc_timestamp (or
+    the clock when no hour is sent) in the coordinates' local time. AUTO
+    and unknown crowd densities score as MEDIUM: estimating crowds needs
+    the web app's session state.
+
+    Raises:
+        ValueError: A field does not parse, is not finite or is out of range
+    """
+    latitude = _number(data, 'latitude', 0)
+    longitude = _number(data, 'longitude', 0)
+    weekday = int(_number(data, 'weekday', 0)) if data.get('weekday') is not None else None
+    if data.get('utc_timestamp') is not None or data.get('hour') is None:
+        timestamp = float(data.get('utc_timestamp') or (time.time() if now is None else now))
+        try:
+            hour, weekday = analyzer.local_time(timestamp, latitude, longitude)
+        except (OverflowError, OSError) as e:
+            raise ValueError(f"utc_timestamp out of range: {e}") from e
+    else:
+        hour = int(_number(data, 'hour', 0))
+    crowd = str(data.get('crowd_density', 'MEDIUM')).upper()
+    return dict(
+        hour=hour,
+        latitude=latitude,
+        longitude=longitude,
+        crowd_density=CrowdDensity.__members__.get(crowd, CrowdDensity.MEDIUM),
+        crime_score=int(_number(data, 'crime_score', 50)),
+        movement_speed=_number(data, 'movement_speed', 1.0),
+        network_available=str(data.get('network_available', True)).lower() in ('true', '1', 'yes'),
+        weekday=weekday
+    )
@@ -3,16 +3,335 @@ Flask Web Application for Personal Safety Risk Analyzer
 Provides a web interface for the safety analyzer
 """
 
-from flask import Flask, render_template, request, jsonify
-from safety_analyzer import SafetyAnalyzer, CrowdDensity
+from flask import Flask, Response, render_template, request, jsonify, g
+from safety_analyzer import CrowdDensity, threat_mask
+from analyzer_config import assess_inputs, build_analyzer
+from assessment_log import LogRecord
+from write_behind import WriteBehindQueue
+from report_interval import ReportIntervalAdvisor
+from rollups import AssessmentRollup
+from wire_format import JSON_TYPE, content_types, decode_request, encode_response, negotiate
+from dataclasses import asdict
+import atexit
+import math
 import os
+import time
 
 app = Flask(__name__)
-analyzer = SafetyAnalyzer()
+
+analyzer = build_analyzer()
+
+# Optional tenant profiles with their own weights and thresholds, selected per
+# request by the X-API-Key or X-Tenant-ID header
+TENANTS_FILE = os.environ.get('SAFETY_TENANTS_FILE')
+tenants = None
+if TENANTS_FILE:
+    from tenants import TenantRegistry, load_profiles
+    tenants = TenantRegistry(
+        load_profiles(TENANTS_FILE),
+        analyzer,
+        memory_budget=int(float(os.environ.get('SAFETY_TENANT_CACHE_MB', 256)) * 1024 * 1024)
+    )
+
+
+def request_tenant():
+    """The request's tenant state, or None to use the global analyzer"""
+    if tenants is None:
+        return None
+    return tenants.resolve(request.headers.get('X-Tenant-ID'), request.headers.get('X-API-Key'))
+
+# Optional micro-batching of concurrent /api/assess requests (threaded workers)
+MICROBATCH = os.environ.get('SAFETY_MICROBATCH', 'false').lower() in ('1', 'true', 'yes')
 
 # Store assessment history
 assessment_history = []
 
+# Optional durable append-only log of every assessment
+ASSESSMENT_LOG_DIR = os.environ.get('SAFETY_ASSESSMENT_LOG_DIR')
+
+
+# Incremental stats rollups; with SAFETY_STATS_DIR each worker publishes its
+# counters there every SAFETY_STATS_PUBLISH_S seconds so /api/stats can merge
+# across workers
+rollup = AssessmentRollup()
+STATS_DIR = os.environ.get('SAFETY_STATS_DIR')
+STATS_PUBLISH_S = float(os.environ.get('SAFETY_STATS_PUBLISH_S', 5))
+if STATS_DIR:
+    os.makedirs(STATS_DIR, exist_ok=True)
+
+
+def store_history(batch):
+    """Write-behind flush: persist a batch of (response, log record) pairs"""
+    assessment_history.extend(response for response, _ in batch)
+    if assessment_log is not None:
+        assessment_log.write_batch([record for _, record in batch])
+
+
+# Objects below own background threads, which do not survive fork. With
+# SAFETY_PRELOAD (set by gunicorn.conf.py) the app is imported once in the
+# gunicorn master and each worker starts its own from post_fork.
+micro_batcher = None
+assessment_log = None
+history_queue = None
+sos_dispatcher = None
+
+# Optional server-side SOS dispatch for sessions entering High risk
+SOS_DISPATCH = os.environ.get('SAFETY_SOS_DISPATCH', 'false').lower() in ('1', 'true', 'yes')
+
+
+def sos_notifiers():
+    """Notifier backends configured through SAFETY_SOS_* (a logging stub if none)"""
+    from sos_dispatch import SMSGatewayNotifier, SMTPNotifier, StubNotifier, WebhookNotifier
+    notifiers = []
+    if os.environ.get('SAFETY_SOS_WEBHOOK_URL'):
+        notifiers.append(WebhookNotifier(os.environ['SAFETY_SOS_WEBHOOK_URL']))
+    if os.environ.get('SAFETY_SOS_SMTP_HOST'):
+        notifiers.append(SMTPNotifier(
+            os.environ['SAFETY_SOS_SMTP_HOST'],
+            sender=os.environ.get('SAFETY_SOS_SMTP_FROM', 'sos@localhost'),
+            recipients=os.environ.get('SAFETY_SOS_SMTP_TO', '').split(','),
+            port=int(os.environ.get('SAFETY_SOS_SMTP_PORT', 587)),
+            username=os.environ.get('SAFETY_SOS_SMTP_USER'),
+            password=os.environ.get('SAFETY_SOS_SMTP_PASSWORD')
+        ))
+    if os.environ.get('SAFETY_SOS_SMS_URL'):
+        notifiers.append(SMSGatewayNotifier(
+            os.environ['SAFETY_SOS_SMS_URL'],
+            recipients=os.environ.get('SAFETY_SOS_SMS_TO', '').split(','),
+            api_key=os.environ.get('SAFETY_SOS_SMS_KEY')
+        ))
+    return notifiers or [StubNotifier(log=True)]
+
+
+def start_background():
+    """Start this process's batcher, assessment log, history writer, SOS dispatcher and stats publisher"""
+    global micro_batcher, assessment_log, history_queue, sos_dispatcher
+    if MICROBATCH:
+        from micro_batcher import MicroBatcher
+        micro_batcher = MicroBatcher(
+            analyzer,
+            max_batch=int(os.environ.get('SAFETY_MICROBATCH_MAX', 32)),
+            max_wait_ms=float(os.environ.get('SAFETY_MICROBATCH_WAIT_MS', 2))
+        )
+    if ASSESSMENT_LOG_DIR:
+        from assessment_log import AssessmentLog
+        assessment_log = AssessmentLog(ASSESSMENT_LOG_DIR)
+    # History appends happen off the request path (see shutdown())
+    history_queue = WriteBehindQueue(
+        store_history,
+        maxsize=int(os.environ.get('SAFETY_HISTORY_QUEUE_SIZE', 10000)),
+        overflow=os.environ.get('SAFETY_HISTORY_OVERFLOW', 'drop_oldest'),
+        name='history-writer'
+    )
+    if SOS_DISPATCH:
+        from sos_dispatch import SOSDispatcher
+        sos_dispatcher = SOSDispatcher(
+            sos_notifiers(),
+            episode_s=float(os.environ.get('SAFETY_SOS_EPISODE_S', 900)),
+            path=os.environ.get('SAFETY_SOS_STATE_DB')
+        )
+    if STATS_DIR:
+        rollup.start_publishing(STATS_DIR, STATS_PUBLISH_S)
+
+
+def shutdown():
+    """Flush queued history and close the log (worker exit / interpreter exit)"""
+    if micro_batcher is not None:
+        micro_batcher.close()
+    if sos_dispatcher is not None:
+        sos_dispatcher.close()
+    if history_queue is not None:
+        history_queue.close()
+    if assessment_log is not None:
+        assessment_log.close()
+    if STATS_DIR:
+        rollup.stop_publishing(STATS_DIR)
+
+
+if os.environ.get('SAFETY_PRELOAD', 'false').lower() not in ('1', 'true', 'yes'):
+    start_background()
+atexit.register(shutdown)
+
+# Safest-route search over the local road graph named by SAFETY_ROAD_GRAPH,
+# loaded on first use
+ROAD_GRAPH_PATH = os.environ.get('SAFETY_ROAD_GRAPH')
+road_graph = None
+routers = {}
+
+# Optional server-side crowd density estimate from recent located sessions;
+# used when a request sends crowd_density "AUTO"
+crowd_estimator = None
+if os.environ.get('SAFETY_CROWD_ESTIMATOR', 'false').lower() in ('1', 'true', 'yes'):
+    from crowd_estimator import CrowdDensityEstimator
+    crowd_estimator = CrowdDensityEstimator()
+
+# Optional geofences (GeoJSON of danger/safe zones named by SAFETY_GEOFENCE_FILE):
+# each fix is checked against the zones, enter/exit events are reported per
+# session and the zone risk is scored as the "geofence" factor
+GEOFENCE_FILE = os.environ.get('SAFETY_GEOFENCE_FILE')
+geofences = None
+if GEOFENCE_FILE:
+    from geofence import GeofenceTracker, ZoneIndex, zone_risk
+    geofences = GeofenceTracker(ZoneIndex.load(GEOFENCE_FILE))
+
+# Optional per-session fix filter (SAFETY_FIX_FILTER): smooths jittery fixes and
+# answers near-duplicates with the session's last response instead of rescoring
+fix_filter = None
+if os.environ.get('SAFETY_FIX_FILTER', 'false').lower() in ('1', 'true', 'yes'):
+    from fix_filter import FixFilter
+    fix_filter = FixFilter(
+        min_displacement_m=float(os.environ.get('SAFETY_FIX_MIN_DISPLACEMENT_M', 10)),
+        min_interval_s=float(os.environ.get('SAFETY_FIX_MIN_INTERVAL_S', 1)),
+        max_interval_s=float(os.environ.get('SAFETY_FIX_MAX_INTERVAL_S', 30)),
+        max_accuracy_m=float(os.environ.get('SAFETY_FIX_MAX_ACCURACY_M', 100))
+    )
+
+# Optional movement anomaly detection over each session's fixes (abrupt stop
+# after running, erratic path); a flagged fix scores the "movement_anomaly" factor
+movement_anomalies = None
+if os.environ.get('SAFETY_MOVEMENT_ANOMALY', 'false').lower() in ('1', 'true', 'yes'):
+    from movement_anomaly import MovementAnomalyDetector
+    movement_anomalies = MovementAnomalyDetector()
+
+# Advice on when each tracking session should report next; raise
+# SAFETY_REPORT_LOAD_FACTOR to slow Low/Medium sessions down further
+report_advisor = ReportIntervalAdvisor(
+    load_factor=float(os.environ.get('SAFETY_REPORT_LOAD_FACTOR', 1.0))
+)
+
+# Request strings accepted for crowd density
+CROWD_DENSITY_MAP = {
+    'LOW': CrowdDensity.LOW,
+    'MEDIUM': CrowdDensity.MEDIUM,
+    'HIGH': CrowdDensity.HIGH
+}
+
+# Optional overload protection for /api/assess and history reads: a per-client
+# token bucket (SAFETY_RATE_LIMIT requests/s, shared by the workers through
+# SAFETY_RATE_LIMIT_DB) and priority load shedding (SAFETY_LOAD_SHEDDING).
+# Requests from critical sessions cost 1/SAFETY_CRITICAL_RATE_FACTOR tokens:
+# priority follows what the client reports, so it buys a higher limit, not
+# an unlimited one
+RATE_LIMIT = float(os.environ.get('SAFETY_RATE_LIMIT', 0))
+CRITICAL_RATE_FACTOR = max(1.0, float(os.environ.get('SAFETY_CRITICAL_RATE_FACTOR', 4)))
+LOAD_SHEDDING = os.environ.get('SAFETY_LOAD_SHEDDING', 'false').lower() in ('1', 'true', 'yes')
+limiter = shedder = session_priorities = None
+if RATE_LIMIT > 0 or LOAD_SHEDDING:
+    from load_shedding import LoadShedder, SessionPriorities, TokenBucketLimiter
+    session_priorities = SessionPriorities(
+        poll_interval_s=float(os.environ.get('SAFETY_POLL_INTERVAL_S', 5))
+    )
+    if RATE_LIMIT > 0:
+        limiter = TokenBucketLimiter(
+            RATE_LIMIT,
+            burst=float(os.environ.get('SAFETY_RATE_BURST', max(1.0, 2 * RATE_LIMIT))),
+            path=os.environ.get('SAFETY_RATE_LIMIT_DB')
+        )
+    if LOAD_SHEDDING:
+        max_queue_delay_ms = os.environ.get('SAFETY_MAX_QUEUE_DELAY_MS')
+        shedder = LoadShedder(
+            max_in_flight=int(os.environ.get('SAFETY_MAX_IN_FLIGHT', 32)),
+            max_queue_delay_ms=float(max_queue_delay_ms) if max_queue_delay_ms else None
+        )
+
+# Endpoints under admission control
+ADMISSION_ENDPOINTS = ('assess_safety', 'get_history')
+
+
+def queue_delay_ms():
+    """How long the request waited before a worker took it (X-Request-Start)"""
+    header = request.headers.get('X-Request-Start')
+    if not header:
+        return None
+    try:
+        start = float(header.split('=')[-1])
+    except ValueError:
+        return None
+    # Proxies send seconds, milliseconds or microseconds since the epoch
+    start_s = start / 1e6 if start > 1e14 else start / 1e3 if start > 1e11 else start
+    return max(0.0, (time.time() - start_s) * 1000)
+
+
+def overloaded(status, message, retry_after):
+    """Refusal response telling the client when to retry"""
+    response = jsonify({'success': False, 'error': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def rate_limit_client():
+    """
+    Who the rate limit counts a request against: a tenant whose API key was
+    accepted, else the remote address. Unchecked keys are ignored, or a
+    client could rotate keys to get a fresh bucket on every request.
+    """
+    if tenants is not None and request.headers.get('X-API-Key'):
+        try:
+            tenant = request_tenant()
+        except ValueError:
+            tenant = None
+        if tenant is not None:
+            return f"tenant:{tenant.profile.tenant_id}"
+    return request.remote_addr
+
+
+@app.before_request
+def admission_control():
+    """Rate-limit and shed by priority before the endpoint runs"""
+    if session_priorities is None or request.endpoint not in ADMISSION_ENDPOINTS:
+        return None
+    from load_shedding import PRIORITY_CRITICAL, PRIORITY_LOW
+    if request.endpoint == 'get_history':
+        priority = PRIORITY_LOW
+    else:
+        # Same decoding as the endpoint, so binary and msgpack bodies keep
+        # their session; a body it cannot decode is rejected there
+        try:
+            data = request_data()
+        except Exception:
+            data = None
+        if not isinstance(data, dict):
+            data = {}
+        priority = session_priorities.priority(str(data.get('session_id') or request.remote_addr))
+
+    if limiter is not None:
+        # Sessions at High risk get CRITICAL_RATE_FACTOR times the rate
+        cost = 1.0 / CRITICAL_RATE_FACTOR if priority == PRIORITY_CRITICAL else 1.0
+        wait = limiter.acquire(rate_limit_client(), cost)
+        if wait:
+            return overloaded(429, 'Rate limit exceeded', wait)
+    if shedder is not None:
+        if not shedder.admit(priority, queue_delay_ms()):
+            return overloaded(503, 'Server overloaded, retry shortly', 1)
+        g.admitted = True
+    return None
+
+
+@app.teardown_request
+def release_admission(exc):
+    """Free the load shedder slot taken in admission_control"""
+    if g.pop('admitted', False):
+        shedder.release()
+
+
+# Deadline fast path: when a request's X-Deadline-Ms budget (less time spent
+# queueing) is under SAFETY_FAST_PATH_MS, /api/assess scores from the
+# precomputed core table and skips the optional enrichments
+FAST_PATH_MS = float(os.environ.get('SAFETY_FAST_PATH_MS', 50))
+
+
+def remaining_budget_ms():
+    """Milliseconds left of the client's X-Deadline-Ms budget, or None"""
+    header = request.headers.get('X-Deadline-Ms')
+    if not header:
+        return None
+    try:
+        budget = float(header)
+    except ValueError:
+        return None
+    return budget - (queue_delay_ms() or 0.0)
+
 
 @app.route('/')
 def index():
@@ -20,39 +339,105 @@ def index():
     return render_template('index.html')
 
 
+def request_data():
+    """The request body as JSON request fields, whichever wire format it came in"""
+    if request.mimetype in content_types():
+        return decode_request(request.get_data(), request.mimetype)
+    return request.get_json(force=True)
+
+
+def assessment_reply(data):
+    """An assessment in the format the client accepts (JSON unless it asks for binary)"""
+    mimetype = negotiate(request.headers.get('Accept'), request.mimetype)
+    if mimetype == JSON_TYPE:
+        return jsonify({'success': True, 'data': data})
+    return Response(encode_response(data, mimetype), mimetype=mimetype)
+
+
 @app.route('/api/assess', methods=['POST'])
 def assess_safety():
     """API endpoint for safety assessment"""
     try:
-        data = request.get_json(force=True)
-
-        # Parse input data safely
-        hour = int(data.get('hour', 12))
-        latitude = float(data.get('latitude', 0))
-        longitude = float(data.get('longitude', 0))
-        crowd_density_str = str(data.get('crowd_density', 'MEDIUM'))
-        crime_score = int(data.get('crime_score', 50))
-        movement_speed = float(data.get('movement_speed', 1.0))
-        network_available = str(data.get('network_available', True)).lower() in ['true', '1', 'yes']
-
-        # Convert crowd density string to enum
-        crowd_density_map = {
-            'LOW': CrowdDensity.LOW,
-            'MEDIUM': CrowdDensity.MEDIUM,
-            'HIGH': CrowdDensity.HIGH
-        }
-        crowd_density = crowd_density_map.get(crowd_density_str.upper(), CrowdDensity.MEDIUM)
-
-        # Perform assessment
-        assessment = analyzer.assess_safety(
-            hour=hour,
-            latitude=latitude,
-            longitude=longitude,
-            crowd_density=crowd_density,
-            crime_score=crime_score,
-            movement_speed=movement_speed,
-            network_available=network_available
-        )
+        data = request_data()
+        tenant = request_tenant()
+        scorer = tenant.analyzer if tenant is not None else analyzer
+        remaining_ms = remaining_budget_ms()
+        fast_path = remaining_ms is not None and remaining_ms < FAST_PATH_MS
+
+        # Parse input data safely; local time comes from a UTC timestamp (or
+        # the server clock when no hour is sent) instead of the client's timezone
+        inputs = assess_inputs(analyzer, data)
+        hour, weekday = inputs['hour'], inputs['weekday']
+        latitude, longitude = inputs['latitude'], inputs['longitude']
+        crowd_density = inputs['crowd_density']
+        crime_score = inputs['crime_score']
+        movement_speed = inputs['movement_speed']
+        network_available = inputs['network_available']
+        session_id = str(data.get('session_id') or request.remote_addr)
+        explain = str(data.get('explain', False)).lower() in ['true', '1', 'yes']
+
+        # Feed located sessions to the crowd estimator
+        if crowd_estimator is not None and analyzer.is_valid_coordinates(latitude, longitude):
+            crowd_estimator.observe(session_id, latitude, longitude)
+            if str(data.get('crowd_density', '')).upper() == 'AUTO':
+                crowd_density = inputs['crowd_density'] = crowd_estimator.estimate(latitude, longitude)
+
+        if explain:
+            inputs['explain'] = True
+        fix = None
+        if fix_filter is not None and analyzer.is_valid_coordinates(latitude, longitude):
+            # Every input but the position; a change always forces a rescore
+            signature = (tenant.profile.tenant_id if tenant is not None else None, hour, weekday,
+                         crowd_density, crime_score, (movement_speed > 0) - (movement_speed < 0),
+                         network_available, explain)
+            fix = fix_filter.filter(
+                session_id, latitude, longitude,
+                float(data['accuracy']) if data.get('accuracy') is not None else None,
+                signature, float(data.get('utc_timestamp') or time.time())
+            )
+            latitude, longitude = fix.latitude, fix.longitude
+            inputs.update(latitude=latitude, longitude=longitude)
+        geofence = None
+        if geofences is not None and analyzer.is_valid_coordinates(latitude, longitude):
+            zones, events = geofences.update(session_id, latitude, longitude, time.time())
+            risk = zone_risk(zones)
+            if risk is not None:
+                inputs['extra_risks'] = {'geofence': risk}
+            geofence = {
+                'zones': [zone.zone_id for zone in zones],
+                'events': [asdict(event) for event in events]
+            }
+        movement_anomaly = None
+        if movement_anomalies is not None and analyzer.is_valid_coordinates(latitude, longitude):
+            movement_anomaly = movement_anomalies.update(
+                session_id, latitude, longitude, float(data.get('utc_timestamp') or time.time())
+            )
+            # Scored only when flagged, so normal movement leaves scores as they were
+            if movement_anomaly > 0:
+                inputs.setdefault('extra_risks', {})['movement_anomaly'] = movement_anomaly
+        # Geofences and anomalies see every fix; an absorbed one reuses the
+        # last score unless it crossed a zone or was flagged. The per-fix
+        # fields are this fix's, and it carries no SOS key as it was not
+        # fed to the dispatcher
+        if (fix is not None and fix.absorbed and not (geofence and geofence['events'])
+                and not movement_anomaly):
+            response = dict(fix.response, geofence=geofence, movement_anomaly=movement_anomaly,
+                            timestamp=data.get('timestamp', ''), fix_suppressed=fix.absorbed)
+            response.pop('sos_idempotency_key', None)
+            return assessment_reply(response)
+        skipped_enrichments = []
+        if fast_path:
+            del inputs['weekday']
+            assessment = scorer.assess_core(**inputs)
+            if scorer.crime_grid is not None and weekday is not None:
+                skipped_enrichments.append('crime_grid')
+            if scorer.safe_places is not None and assessment.risk_level == 'High':
+                skipped_enrichments.append('safe_places')
+            skipped_enrichments += ['history', 'text']
+        elif micro_batcher is not None and tenant is None:
+            assessment = micro_batcher.assess(timeout=5, **inputs)
+        else:
+            assessment = scorer.assess_safety(**inputs)
 
         # Prepare response
         response = {
@@ -61,16 +446,197 @@ def assess_safety():
             'threat_reason': assessment.threat_reason,
             'recommended_action': assessment.recommended_action,
             'emergency_actions': assessment.emergency_actions or [],
+            'nearest_safe_places': assessment.nearest_safe_places or [],
+            'threat_factors': assessment.threat_factors or [],
+            'skipped_enrichments': skipped_enrichments,
+            'next_report_after': report_advisor.advise(
+                session_id, assessment.risk_level, assessment.risk_score, movement_speed,
+                shedder.load() if shedder is not None else None
+            ),
+            'geofence': geofence,
+            'movement_anomaly': movement_anomaly,
+            'crowd_density': crowd_density.name,
+            'hour': hour,
             'timestamp': data.get('timestamp', ''),
             'location': {
                 'latitude': latitude,
                 'longitude': longitude
             }
         }
+        if explain:
+            response['contributions'] = assessment.contributions
+
+        rollup.record(hour, latitude, longitude, assessment.risk_level, assessment.threat_factors)
+        if session_priorities is not None:
+            session_priorities.record(session_id, assessment.risk_level)
+        if sos_dispatcher is not None and data.get('session_id'):
+            # Enqueue only; deduplicated while the session stays at High.
+            # Anonymous requests are not dispatched: the remote address
+            # would merge every client behind one proxy into one episode
+            response['sos_idempotency_key'] = sos_dispatcher.observe(
+                session_id, assessment.risk_level, latitude, longitude,
+                assessment.risk_score, assessment.threat_factors
+            )
+        if fix_filter is not None and not fast_path:
+            # A fast-path answer lacks enrichments: later fixes are scored
+            # in full rather than reusing it
+            fix_filter.remember(session_id, response)
+
+        # Add to history (flushed in the background)
+        if not fast_path:
+            history_queue.put((response, LogRecord(
+                timestamp=time.time(),
+                latitude=latitude,
+                longitude=longitude,
+                risk_score=assessment.risk_score,
+                risk_level=assessment.risk_level,
+                threat_mask=threat_mask(assessment.threat_factors)
+            )))
+
+        return assessment_reply(response)
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
 
-        # Add to history
-        assessment_history.append(response)
 
+@app.route('/api/assess-route', methods=['POST'])
+def assess_route_safety():
+    """API endpoint for assessing a whole route in one call"""
+    try:
+        data = request.get_json(force=True)
+
+        polyline = [(float(lat), float(lon)) for lat, lon in data.get('polyline', [])]
+        departure_hour = float(data.get('departure_hour', 12))
+        speed = float(data.get('speed', 1.4))
+        crowd_density_str = str(data.get('crowd_density', 'MEDIUM'))
+        crime_score = int(data.get('crime_score', 50))
+        network_available = str(data.get('network_available', True)).lower() in ['true', '1', 'yes']
+        step_m = float(data.get('step_m', 50))
+        departure_weekday = int(data['departure_weekday']) if data.get('departure_weekday') is not None else None
+
+        crowd_density = CROWD_DENSITY_MAP.get(crowd_density_str.upper(), CrowdDensity.MEDIUM)
+
+        tenant = request_tenant()
+        from route_assessment import assess_route
+        route = assess_route(
+            tenant.analyzer if tenant is not None else analyzer,
+            polyline,
+            departure_hour=departure_hour,
+            speed=speed,
+            crowd_density=crowd_density,
+            crime_score=crime_score,
+            network_available=network_available,
+            step_m=step_m,
+            departure_weekday=departure_weekday
+        )
+
+        response = asdict(route)
+        return jsonify({'success': True, 'data': response})
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+
+def get_router(crowd_density, network_available, tenant=None):
+    """Router for the configured road graph, one per tenant and scoring context"""
+    global road_graph
+    if not ROAD_GRAPH_PATH:
+        raise ValueError('No road graph configured (set SAFETY_ROAD_GRAPH)')
+    from routing import RoadGraph, SafeRouter
+    if road_graph is None:
+        road_graph = RoadGraph.load(ROAD_GRAPH_PATH)
+    cache = tenant.caches if tenant is not None else routers
+    key = ('router', crowd_density, network_available)
+    if key not in cache:
+        # Each router caches its own hourly edge-cost tables
+        cache[key] = SafeRouter(road_graph, tenant.analyzer if tenant is not None else analyzer,
+                                crowd_density=crowd_density, network_available=network_available)
+    return cache[key]
+
+
+def warmup():
+    """
+    Load everything that is otherwise built on first use
+
+    Called in the gunicorn master before fork (see gunicorn.conf.py) so the
+    core score table, road graph, hourly edge tables and lazily imported
+    modules are built once and shared copy-on-write by every worker.
+    """
+    import route_assessment  # noqa: F401  (otherwise first imported by /api/assess-route)
+    analyzer.core_table()
+    analyzer.assess_safety(hour=12, latitude=0.0, longitude=0.0,
+                           crowd_density=CrowdDensity.MEDIUM, crime_score=50,
+                           movement_speed=1.0, network_available=True,
+                           weekday=0, timestamp=time.time())
+    if ROAD_GRAPH_PATH:
+        router = get_router(CrowdDensity.MEDIUM, True)
+        if os.environ.get('SAFETY_WARM_ROUTE_TABLES', 'false').lower() in ('1', 'true', 'yes'):
+            for hour in range(24):
+                router.edge_table(hour)
+
+
+def process_memory():
+    """This process's memory in KiB; private_kb is what forking did not share"""
+    memory = {'pid': os.getpid()}
+    fields = {'Rss': 'rss_kb', 'Pss': 'pss_kb', 'Shared_Clean': 'shared_kb',
+              'Shared_Dirty': 'shared_kb', 'Private_Clean': 'private_kb',
+              'Private_Dirty': 'private_kb'}
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in fields:
+                    key = fields[name]
+                    memory[key] = memory.get(key, 0) + int(value.split()[0])
+    except OSError:
+        try:
+            import resource
+            memory['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        except ImportError:  # Windows
+            pass
+    return memory
+
+
+@app.route('/api/safest-routes', methods=['POST'])
+def safest_routes():
+    """API endpoint suggesting the lowest-risk routes between two points"""
+    try:
+        data = request.get_json(force=True)
+
+        origin = [float(v) for v in data['origin']]
+        destination = [float(v) for v in data['destination']]
+        hour = int(data.get('hour', 12))
+        if not 0 <= hour <= 23:
+            raise ValueError("hour must be 0-23")
+        k = int(data.get('k', 3))
+        max_detour = float(data.get('max_detour', 1.5))
+        max_distance_m = data.get('max_distance_m')
+        crowd_density_str = str(data.get('crowd_density', 'MEDIUM'))
+        network_available = str(data.get('network_available', True)).lower() in ['true', '1', 'yes']
+
+        crowd_density = CROWD_DENSITY_MAP.get(crowd_density_str.upper(), CrowdDensity.MEDIUM)
+        tenant = request_tenant()
+        router = get_router(crowd_density, network_available, tenant)
+
+        routes = router.safest_routes(
+            router.graph.nearest_node(*origin),
+            router.graph.nearest_node(*destination),
+            hour=hour,
+            k=k,
+            max_distance_m=float(max_distance_m) if max_distance_m is not None else None,
+            max_detour=max_detour
+        )
+
+        if tenant is not None:
+            tenants.trim()   # the search may have built new edge tables
+
+        response = {'routes': [asdict(route) for route in routes]}
         return jsonify({'success': True, 'data': response})
 
     except Exception as e:
@@ -86,6 +652,85 @@ def get_history():
     return jsonify({'success': True, 'history': assessment_history})
 
 
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Risk level counts by hour and region plus the top threat factors"""
+    stats = rollup.query(
+        region=request.args.get('region'),
+        top_factors=int(request.args.get('top', 3)),
+        directory=STATS_DIR
+    )
+    return jsonify({'success': True, 'stats': stats})
+
+
+# Largest crime grid tile (in cells) a scoring bundle may carry
+MAX_BUNDLE_TILE_CELLS = 2500
+scoring_bundles = {}
+
+
+@app.route('/api/scoring-bundle', methods=['GET'])
+def get_scoring_bundle():
+    """Compiled scoring rules for offline evaluation on the device
+
+    The ETag is the bundle's sha256, so clients syncing with If-None-Match
+    get 304 until the rules change. ?bbox=south,west,north,east adds that
+    region's crime grid tile.
+    """
+    from scoring_bundle import build_bundle
+    try:
+        tenant = request_tenant()
+        scorer = tenant.analyzer if tenant is not None else analyzer
+        bbox = request.args.get('bbox')
+        if bbox:
+            south, west, north, east = (float(value) for value in bbox.split(','))
+            cell_deg = scorer.crime_grid.cell_deg if scorer.crime_grid is not None else 1.0
+            cells = (math.floor(north / cell_deg) - math.floor(south / cell_deg) + 1) * \
+                (math.floor(east / cell_deg) - math.floor(west / cell_deg) + 1)
+            if cells > MAX_BUNDLE_TILE_CELLS:
+                raise ValueError(f'bbox covers more than {MAX_BUNDLE_TILE_CELLS} crime grid cells')
+            bundle = build_bundle(scorer, (south, west, north, east))
+        else:
+            key = tenant.profile.tenant_id if tenant is not None else None
+            bundle = scoring_bundles.get(key)
+            if bundle is None:
+                bundle = scoring_bundles[key] = build_bundle(scorer)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    response = jsonify(bundle)
+    response.set_etag(bundle['sha256'])
+    return response.make_conditional(request)
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Operational metrics for the history pipeline and this worker's memory"""
+    metrics = {'history_queue': history_queue.metrics(), 'process': process_memory(),
+               'report_interval': report_advisor.metrics()}
+    if micro_batcher is not None:
+        metrics['micro_batcher'] = micro_batcher.metrics()
+    if tenants is not None:
+        metrics['tenants'] = tenants.metrics()
+    if sos_dispatcher is not None:
+        metrics['sos_dispatch'] = sos_dispatcher.metrics()
+    if geofences is not None:
+        metrics['geofence'] = geofences.metrics()
+    if movement_anomalies is not None:
+        metrics['movement_anomaly'] = movement_anomalies.metrics()
+    if fix_filter is not None:
+        metrics['fix_filter'] = fix_filter.metrics()
+    if limiter is not None:
+        metrics['rate_limiter'] = limiter.metrics()
+    if shedder is not None:
+        metrics['load_shedder'] = shedder.metrics()
+    if assessment_log is not None:
+        metrics['assessment_log'] = {
+            'written': assessment_log.written,
+            'commits': assessment_log.commits
+        }
+    return jsonify({'success': True, 'metrics': metrics})
+
+
 @app.route('/api/clear-history', methods=['POST'])
 def clear_history():
     """Clear assessment history"""
@@ -0,0 +1,419 @@
+"""
+Assessment Log
+Durable append-only record of every assessment for audits and model tuning
+
+Layout of the log directory:
+    rows-<period start>-<pid>.log
+                                Row segments, one per rotation period and
+                                process, written by a background thread with
+                                group commit
+    cols-<first>-<last>.col     Columnar blocks: closed row segments of one
+                                compaction window merged and sorted by time
+    compact.lock                flock held shared by writers during a commit
+                                and exclusive by compaction, so processes can
+                                share the directory
+"""
+
+import contextlib
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+from safety_analyzer import RISK_LEVELS
+
+try:
+    import fcntl
+except ImportError:   # Windows: one process per directory
+    fcntl = None
+
+ROW_MAGIC = b"SAFELOG1"
+COL_MAGIC = b"SAFECOL1"
+ROW = struct.Struct("<dddBBB")
+COL_HEADER = struct.Struct("<8sIdddddd")
+
+# (south, west, north, east)
+BoundingBox = Tuple[float, float, float, float]
+
+
+@dataclass
+class LogRecord:
+    timestamp: float
+    latitude: float
+    longitude: float
+    risk_score: int
+    risk_level: str
+    threat_mask: int = 0
+
+    def pack(self) -> bytes:
+        return ROW.pack(self.timestamp, self.latitude, self.longitude, self.risk_score,
+                        RISK_LEVELS.index(self.risk_level), self.threat_mask)
+
+    @classmethod
+    def unpack(cls, fields: tuple) -> "LogRecord":
+        timestamp, latitude, longitude, score, level, mask = fields
+        return cls(timestamp, latitude, longitude, score, RISK_LEVELS[level], mask)
+
+
+def _in_box(latitude: float, longitude: float, bbox: Optional[BoundingBox]) -> bool:
+    return bbox is None or (bbox[0] <= latitude <= bbox[2] and bbox[1] <= longitude <= bbox[3])
+
+
+class AssessmentLog:
+    """
+    Append-only assessment log with a background group-commit writer
+
+    append() only enqueues, so request threads never touch the disk. The
+    writer drains everything queued into one write and flush per batch,
+    rotates row segments every rotate_s seconds and compacts closed
+    segments into columnar blocks once their compaction window has passed.
+    """
+
+    def __init__(self,
+                 directory: str,
+                 rotate_s: float = 3600,
+                 compact_window_s: float = 86400,
+                 max_batch: int = 4096,
+                 fsync: bool = False):
+        """
+        Args:
+            directory: Directory holding segment and block files
+            rotate_s: Row segment period in seconds
+            compact_window_s: Period whose closed segments merge into one block
+            max_batch: Most records written per group commit
+            fsync: fsync after every group commit
+        """
+        self.directory = directory
+        self.rotate_s = rotate_s
+        self.compact_window_s = compact_window_s
+        self.max_batch = max_batch
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        # Records are numbered in append order; the writer takes them in that
+        # order, so a failed group commit is a range of those numbers
+        self._appended = 0
+        self._done = 0
+        self._failures: deque = deque(maxlen=256)   # (first, last, error)
+        self._reported = 0
+        self._idle = threading.Condition()
+        self._file = None
+        self._path = None
+        self._period = None
+        self._compact_lock = threading.Lock()
+        self.written = 0
+        self.commits = 0
+        self.write_errors = 0
+        self._writer = threading.Thread(target=self._run, name="assessment-log-writer", daemon=True)
+        self._writer.start()
+
+    # ------------------------------------------------------------ writing
+    def append(self, record: LogRecord):
+        """Queue a record for writing; never blocks on disk"""
+        self._append([record])
+
+    def _append(self, records: List[LogRecord]) -> int:
+        # Numbering and queueing under one lock keeps both in the same order
+        with self._idle:
+            for record in records:
+                self._queue.put(record)
+            self._appended += len(records)
+            return self._appended
+
+    def _wait(self, last: int, timeout: Optional[float]) -> bool:
+        with self._idle:
+            return self._idle.wait_for(lambda: self._done >= last, timeout)
+
+    def _raise_failed(self, first: int, last: int):
+        for failed_first, failed_last, error in list(self._failures):
+            if failed_first <= last and failed_last >= first:
+                raise OSError(f"assessment log write failed: {error}") from error
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until everything appended so far is on disk
+
+        Returns:
+            False on timeout
+
+        Raises:
+            OSError: A record appended since the previous flush was not written
+        """
+        with self._idle:
+            last = self._appended
+        if not self._wait(last, timeout):
+            return False
+        first, self._reported = self._reported + 1, max(self._reported, last)
+        self._raise_failed(first, last)
+        return True
+
+    def close(self, timeout: Optional[float] = None):
+        """Write out the queue and stop the writer thread"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout)
+
+    def write_batch(self, records: List[LogRecord]):
+        """
+        Write records synchronously (for callers with their own writer thread)
+
+        Raises:
+            OSError: Some of these records were not written
+        """
+        if not records:
+            return
+        last = self._append(records)
+        self._wait(last, None)
+        self._raise_failed(last - len(records) + 1, last)
+
+    def _run(self):
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [record for record in batch if record is not None]
+            if batch:
+                error = None
+                try:
+                    self._commit(batch)
+                except Exception as e:
+                    # Any failure (disk, or a record that cannot be packed)
+                    # fails this batch only; the writer keeps running
+                    error = e
+                    print(f"assessment log write failed: {e}", file=sys.stderr)
+                    # Reopen the segment on the next commit
+                    if self._file is not None:
+                        try:
+                            self._file.close()
+                        except OSError:
+                            pass
+                        self._file = None
+                with self._idle:
+                    if error is not None:
+                        self.write_errors += 1
+                        self._failures.append((self._done + 1, self._done + len(batch), error))
+                    self._done += len(batch)
+                    self._idle.notify_all()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @contextlib.contextmanager
+    def _directory_lock(self, operation: int):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, "compact.lock"), "ab") as f:
+            fcntl.flock(f.fileno(), operation)
+            yield   # closing the file releases the lock
+
+    def _commit(self, batch: List[LogRecord]):
+        rotated = False
+        with self._directory_lock(fcntl.LOCK_SH if fcntl else 0):
+            # Another process compacted the open segment away; start a new one
+            if self._file is not None and os.fstat(self._file.fileno()).st_nlink == 0:
+                self._file.close()
+                self._file = None
+            chunk = []
+            for record in batch:
+                period = int(record.timestamp // self.rotate_s)
+                # Late records from an earlier period go to the open segment
+                if self._file is None or period > self._period:
+                    self._write(chunk)
+                    chunk = []
+                    rotated = self._rotate(period) or rotated
+                chunk.append(record)
+            self._write(chunk)
+        self.commits += 1
+        if rotated:
+            # The batch is already written: a failed compaction is retried
+            # at the next rotation instead of failing the commit
+            try:
+                self.compact(before=self._period * self.rotate_s)
+            except OSError as e:
+                print(f"assessment log compaction failed: {e}", file=sys.stderr)
+
+    def _write(self, records: List[LogRecord]):
+        if not records:
+            return
+        self._file.write(b"".join(record.pack() for record in records))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.written += len(records)
+
+    def _rotate(self, period: int) -> bool:
+        """Open the segment for period; True when the period changed"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        changed = period != self._period
+        self._period = period
+        self._path = os.path.join(self.directory,
+                                  f"rows-{int(period * self.rotate_s)}-{os.getpid()}.log")
+        self._file = open(self._path, "ab")
+        if self._file.tell() == 0:   # only this process writes the file
+            self._file.write(ROW_MAGIC)
+        return changed
+
+    # --------------------------------------------------------- compaction
+    def _row_segments(self) -> List[Tuple[int, str]]:
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith("rows-") and name.endswith(".log"):
+                start = int(name[5:-4].split("-")[0])
+                segments.append((start, os.path.join(self.directory, name)))
+        return sorted(segments)
+
+    def compact(self, before: Optional[float] = None) -> int:
+        """
+        Merge closed row segments into one columnar block per compaction window
+
+        Only windows that ended before `before` (default: now) are
+        compacted. Writers in other processes hold the directory lock
+        shared while they commit, so a segment they still have open is
+        never read half-written; they start a new segment after it is
+        removed.
+
+        Returns:
+            Number of blocks written
+        """
+        before = time.time() if before is None else before
+        with self._compact_lock, self._directory_lock(fcntl.LOCK_EX if fcntl else 0):
+            windows = {}
+            for start, path in self._row_segments():
+                window = int(start // self.compact_window_s)
+                if (window + 1) * self.compact_window_s <= before and path != self._path:
+                    windows.setdefault(window, []).append(path)
+
+            for paths in windows.values():
+                records = sorted(
+                    (record for path in paths for record in self._read_rows(path)),
+                    key=lambda r: r.timestamp
+                )
+                if records:
+                    self._write_block(records)
+                for path in paths:
+                    os.remove(path)
+            return len(windows)
+
+    def _write_block(self, records: List[LogRecord]):
+        lats = [r.latitude for r in records]
+        lons = [r.longitude for r in records]
+        first, last = records[0].timestamp, records[-1].timestamp
+        # A late segment of an already compacted window gets its own block
+        end = int(last) + 1
+        while os.path.exists(os.path.join(self.directory, f"cols-{int(first)}-{end}.col")):
+            end += 1
+        name = f"cols-{int(first)}-{end}.col"
+        tmp = os.path.join(self.directory, name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(COL_HEADER.pack(COL_MAGIC, len(records), first, last,
+                                    min(lats), min(lons), max(lats), max(lons)))
+            f.write(array("d", (r.timestamp for r in records)).tobytes())
+            f.write(array("d", lats).tobytes())
+            f.write(array("d", lons).tobytes())
+            f.write(bytes(r.risk_score for r in records))
+            f.write(bytes(RISK_LEVELS.index(r.risk_level) for r in records))
+            f.write(bytes(r.threat_mask for r in records))
+        os.replace(tmp, os.path.join(self.directory, name))
+
+    # ------------------------------------------------------------ reading
+    @staticmethod
+    def _read_rows(path: str) -> Iterator[LogRecord]:
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(ROW_MAGIC):
+            return
+        body = memoryview(data)[len(ROW_MAGIC):]
+        body = body[:len(body) - len(body) % ROW.size]   # ignore a torn final row
+        for fields in ROW.iter_unpack(body):
+            yield LogRecord.unpack(fields)
+
+    def _read_block(self, path: str, start: float, end: float,
+                    bbox: Optional[BoundingBox]) -> Iterator[LogRecord]:
+        with open(path, "rb") as f:
+            header = f.read(COL_HEADER.size)
+            magic, count, first, last, south, west, north, east = COL_HEADER.unpack(header)
+            if magic != COL_MAGIC or last < start or first > end:
+                return
+            if bbox is not None and (north < bbox[0] or south > bbox[2]
+                                     or east < bbox[1] or west > bbox[3]):
+                return
+            data = f.read()
+        columns = memoryview(data)
+        timestamps = columns[:8 * count].cast("d")
+        lats = columns[8 * count:16 * count].cast("d")
+        lons = columns[16 * count:24 * count].cast("d")
+        scores = columns[24 * count:25 * count]
+        levels = columns[25 * count:26 * count]
+        masks = columns[26 * count:27 * count]
+        for i in range(bisect_left(timestamps, start), bisect_right(timestamps, end)):
+            if _in_box(lats[i], lons[i], bbox):
+                yield LogRecord(timestamps[i], lats[i], lons[i], scores[i],
+                                RISK_LEVELS[levels[i]], masks[i])
+
+    def scan(self, start: float = 0.0, end: float = float("inf"),
+             bbox: Optional[BoundingBox] = None) -> Iterator[LogRecord]:
+        """
+        Yield records with start <= timestamp <= end inside an optional
+        (south, west, north, east) box
+
+        Blocks outside the range or box are skipped from their file name or
+        header; inside a block the time range is found by binary search.
+        Row segments (the uncompacted tail) are scanned in full.
+        """
+        blocks = []
+        for name in os.listdir(self.directory):
+            if name.startswith("cols-") and name.endswith(".col"):
+                first, last = (int(v) for v in name[5:-4].split("-"))
+                if last >= start and first <= end:
+                    blocks.append((first, os.path.join(self.directory, name)))
+        for _, path in sorted(blocks):
+            try:
+                yield from self._read_block(path, start, end, bbox)
+            except FileNotFoundError:
+                continue
+        for _, path in self._row_segments():
+            try:
+                for record in self._read_rows(path):
+                    if start <= record.timestamp <= end and _in_box(record.latitude, record.longitude, bbox):
+                        yield record
+            except FileNotFoundError:
+                continue
+
+
+def main(argv: List[str]):
+    """Command line: assessment_log.py compact <dir> | count <dir> [start] [end]"""
+    if len(argv) < 2 or argv[0] not in ("compact", "count"):
+        print("Usage: python assessment_log.py compact <dir> | count <dir> [start] [end]")
+        return 1
+    log = AssessmentLog(argv[1])
+    try:
+        if argv[0] == "compact":
+            print(f"Wrote {log.compact()} block(s)")
+        else:
+            start = float(argv[2]) if len(argv) > 2 else 0.0
+            end = float(argv[3]) if len(argv) > 3 else float("inf")
+            print(sum(1 for _ in log.scan(start, end)))
+    finally:
+        log.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,95 @@
+"""
+Deadline Fast-Path Benchmark
+Latency percentiles of the full assessment (crime grid, safe places, reason
+text, history write) against the core-table fast path used under deadline
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+from crime_grid import CrimeGrid, HOURS_PER_WEEK
+from poi_index import SafePlace, SafePlaceIndex
+from safety_analyzer import CrowdDensity, SafetyAnalyzer, threat_mask
+from write_behind import WriteBehindQueue
+
+# Fast-path p99 the benchmark must stay under
+DEADLINE_MS = 1.0
+
+
+def percentiles(samples: List[float]) -> dict:
+    samples = sorted(samples)
+    return {p: samples[min(len(samples) - 1, int(len(samples) * p / 100))] for p in (50, 90, 99)}
+
+
+def measure(call: Callable[[dict], None], requests: List[dict]) -> dict:
+    """Per-call latency percentiles in ms"""
+    timings = []
+    for kwargs in requests:
+        started = time.perf_counter()
+        call(kwargs)
+        timings.append((time.perf_counter() - started) * 1000)
+    return percentiles(timings)
+
+
+def main(argv: List[str]) -> int:
+    """Command line: bench_deadline.py [requests] [deadline_ms]"""
+    count = int(argv[0]) if argv else 20000
+    deadline_ms = float(argv[1]) if len(argv) > 1 else DEADLINE_MS
+    rng = random.Random(7)
+
+    places = SafePlaceIndex([
+        SafePlace(f"place-{i}", "police", 40.5 + rng.random() * 0.5, -74.3 + rng.random() * 0.6)
+        for i in range(20000)
+    ])
+    with tempfile.TemporaryDirectory() as tmp:
+        grid_path = os.path.join(tmp, "crime.grid")
+        CrimeGrid.write(grid_path, 40.5, -74.3, 0.01, 50, 60, {
+            (row, col): [rng.randrange(101) for _ in range(HOURS_PER_WEEK)]
+            for row in range(50) for col in range(60)
+        })
+        grid = CrimeGrid(grid_path)
+        analyzer = SafetyAnalyzer(safe_places=places, crime_grid=grid)
+        analyzer.core_table()
+        history = WriteBehindQueue(lambda batch: None, maxsize=count)
+
+        # Mostly risky inputs, so the safe-place search runs often
+        requests = [dict(
+            hour=rng.choice((0, 2, 22, 23, 14)),
+            latitude=40.5 + rng.random() * 0.5,
+            longitude=-74.3 + rng.random() * 0.6,
+            crowd_density=rng.choice((CrowdDensity.LOW, CrowdDensity.LOW, CrowdDensity.MEDIUM)),
+            crime_score=rng.randrange(40, 101),
+            movement_speed=rng.choice((0.0, 0.0, 1.2)),
+            network_available=rng.random() < 0.3,
+            weekday=rng.randrange(7)
+        ) for _ in range(count)]
+
+        def full(kwargs):
+            assessment = analyzer.assess_safety(**kwargs)
+            history.put((assessment, threat_mask(assessment.threat_factors)))
+
+        def core(kwargs):
+            kwargs = dict(kwargs)
+            del kwargs["weekday"]
+            analyzer.assess_core(**kwargs)
+
+        results = {"full": measure(full, requests), "fast path": measure(core, requests)}
+        history.close()
+        grid.close()
+
+    print(f"{'path':<10} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+    for name, result in results.items():
+        print(f"{name:<10} {result[50]:8.4f} {result[90]:8.4f} {result[99]:8.4f}")
+    fast_p99 = results["fast path"][99]
+    if fast_p99 > deadline_ms:
+        print(f"fast path p99 {fast_p99:.4f} ms exceeds {deadline_ms} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
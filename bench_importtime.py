@@ -0,0 +1,73 @@
+"""
+Import-Time Benchmark
+Measures cold import cost with `python -X importtime` and fails when an
+entry point goes over its startup budget or pulls in modules it should not
+"""
+
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Entry point -> (budget in ms, modules it must not import)
+BUDGETS: Dict[str, Tuple[float, Tuple[str, ...]]] = {
+    # Scalar scoring in short-lived invocations and batch jobs
+    "safety_analyzer": (50.0, ("flask", "werkzeug", "jinja2", "numpy", "zoneinfo",
+                               "mmap", "xml", "csv", "json", "sqlite3", "threading")),
+    "route_assessment": (60.0, ("flask", "werkzeug", "numpy", "zoneinfo", "xml")),
+}
+
+
+def import_profile(module: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Import a module in a fresh interpreter
+
+    Returns:
+        (total ms for the module, {imported module: cumulative ms})
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True
+    )
+    imported = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            imported[name.strip()] = int(cumulative) / 1000.0
+    return imported.get(module, 0.0), imported
+
+
+def check(module: str, forbidden: Tuple[str, ...], runs: int = 5) -> Tuple[float, List[str]]:
+    """Best-of-runs import time and any forbidden modules it loaded"""
+    best = float("inf")
+    loaded = set()
+    for _ in range(runs):
+        total, imported = import_profile(module)
+        best = min(best, total)
+        loaded.update(imported)
+    leaked = sorted(name for name in loaded
+                    if name.split(".")[0] in forbidden)
+    return best, leaked
+
+
+def main(argv: List[str]) -> int:
+    """Command line: bench_importtime.py [module ...]"""
+    modules = argv or list(BUDGETS)
+    failed = False
+    for module in modules:
+        budget_ms, forbidden = BUDGETS.get(module, (float("inf"), ()))
+        best, leaked = check(module, forbidden)
+        status = "ok"
+        if best > budget_ms:
+            status = f"OVER BUDGET ({budget_ms:.0f} ms)"
+            failed = True
+        if leaked:
+            status = f"imports {', '.join(leaked)}"
+            failed = True
+        print(f"{module:<20} {best:8.1f} ms  {status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,119 @@
+"""
+RPC Benchmark
+Latency and throughput of scoring over the Unix-socket RPC server (single
+calls, pipelined, batched) against JSON over HTTP on localhost
+"""
+
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, List
+
+from analyzer_config import build_analyzer
+from rpc_server import RPCClient, RPCServer
+
+
+def sample(count: int) -> List[dict]:
+    rng = random.Random(5)
+    return [{
+        "hour": rng.randrange(24),
+        "latitude": 40.5 + rng.random() * 0.5,
+        "longitude": -74.3 + rng.random() * 0.6,
+        "crowd_density": rng.choice(("LOW", "MEDIUM", "HIGH")),
+        "crime_score": rng.randrange(101),
+        "movement_speed": rng.choice((0.0, 1.3, 4.2)),
+        "network_available": rng.random() < 0.8,
+        "session_id": f"session-{rng.randrange(100000)}"
+    } for _ in range(count)]
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def measure_calls(requests: List[dict], call: Callable[[dict], object]) -> dict:
+    """Per-call latency of one request at a time"""
+    latencies = []
+    started = time.perf_counter()
+    for request in requests:
+        t = time.perf_counter()
+        call(request)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - started
+    return {"p50_us": percentile(latencies, 0.5) * 1e6, "p99_us": percentile(latencies, 0.99) * 1e6,
+            "per_s": len(requests) / elapsed}
+
+
+def measure_chunks(requests: List[dict], call: Callable[[List[dict]], object],
+                   size: int) -> dict:
+    """Throughput when requests go out size at a time"""
+    started = time.perf_counter()
+    for i in range(0, len(requests), size):
+        call(requests[i:i + size])
+    elapsed = time.perf_counter() - started
+    return {"p50_us": None, "p99_us": None, "per_s": len(requests) / elapsed}
+
+
+def http_call(port: int) -> Callable[[dict], object]:
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+
+    def call(request):
+        connection.request("POST", "/api/assess", json.dumps(request),
+                           {"Content-Type": "application/json"})
+        return json.loads(connection.getresponse().read())
+    return call
+
+
+def start_http():
+    """Serve app.py with werkzeug in a thread; None when Flask is not installed"""
+    try:
+        from werkzeug.serving import make_server
+        from app import app
+    except ImportError:
+        return None
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv: List[str]) -> int:
+    """Command line: bench_rpc.py [requests]"""
+    count = int(argv[0]) if argv else 20000
+    requests = sample(count)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "safety.sock")
+        server = RPCServer(path, build_analyzer())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        with RPCClient(path) as client:
+            results["rpc single"] = measure_calls(requests, client.assess)
+            results["rpc pipelined x32"] = measure_chunks(requests, client.assess_many, 32)
+            results["rpc batch x256"] = measure_chunks(requests, client.assess_batch, 256)
+        server.shutdown()
+        server.server_close()
+
+    http_server = start_http()
+    if http_server is None:
+        print("Flask not installed; skipping the HTTP comparison")
+    else:
+        results["http json"] = measure_calls(requests[:min(count, 5000)],
+                                             http_call(http_server.server_port))
+        http_server.shutdown()
+
+    print(f"{'path':<18} {'p50 us':>8} {'p99 us':>8} {'req/s':>10}")
+    for name, r in results.items():
+        p50 = f"{r['p50_us']:8.1f}" if r["p50_us"] is not None else f"{'-':>8}"
+        p99 = f"{r['p99_us']:8.1f}" if r["p99_us"] is not None else f"{'-':>8}"
+        print(f"{name:<18} {p50} {p99} {r['per_s']:10.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,54 @@
+"""
+SOS Dispatch Benchmark
+Throughput and trigger-to-delivery latency of SOSDispatcher against stub
+notifiers with simulated network latency and transient failures
+"""
+
+import sys
+import time
+from typing import List
+
+from sos_dispatch import SOSDispatcher, StubNotifier
+
+
+def run(jobs: int, workers: int, delay_ms: float, failure_rate: float) -> dict:
+    notifiers = [StubNotifier(name, delay_s=delay_ms / 1000, failure_rate=failure_rate, seed=i)
+                 for i, name in enumerate(("webhook", "smtp", "sms"))]
+    dispatcher = SOSDispatcher(notifiers, workers=workers, backoff_s=0.01, max_backoff_s=0.1,
+                               max_attempts=10, max_pending=jobs * len(notifiers))
+    started = time.perf_counter()
+    observe_s = 0.0
+    for i in range(jobs):
+        before = time.perf_counter()
+        dispatcher.observe(f"session-{i}", "High", 40.7, -74.0, 85, ["night_time"])
+        # Repeat fixes of a session at High are deduplicated
+        dispatcher.observe(f"session-{i}", "High", 40.7, -74.0, 86, ["night_time"])
+        observe_s += time.perf_counter() - before
+    dispatcher.flush()
+    elapsed = time.perf_counter() - started
+    metrics = dispatcher.metrics()
+    dispatcher.close()
+    return {
+        "deliveries_per_s": metrics["delivered"] / elapsed,
+        "observe_us": observe_s / (2 * jobs) * 1e6,
+        **metrics
+    }
+
+
+def main(argv: List[str]) -> int:
+    """Command line: bench_sos.py [jobs] [delay_ms] [failure_rate]"""
+    jobs = int(argv[0]) if argv else 500
+    delay_ms = float(argv[1]) if len(argv) > 1 else 20.0
+    failure_rate = float(argv[2]) if len(argv) > 2 else 0.1
+    print(f"{jobs} jobs x 3 notifiers, {delay_ms} ms per send, {failure_rate:.0%} transient failures")
+    print(f"{'workers':>7} {'deliv/s':>9} {'observe us':>10} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'retries':>7} {'failed':>6}")
+    for workers in (1, 8, 32):
+        r = run(jobs, workers, delay_ms, failure_rate)
+        print(f"{workers:>7} {r['deliveries_per_s']:9.0f} {r['observe_us']:10.1f} "
+              f"{r['p50_latency_ms']:8.1f} {r['p99_latency_ms']:8.1f} {r['retries']:>7} {r['failed']:>6}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
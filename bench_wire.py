@@ -0,0 +1,103 @@
+"""
+Wire Format Benchmark
+Bytes on the wire and server CPU per /api/assess request (decode the
+request, encode the response) for JSON against the binary formats
+"""
+
+import json
+import random
+import sys
+import time
+from typing import Callable, List
+
+from safety_analyzer import CrowdDensity, SafetyAnalyzer
+from wire_format import (MSGPACK_TYPE, STRUCT_TYPE, content_types, decode_request,
+                         encode_request, encode_response)
+
+
+def sample(count: int) -> List[tuple]:
+    """(request, response data) pairs shaped like live-tracking traffic"""
+    rng = random.Random(11)
+    analyzer = SafetyAnalyzer()
+    pairs = []
+    for i in range(count):
+        request = {
+            "latitude": 40.5 + rng.random() * 0.5,
+            "longitude": -74.3 + rng.random() * 0.6,
+            "crowd_density": rng.choice(("LOW", "MEDIUM", "HIGH")),
+            "crime_score": rng.randrange(101),
+            "movement_speed": rng.choice((0.0, 1.3, 4.2)),
+            "network_available": rng.random() < 0.8,
+            "utc_timestamp": 1760000000.0 + i,
+            "accuracy": rng.choice((8.0, 15.0, 40.0)),
+            "session_id": f"session-{rng.randrange(100000)}"
+        }
+        hour = rng.randrange(24)
+        assessment = analyzer.assess_safety(
+            hour, request["latitude"], request["longitude"],
+            CrowdDensity[request["crowd_density"]], request["crime_score"],
+            request["movement_speed"], request["network_available"]
+        )
+        response = {
+            "risk_score": assessment.risk_score,
+            "risk_level": assessment.risk_level,
+            "threat_reason": assessment.threat_reason,
+            "recommended_action": assessment.recommended_action,
+            "emergency_actions": assessment.emergency_actions or [],
+            "nearest_safe_places": [],
+            "threat_factors": assessment.threat_factors,
+            "skipped_enrichments": [],
+            "next_report_after": 20.0,
+            "crowd_density": request["crowd_density"],
+            "hour": hour,
+            "timestamp": "",
+            "location": {"latitude": request["latitude"], "longitude": request["longitude"]}
+        }
+        pairs.append((request, response))
+    return pairs
+
+
+def measure(pairs: List[tuple], encode_req: Callable, decode_req: Callable,
+            encode_resp: Callable) -> dict:
+    bodies = [encode_req(request) for request, _ in pairs]
+    request_bytes = sum(len(body) for body in bodies)
+    response_bytes = 0
+    started = time.perf_counter()
+    for body, (_, response) in zip(bodies, pairs):
+        decode_req(body)
+        response_bytes += len(encode_resp(response))
+    elapsed = time.perf_counter() - started
+    return {
+        "request_bytes": request_bytes / len(pairs),
+        "response_bytes": response_bytes / len(pairs),
+        "cpu_us": elapsed / len(pairs) * 1e6
+    }
+
+
+def main(argv: List[str]) -> int:
+    """Command line: bench_wire.py [requests]"""
+    count = int(argv[0]) if argv else 20000
+    pairs = sample(count)
+    formats = {
+        "json": (lambda r: json.dumps(r).encode("utf-8"), json.loads,
+                 lambda d: json.dumps({"success": True, "data": d}).encode("utf-8")),
+        "struct": (encode_request, decode_request, encode_response)
+    }
+    if MSGPACK_TYPE in content_types():
+        import msgpack
+        formats["msgpack"] = (msgpack.packb,
+                              lambda body: decode_request(body, MSGPACK_TYPE),
+                              lambda d: encode_response(d, MSGPACK_TYPE))
+    else:
+        print("msgpack not installed; skipping it")
+
+    print(f"{'format':<8} {'req bytes':>9} {'resp bytes':>10} {'cpu us/req':>10}")
+    for name, (encode_req, decode_req, encode_resp) in formats.items():
+        r = measure(pairs, encode_req, decode_req, encode_resp)
+        print(f"{name:<8} {r['request_bytes']:9.0f} {r['response_bytes']:10.0f} {r['cpu_us']:10.2f}")
+    print(f"({STRUCT_TYPE}: fixed request header {len(encode_request({}))} bytes + session id)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,136 @@
+"""
+Temporal Crime Grid
+Crime scores keyed by (spatial cell, hour of week), memory-mapped from disk
+
+File layout (little endian):
+    header  "SAFECRIM", version u16, south f64, west f64, cell_deg f64, rows u32, cols u32
+    body    rows * cols * 168 uint8 scores, one 168-byte week per cell
+A score of 255 means "no data" and the caller's static crime score is used.
+"""
+
+import mmap
+import struct
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+MAGIC = b"SAFECRIM"
+VERSION = 1
+HEADER = struct.Struct("<8sHdddII")
+HOURS_PER_WEEK = 168
+NO_DATA = 255
+
+
+def hour_of_week(weekday: int, hour: int) -> int:
+    """Hour of week (0-167) for a weekday (0 = Monday) and hour (0-23)"""
+    return (weekday % 7) * 24 + hour % 24
+
+
+class CrimeGrid:
+    """Read-only, memory-mapped crime score grid with O(1) lookups"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.south, self.west, self.cell_deg, self.rows, self.cols = \
+            HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} crime grid")
+        if len(self._mmap) != HEADER.size + self.rows * self.cols * HOURS_PER_WEEK:
+            self.close()
+            raise ValueError(f"{path} is truncated")
+
+    def lookup(self, latitude: float, longitude: float, how: int) -> Optional[int]:
+        """Crime score (0-100) for a coordinate and hour of week, or None"""
+        row = int((latitude - self.south) // self.cell_deg)
+        col = int((longitude - self.west) // self.cell_deg)
+        if not (0 <= row < self.rows and 0 <= col < self.cols and 0 <= how < HOURS_PER_WEEK):
+            return None
+        value = self._mmap[HEADER.size + (row * self.cols + col) * HOURS_PER_WEEK + how]
+        return None if value == NO_DATA else value
+
+    def tile(self, south: float, west: float, north: float,
+             east: float) -> Tuple[int, int, int, int, bytes]:
+        """
+        Cells overlapping a bounding box, clipped to the grid
+
+        Returns:
+            (first row, first col, rows, cols, body) where body holds the
+            168 scores of each cell row by row, as in the file
+        """
+        row0 = max(0, int((south - self.south) // self.cell_deg))
+        col0 = max(0, int((west - self.west) // self.cell_deg))
+        row1 = min(self.rows - 1, int((north - self.south) // self.cell_deg))
+        col1 = min(self.cols - 1, int((east - self.west) // self.cell_deg))
+        if row1 < row0 or col1 < col0:
+            return row0, col0, 0, 0, b""
+        width = (col1 - col0 + 1) * HOURS_PER_WEEK
+        starts = (HEADER.size + (row * self.cols + col0) * HOURS_PER_WEEK
+                  for row in range(row0, row1 + 1))
+        body = b"".join(self._mmap[start:start + width] for start in starts)
+        return row0, col0, row1 - row0 + 1, col1 - col0 + 1, body
+
+    def close(self):
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def write(path: str,
+              south: float,
+              west: float,
+              cell_deg: float,
+              rows: int,
+              cols: int,
+              weeks: Dict[Tuple[int, int], Sequence[int]]):
+        """
+        Write a grid file
+
+        Args:
+            weeks: (row, col) -> 168 scores (0-100); other cells get NO_DATA
+        """
+        body = bytearray([NO_DATA]) * (rows * cols * HOURS_PER_WEEK)
+        for (row, col), week in weeks.items():
+            if len(week) != HOURS_PER_WEEK:
+                raise ValueError(f"Cell {(row, col)} needs {HOURS_PER_WEEK} scores")
+            start = (row * cols + col) * HOURS_PER_WEEK
+            body[start:start + HOURS_PER_WEEK] = bytes(min(100, max(0, int(v))) for v in week)
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, south, west, cell_deg, rows, cols))
+            f.write(body)
+
+    @classmethod
+    def build_from_incidents(cls,
+                             path: str,
+                             incidents: Iterable[Tuple[float, float, int, int]],
+                             south: float,
+                             west: float,
+                             cell_deg: float,
+                             rows: int,
+                             cols: int):
+        """
+        Write a grid scaled from incident counts
+
+        Args:
+            incidents: (latitude, longitude, weekday, hour) per incident
+        The busiest (cell, hour of week) scores 100; cells with no
+        incidents at all score 0 for every hour.
+        """
+        counts: Dict[Tuple[int, int], list] = {}
+        for latitude, longitude, weekday, hour in incidents:
+            row = int((latitude - south) // cell_deg)
+            col = int((longitude - west) // cell_deg)
+            if 0 <= row < rows and 0 <= col < cols:
+                week = counts.setdefault((row, col), [0] * HOURS_PER_WEEK)
+                week[hour_of_week(weekday, hour)] += 1
+        peak = max((max(week) for week in counts.values()), default=0) or 1
+        weeks = {
+            (row, col): [round(100 * (counts[(row, col)][h] if (row, col) in counts else 0) / peak)
+                         for h in range(HOURS_PER_WEEK)]
+            for row in range(rows) for col in range(cols)
+        }
+        cls.write(path, south, west, cell_deg, rows, cols, weeks)
@@ -0,0 +1,131 @@
+"""
+Crowd Density Estimator
+Derives crowd density from recently assessed sessions instead of self-reports
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Set
+
+from geo import geohash
+from safety_analyzer import CrowdDensity
+
+
+class _CellWindow:
+    """Distinct sessions seen in one geohash cell, bucketed by time"""
+
+    __slots__ = ("buckets", "last_bucket")
+
+    def __init__(self):
+        # bucket index -> sessions whose latest sighting fell in that bucket;
+        # insertion order is bucket order because only the newest bucket is added
+        self.buckets: Dict[int, Set[Hashable]] = {}
+        self.last_bucket: Dict[Hashable, int] = {}
+
+    def expire(self, cutoff: int):
+        """Drop buckets at or before cutoff along with their sessions"""
+        for bucket in list(self.buckets):
+            if bucket > cutoff:
+                break
+            for session in self.buckets.pop(bucket):
+                del self.last_bucket[session]
+
+    def add(self, session: Hashable, bucket: int):
+        previous = self.last_bucket.get(session)
+        if previous == bucket:
+            return
+        if previous is not None:
+            self.buckets[previous].discard(session)
+        self.buckets.setdefault(bucket, set()).add(session)
+        self.last_bucket[session] = bucket
+
+
+class CrowdDensityEstimator:
+    """
+    Sliding-window count of distinct active sessions per geohash cell
+
+    Each update is O(1) amortized: a session moves between time buckets of
+    its cell and expired buckets are dropped as the window slides. Cells
+    with no activity inside the window are evicted, so memory is bounded
+    by the number of active cells and sessions.
+    """
+
+    def __init__(self,
+                 window_s: float = 900,
+                 bucket_s: float = 60,
+                 medium_sessions: int = 5,
+                 high_sessions: int = 20,
+                 precision: int = 7):
+        """
+        Args:
+            window_s: How long a sighting keeps a session active
+            bucket_s: Time bucket width; expiry is accurate to one bucket
+            medium_sessions: Active sessions for MEDIUM density
+            high_sessions: Active sessions for HIGH density
+            precision: Geohash precision of a cell (7 is ~150 m)
+        """
+        if not 0 < bucket_s <= window_s:
+            raise ValueError("bucket_s must be positive and no larger than window_s")
+        self.bucket_s = bucket_s
+        self.window_buckets = int(round(window_s / bucket_s))
+        self.medium_sessions = medium_sessions
+        self.high_sessions = high_sessions
+        self.precision = precision
+        self._cells: "OrderedDict[str, _CellWindow]" = OrderedDict()
+        self._touched: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, now: Optional[float]) -> int:
+        return int((time.time() if now is None else now) // self.bucket_s)
+
+    def _evict_idle(self, cutoff: int):
+        """Evict cells untouched for a whole window (least recent first)"""
+        while self._cells:
+            cell = next(iter(self._cells))
+            if self._touched[cell] > cutoff:
+                break
+            del self._cells[cell]
+            del self._touched[cell]
+
+    def observe(self, session_id: Hashable, latitude: float, longitude: float,
+                now: Optional[float] = None):
+        """Record that a session was located at a coordinate"""
+        bucket = self._bucket(now)
+        cell = geohash(latitude, longitude, self.precision)
+        with self._lock:
+            window = self._cells.get(cell)
+            if window is None:
+                window = self._cells[cell] = _CellWindow()
+            else:
+                self._cells.move_to_end(cell)
+            self._touched[cell] = bucket
+            window.expire(bucket - self.window_buckets)
+            window.add(session_id, bucket)
+            self._evict_idle(bucket - self.window_buckets)
+
+    def active_sessions(self, latitude: float, longitude: float,
+                        now: Optional[float] = None) -> int:
+        """Distinct sessions seen in the coordinate's cell within the window"""
+        bucket = self._bucket(now)
+        cell = geohash(latitude, longitude, self.precision)
+        with self._lock:
+            window = self._cells.get(cell)
+            if window is None:
+                return 0
+            window.expire(bucket - self.window_buckets)
+            return len(window.last_bucket)
+
+    def estimate(self, latitude: float, longitude: float,
+                 now: Optional[float] = None) -> CrowdDensity:
+        """Crowd density implied by the active session count"""
+        count = self.active_sessions(latitude, longitude, now)
+        if count >= self.high_sessions:
+            return CrowdDensity.HIGH
+        if count >= self.medium_sessions:
+            return CrowdDensity.MEDIUM
+        return CrowdDensity.LOW
+
+    def __len__(self):
+        """Number of cells currently tracked"""
+        return len(self._cells)
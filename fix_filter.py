@@ -0,0 +1,175 @@
+"""
+GPS Fix Filter
+Per-session smoothing and deduplication of position fixes in front of the
+analyzer
+
+Phones in watchPosition mode send jittery, near-duplicate fixes. Positions
+are smoothed with a per-session Kalman filter weighted by the reported
+accuracy; fixes that are too inaccurate, too soon, or too close to the last
+scored one (with the other inputs unchanged) are absorbed and answered
+with the session's last response instead of being rescored.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable, Optional
+
+from geo import haversine_m
+
+# Reasons a fix was absorbed
+INACCURATE = "inaccurate"
+TOO_SOON = "too_soon"
+NO_MOVEMENT = "no_movement"
+
+
+@dataclass
+class FilteredFix:
+    latitude: float                 # smoothed position to score
+    longitude: float
+    absorbed: Optional[str] = None  # reason, or None when the fix should be scored
+    response: Any = None            # last response of the session when absorbed
+
+
+class _FixState:
+    """Kalman state and last scored fix of one session"""
+    __slots__ = ("latitude", "longitude", "variance", "timestamp",
+                 "scored_latitude", "scored_longitude", "scored_at", "signature", "response")
+
+    def __init__(self, latitude: float, longitude: float, variance: float, timestamp: float):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.variance = variance    # position variance, m^2
+        self.timestamp = timestamp
+        self.scored_latitude = latitude
+        self.scored_longitude = longitude
+        self.scored_at = timestamp
+        self.signature: Hashable = None
+        self.response: Any = None
+
+
+class FixFilter:
+    """
+    Smooths each session's fixes and absorbs the ones not worth rescoring
+
+    A fix is absorbed when the session has a response to reuse, its
+    signature (the non-position inputs, e.g. hour, density, crime score)
+    is unchanged, and either its reported accuracy is worse than
+    max_accuracy_m, it arrives within min_interval_s of the last scored
+    fix, or its smoothed position is within min_displacement_m of the last
+    scored one and max_interval_s has not passed.
+    """
+
+    def __init__(self,
+                 min_displacement_m: float = 10.0,
+                 min_interval_s: float = 1.0,
+                 max_interval_s: float = 30.0,
+                 max_accuracy_m: float = 100.0,
+                 default_accuracy_m: float = 20.0,
+                 process_noise_mps: float = 1.5,
+                 max_sessions: int = 100000):
+        """
+        Args:
+            min_displacement_m: Smoothed movement that forces a rescore
+            min_interval_s: Fixes sooner than this after a scored one are absorbed
+            max_interval_s: A fix this long after the last scored one is
+                always rescored
+            max_accuracy_m: Fixes reporting a worse accuracy are rejected
+            default_accuracy_m: Accuracy assumed when a fix does not report one
+            process_noise_mps: Expected movement uncertainty per second
+                (higher follows the raw fixes more closely)
+            max_sessions: Sessions tracked (least recently seen dropped)
+        """
+        self.min_displacement_m = min_displacement_m
+        self.min_interval_s = min_interval_s
+        self.max_interval_s = max_interval_s
+        self.max_accuracy_m = max_accuracy_m
+        self.default_accuracy_m = default_accuracy_m
+        self.process_noise_mps = process_noise_mps
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, _FixState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.passed = 0
+        self.suppressed = {INACCURATE: 0, TOO_SOON: 0, NO_MOVEMENT: 0}
+
+    def filter(self, session_id: str, latitude: float, longitude: float,
+               accuracy_m: Optional[float] = None, signature: Hashable = None,
+               now: Optional[float] = None) -> FilteredFix:
+        """
+        Smooth one fix and decide whether it needs scoring
+
+        Pair a fix that is not absorbed with remember() once it is scored.
+        """
+        now = time.time() if now is None else now
+        accuracy_m = self.default_accuracy_m if accuracy_m is None else accuracy_m
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = self._sessions[session_id] = _FixState(latitude, longitude,
+                                                                accuracy_m ** 2, now)
+                if len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                return self._pass(state, signature)
+            self._sessions.move_to_end(session_id)
+            reusable = state.response is not None and state.signature == signature
+
+            if accuracy_m > self.max_accuracy_m and reusable:
+                return self._absorb(state, INACCURATE)
+            self._smooth(state, latitude, longitude, accuracy_m, now)
+
+            if reusable:
+                elapsed = now - state.scored_at
+                if elapsed < self.min_interval_s:
+                    return self._absorb(state, TOO_SOON)
+                if elapsed < self.max_interval_s and haversine_m(
+                        state.scored_latitude, state.scored_longitude,
+                        state.latitude, state.longitude) < self.min_displacement_m:
+                    return self._absorb(state, NO_MOVEMENT)
+            state.scored_latitude = state.latitude
+            state.scored_longitude = state.longitude
+            state.scored_at = now
+            return self._pass(state, signature)
+
+    def _smooth(self, state: _FixState, latitude: float, longitude: float,
+                accuracy_m: float, now: float):
+        # Constant-position Kalman filter: uncertainty grows with elapsed
+        # time, and the gain weighs the fix by its reported accuracy
+        dt = max(0.0, now - state.timestamp)
+        variance = state.variance + (self.process_noise_mps * dt) ** 2
+        gain = variance / (variance + accuracy_m ** 2)
+        state.latitude += gain * (latitude - state.latitude)
+        state.longitude += gain * (longitude - state.longitude)
+        state.variance = (1.0 - gain) * variance
+        state.timestamp = max(state.timestamp, now)
+
+    def _pass(self, state: _FixState, signature: Hashable) -> FilteredFix:
+        # Caller holds self._lock
+        state.signature = signature
+        state.response = None
+        self.passed += 1
+        return FilteredFix(state.latitude, state.longitude)
+
+    def _absorb(self, state: _FixState, reason: str) -> FilteredFix:
+        # Caller holds self._lock
+        self.suppressed[reason] += 1
+        return FilteredFix(state.latitude, state.longitude, reason, state.response)
+
+    def remember(self, session_id: str, response: Any):
+        """Keep the response of a scored fix to answer absorbed ones with"""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is not None:
+                state.response = response
+
+    def metrics(self) -> dict:
+        with self._lock:
+            suppressed = sum(self.suppressed.values())
+            return {
+                "sessions": len(self._sessions),
+                "passed": self.passed,
+                "suppressed": suppressed,
+                "suppressed_by_reason": dict(self.suppressed),
+                "suppressed_ratio": round(suppressed / (suppressed + self.passed), 3)
+                if suppressed + self.passed else 0.0
+            }
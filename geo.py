@@ -0,0 +1,99 @@
+"""
+Geographic helpers shared by the route, routing and lookup modules
+Distances are great-circle (haversine) in meters
+"""
+
+import math
+from typing import List, Tuple
+
+EARTH_RADIUS_M = 6371008.8
+
+LatLon = Tuple[float, float]
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in meters"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def densify(points: List[LatLon], step_m: float) -> List[LatLon]:
+    """
+    Insert intermediate points so no leg is longer than step_m
+    Interpolation is linear in lat/lon, which is accurate at street scale
+    """
+    if step_m <= 0:
+        raise ValueError("step_m must be positive")
+    if len(points) < 2:
+        return list(points)
+
+    dense = [points[0]]
+    for (lat1, lon1), (lat2, lon2) in zip(points, points[1:]):
+        pieces = max(1, int(math.ceil(haversine_m(lat1, lon1, lat2, lon2) / step_m)))
+        for i in range(1, pieces + 1):
+            f = i / pieces
+            dense.append((lat1 + (lat2 - lat1) * f, lon1 + (lon2 - lon1) * f))
+    return dense
+
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(latitude: float, longitude: float, precision: int = 7) -> str:
+    """Encode a coordinate as a geohash (precision 7 is a ~150 m cell)"""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if longitude >= mid:
+                value = value * 2 + 1
+                lon_lo = mid
+            else:
+                value = value * 2
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if latitude >= mid:
+                value = value * 2 + 1
+                lat_lo = mid
+            else:
+                value = value * 2
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def point_in_ring(latitude: float, longitude: float, ring: List[LatLon]) -> bool:
+    """Ray-casting test of a point against a closed or open (lat, lon) ring"""
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        lat_i, lon_i = ring[i]
+        lat_j, lon_j = ring[j]
+        if (lat_i > latitude) != (lat_j > latitude):
+            crossing = lon_i + (latitude - lat_i) * (lon_j - lon_i) / (lat_j - lat_i)
+            if longitude < crossing:
+                inside = not inside
+        j = i
+    return inside
+
+
+def point_in_polygon(latitude: float, longitude: float, rings: List[List[LatLon]]) -> bool:
+    """Point-in-polygon for an outer ring followed by optional hole rings"""
+    if not rings or not point_in_ring(latitude, longitude, rings[0]):
+        return False
+    return not any(point_in_ring(latitude, longitude, hole) for hole in rings[1:])
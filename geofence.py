@@ -0,0 +1,212 @@
+"""
+Geofence Engine
+Evaluates streaming positions against user-defined zones and reports
+per-session enter/exit events
+
+Zones come from a GeoJSON FeatureCollection whose features carry "id",
+"kind" ("danger" or "safe"), optional "risk" (0-1) and "name" properties.
+"""
+
+import json
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from geo import LatLon, point_in_polygon
+
+Rings = List[List[LatLon]]
+
+DANGER = "danger"
+SAFE = "safe"
+ZONE_KINDS = (DANGER, SAFE)
+
+
+@dataclass
+class Zone:
+    zone_id: str
+    kind: str
+    polygons: List[Rings]
+    risk: float = 1.0
+    name: str = ""
+    bbox: Tuple[float, float, float, float] = field(init=False)   # south, west, north, east
+
+    def __post_init__(self):
+        if self.kind not in ZONE_KINDS:
+            raise ValueError(f"zone {self.zone_id}: kind must be one of {', '.join(ZONE_KINDS)}")
+        if not 0.0 <= self.risk <= 1.0:
+            raise ValueError(f"zone {self.zone_id}: risk must be between 0 and 1")
+        if not self.polygons or not all(rings and len(rings[0]) >= 3 for rings in self.polygons):
+            raise ValueError(f"zone {self.zone_id}: needs at least one ring of 3 points")
+        lats = [lat for rings in self.polygons for lat, _ in rings[0]]
+        lons = [lon for rings in self.polygons for _, lon in rings[0]]
+        self.bbox = (min(lats), min(lons), max(lats), max(lons))
+
+    def contains(self, latitude: float, longitude: float) -> bool:
+        south, west, north, east = self.bbox
+        if not (south <= latitude <= north and west <= longitude <= east):
+            return False
+        return any(point_in_polygon(latitude, longitude, rings) for rings in self.polygons)
+
+
+@dataclass
+class GeofenceEvent:
+    session_id: str
+    zone_id: str
+    kind: str
+    event: str          # "enter" or "exit"
+    alert: bool         # entering a danger zone or leaving a safe zone
+    timestamp: Optional[float] = None
+
+
+class ZoneIndex:
+    """
+    Grid over zone bounding boxes
+
+    Each cell lists the zones whose bounding box overlaps it, so a lookup
+    costs a dict hit plus point-in-polygon tests against the few zones near
+    the point, independent of the total zone count. Zones spanning more than
+    max_cells_per_zone cells are kept in a short list checked by bounding box.
+    """
+
+    def __init__(self,
+                 zones: List[Zone],
+                 cell_deg: float = 0.01,
+                 max_cells_per_zone: int = 4096):
+        """
+        Args:
+            zones: Zones to index
+            cell_deg: Grid cell size in degrees (0.01 is ~1 km)
+            max_cells_per_zone: Largest zone (in cells) placed in the grid
+        """
+        self.by_id = {zone.zone_id: zone for zone in zones}
+        if len(self.by_id) != len(zones):
+            raise ValueError("zone ids must be unique")
+        self.zones = zones
+        self.cell_deg = cell_deg
+        self.large: Tuple[int, ...] = ()
+
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        large = []
+        for z, zone in enumerate(zones):
+            south, west, north, east = zone.bbox
+            rows = range(self._cell(south), self._cell(north) + 1)
+            cols = range(self._cell(west), self._cell(east) + 1)
+            if len(rows) * len(cols) > max_cells_per_zone:
+                large.append(z)
+                continue
+            for row in rows:
+                for col in cols:
+                    cells.setdefault((row, col), []).append(z)
+        self.cells: Dict[Tuple[int, int], Tuple[int, ...]] = {
+            cell: tuple(candidates) for cell, candidates in cells.items()
+        }
+        self.large = tuple(large)
+
+    def _cell(self, degrees: float) -> int:
+        return int(math.floor(degrees / self.cell_deg))
+
+    def zones_at(self, latitude: float, longitude: float) -> List[Zone]:
+        """Zones containing a coordinate, in index order"""
+        candidates = self.cells.get((self._cell(latitude), self._cell(longitude)), ())
+        if self.large:
+            candidates = tuple(sorted(candidates + self.large))
+        return [self.zones[z] for z in candidates if self.zones[z].contains(latitude, longitude)]
+
+    def __len__(self) -> int:
+        return len(self.zones)
+
+    @classmethod
+    def load(cls, path: str, cell_deg: float = 0.01) -> "ZoneIndex":
+        """Load a GeoJSON FeatureCollection of zones"""
+        with open(path, "r", encoding="utf-8") as f:
+            collection = json.load(f)
+        zones = []
+        for feature in collection["features"]:
+            geometry = feature["geometry"]
+            polygons = geometry["coordinates"]
+            if geometry["type"] == "Polygon":
+                polygons = [polygons]
+            properties = feature.get("properties") or {}
+            zones.append(Zone(
+                zone_id=str(properties.get("id", feature.get("id", len(zones)))),
+                kind=properties.get("kind", DANGER),
+                polygons=[[[(lat, lon) for lon, lat in ring] for ring in polygon]
+                          for polygon in polygons],
+                risk=float(properties.get("risk", 1.0)),
+                name=properties.get("name", "")
+            ))
+        return cls(zones, cell_deg=cell_deg)
+
+
+def zone_risk(zones: List[Zone]) -> Optional[float]:
+    """
+    Geofence factor risk for the zones containing a position
+
+    The highest danger zone risk; 0.0 inside only safe zones; None outside
+    every zone (the factor is then not scored).
+    """
+    if not zones:
+        return None
+    return max((zone.risk for zone in zones if zone.kind == DANGER), default=0.0)
+
+
+class GeofenceTracker:
+    """
+    Per-session zone membership with enter/exit edge detection
+
+    Each session keeps the set of zone ids it was last inside; a fix emits
+    an event for every zone entered or left since. Sessions are bounded,
+    least recently seen dropped first.
+    """
+
+    def __init__(self, index: ZoneIndex, max_sessions: int = 100000):
+        self.index = index
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, FrozenSet[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.events = 0
+        self.alerts = 0
+
+    def update(self, session_id: str, latitude: float, longitude: float,
+               timestamp: Optional[float] = None) -> Tuple[List[Zone], List[GeofenceEvent]]:
+        """
+        Feed one position fix
+
+        Returns:
+            (zones containing the fix, enter/exit events since the last fix)
+        """
+        zones = self.index.zones_at(latitude, longitude)
+        inside = frozenset(zone.zone_id for zone in zones)
+        with self._lock:
+            before = self._sessions.get(session_id, frozenset())
+            self._sessions[session_id] = inside
+            self._sessions.move_to_end(session_id)
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        if inside == before:
+            return zones, []
+
+        events = []
+        for zone_id in sorted(before - inside):
+            zone = self.index.by_id[zone_id]
+            events.append(GeofenceEvent(session_id, zone_id, zone.kind, "exit",
+                                        zone.kind == SAFE, timestamp))
+        for zone_id in sorted(inside - before):
+            zone = self.index.by_id[zone_id]
+            events.append(GeofenceEvent(session_id, zone_id, zone.kind, "enter",
+                                        zone.kind == DANGER, timestamp))
+        with self._lock:
+            self.events += len(events)
+            self.alerts += sum(event.alert for event in events)
+        return zones, events
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "zones": len(self.index),
+                "sessions": len(self._sessions),
+                "events": self.events,
+                "alerts": self.alerts
+            }
@@ -0,0 +1,39 @@
+"""
+Gunicorn configuration
+Loaded automatically by `gunicorn app:app` (Procfile, render.yaml)
+"""
+
+import gc
+import os
+
+# Import the app once in the master: the analyzer, its indexes and the road
+# graph are built before fork and shared copy-on-write by every worker
+preload_app = True
+# Tells app.py to leave background threads to post_fork
+os.environ.setdefault('SAFETY_PRELOAD', 'true')
+
+# No collections in the master until the heap is frozen, so preloaded
+# objects are not scattered among freed pages
+gc.disable()
+
+
+def when_ready(server):
+    """Master, before the first fork: finish loading and freeze the heap"""
+    import app
+    app.warmup()
+    # Frozen objects are skipped by the workers' collector, which would
+    # otherwise write to (and so copy) every page holding them
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Start the worker's own background threads"""
+    gc.enable()
+    import app
+    app.start_background()
+
+
+def worker_exit(server, worker):
+    """Flush the worker's queued history before it exits"""
+    import app
+    app.shutdown()
@@ -0,0 +1,237 @@
+"""
+Load Shedding
+Per-client rate limiting and priority-aware admission for overload
+
+Under overload, low-priority requests (repeat polls, history reads) are
+refused first and sessions currently at High risk last.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# Request priorities, lowest first
+PRIORITY_LOW = 0        # repeat polls, history reads
+PRIORITY_NORMAL = 1     # ordinary assessments
+PRIORITY_CRITICAL = 2   # sessions whose last assessment was High
+PRIORITIES = ("low", "normal", "critical")
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket per client: `rate` requests per second with bursts of `burst`
+
+    With a path, buckets live in a SQLite file so every worker on the host
+    draws from the same buckets; without one they are per process.
+    """
+
+    def __init__(self,
+                 rate: float,
+                 burst: float,
+                 path: Optional[str] = None,
+                 max_clients: int = 100000):
+        """
+        Args:
+            rate: Tokens added per second
+            burst: Bucket size (largest burst allowed)
+            path: SQLite file shared by the workers, or None for in-process
+            max_clients: In-process buckets kept before full ones are pruned
+                (then the least recently used, down to 3/4 of this)
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.path = path
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._calls = 0
+        self.limited = 0
+        self.errors = 0
+        if path is not None:
+            self._connection()   # create the table up front
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread and process (connections do not survive fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")   # losing limiter state is harmless
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets "
+                         "(client TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _take(self, tokens: float, updated: float, now: float, cost: float) -> Tuple[float, float]:
+        tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+        if tokens >= cost:
+            return tokens - cost, 0.0
+        return tokens, (cost - tokens) / self.rate
+
+    def acquire(self, client: str, cost: float = 1.0, now: Optional[float] = None) -> float:
+        """
+        Take `cost` tokens from a client's bucket
+
+        Returns:
+            0.0 when allowed, else seconds until the request would be
+        """
+        # Wall clock, as buckets are shared between processes
+        now = time.time() if now is None else now
+        self._calls += 1
+        idle_s = self.burst / self.rate   # a bucket untouched this long is full
+        if self.path is None:
+            with self._lock:
+                tokens, updated = self._buckets.get(client, (self.burst, now))
+                tokens, wait = self._take(tokens, updated, now, cost)
+                self._buckets[client] = (tokens, now)
+                self._buckets.move_to_end(client)
+                if len(self._buckets) > self.max_clients:
+                    # Evicting past the limit keeps this rebuild rare while
+                    # every client is active
+                    self._buckets = OrderedDict(
+                        (key, value) for key, value in self._buckets.items()
+                        if now - value[1] < idle_s)
+                    while len(self._buckets) > self.max_clients * 3 // 4:
+                        self._buckets.popitem(last=False)
+        else:
+            try:
+                conn = self._connection()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = conn.execute("SELECT tokens, updated FROM buckets WHERE client = ?",
+                                       (client,)).fetchone()
+                    tokens, updated = row if row is not None else (self.burst, now)
+                    tokens, wait = self._take(tokens, updated, now, cost)
+                    conn.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)",
+                                 (client, tokens, now))
+                    if self._calls % 1024 == 0:
+                        conn.execute("DELETE FROM buckets WHERE updated < ?", (now - idle_s,))
+                finally:
+                    conn.execute("COMMIT")
+            except sqlite3.Error:
+                # Fail open: a busy or broken limiter store must not take
+                # the service down with it
+                self.errors += 1
+                return 0.0
+        if wait:
+            self.limited += 1
+        return wait
+
+    def metrics(self) -> dict:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "shared": self.path is not None,
+            "limited": self.limited,
+            "errors": self.errors
+        }
+
+
+class SessionPriorities:
+    """
+    Priority of a session's next request from its recent history
+
+    A session whose last assessment was High is critical; one assessed again
+    within poll_interval_s is a repeat poll and low; others are normal.
+    """
+
+    def __init__(self, poll_interval_s: float = 5.0, max_sessions: int = 100000):
+        """
+        Args:
+            poll_interval_s: Re-assessments sooner than this count as polls
+            max_sessions: Sessions remembered (least recently seen dropped)
+        """
+        self.poll_interval_s = poll_interval_s
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def priority(self, session_id: str, now: Optional[float] = None) -> int:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            last = self._sessions.get(session_id)
+        if last is None:
+            return PRIORITY_NORMAL
+        level, seen = last
+        if level == "High":
+            return PRIORITY_CRITICAL
+        if now - seen < self.poll_interval_s:
+            return PRIORITY_LOW
+        return PRIORITY_NORMAL
+
+    def record(self, session_id: str, risk_level: str, now: Optional[float] = None):
+        """Remember a session's latest assessed level"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._sessions[session_id] = (risk_level, now)
+            self._sessions.move_to_end(session_id)
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+
+class LoadShedder:
+    """
+    Admits requests by priority while the worker is loaded
+
+    Load is the larger of in-flight requests / max_in_flight and, when the
+    proxy reports it, queueing delay / max_queue_delay_ms (sync workers
+    handle one request at a time, so only queueing shows their overload).
+    Low priority is shed from low_load, normal priority from 1.0 and
+    critical never.
+    """
+
+    def __init__(self,
+                 max_in_flight: int = 32,
+                 max_queue_delay_ms: Optional[float] = None,
+                 low_load: float = 0.5):
+        """
+        Args:
+            max_in_flight: Concurrent requests at full load
+            max_queue_delay_ms: Queueing delay at full load, if measured
+            low_load: Load from which low-priority requests are shed
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queue_delay_ms = max_queue_delay_ms
+        self.low_load = low_load
+        self.in_flight = 0
+        self.admitted = [0] * len(PRIORITIES)
+        self.shed = [0] * len(PRIORITIES)
+        self._lock = threading.Lock()
+
+    def load(self, queue_delay_ms: Optional[float] = None) -> float:
+        load = self.in_flight / self.max_in_flight
+        if queue_delay_ms is not None and self.max_queue_delay_ms:
+            load = max(load, queue_delay_ms / self.max_queue_delay_ms)
+        return load
+
+    def admit(self, priority: int, queue_delay_ms: Optional[float] = None) -> bool:
+        """Admit a request (pair with release()) or shed it"""
+        with self._lock:
+            load = self.load(queue_delay_ms)
+            if (priority == PRIORITY_LOW and load >= self.low_load) or \
+                    (priority == PRIORITY_NORMAL and load >= 1.0):
+                self.shed[priority] += 1
+                return False
+            self.in_flight += 1
+            self.admitted[priority] += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "admitted": dict(zip(PRIORITIES, self.admitted)),
+                "shed": dict(zip(PRIORITIES, self.shed))
+            }
@@ -0,0 +1,102 @@
+"""
+Micro-Batcher
+Coalesces concurrent assessment requests into one SafetyAnalyzer.assess_batch call
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
+
+from safety_analyzer import SafetyAnalyzer, SafetyAssessment
+
+
+class MicroBatcher:
+    """
+    Gathers requests for up to max_wait_ms (or max_batch items) and scores
+    them together on a background thread
+
+    A larger window trades per-request latency for throughput; max_wait_ms=0
+    still coalesces whatever arrived while the previous batch was scoring.
+    """
+
+    def __init__(self,
+                 analyzer: SafetyAnalyzer,
+                 max_batch: int = 32,
+                 max_wait_ms: float = 2.0):
+        """
+        Args:
+            analyzer: Analyzer whose assess_batch scores each batch
+            max_batch: Most requests scored together
+            max_wait_ms: Longest the first request of a batch waits for company
+        """
+        self.analyzer = analyzer
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending: List[Tuple[dict, Future]] = []
+        self._cond = threading.Condition()
+        self._closing = False
+        self.batches = 0
+        self.items = 0
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, **kwargs) -> Future:
+        """Queue one assess_safety call; the Future resolves to its SafetyAssessment"""
+        future: Future = Future()
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("MicroBatcher is closed")
+            self._pending.append((kwargs, future))
+            self._cond.notify()
+        return future
+
+    def assess(self, timeout: Optional[float] = None, **kwargs) -> SafetyAssessment:
+        """Submit and wait for the result"""
+        return self.submit(**kwargs).result(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closing)
+                if not self._pending:
+                    return
+                deadline = time.monotonic() + self.max_wait
+                while len(self._pending) < self.max_batch and not self._closing:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        break
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+
+            try:
+                results = self.analyzer.assess_batch([kwargs for kwargs, _ in batch])
+            except Exception:
+                # Isolate the failing request instead of failing the whole batch
+                results = None
+            for i, (kwargs, future) in enumerate(batch):
+                if results is not None:
+                    future.set_result(results[i])
+                    continue
+                try:
+                    future.set_result(self.analyzer.assess_safety(**kwargs))
+                except Exception as e:
+                    future.set_exception(e)
+            self.batches += 1
+            self.items += len(batch)
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """Score what is queued and stop the worker"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._worker.join(timeout)
+
+    def metrics(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000
+        }
@@ -0,0 +1,188 @@
+"""
+Movement Anomaly Detection
+Streaming per-session statistics over position fixes that flag an abrupt
+stop after fast movement or an erratic path
+
+Each session keeps a fixed handful of numbers (EWMA speed, EWMA heading
+vector, dwell start), so a fix costs O(1) time and memory regardless of
+how long the session has been tracked.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from geo import haversine_m
+
+
+def bearing_rad(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Initial bearing from the first point to the second, radians clockwise from north"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dlmb = math.radians(lon2 - lon1)
+    y = math.sin(dlmb) * math.cos(phi2)
+    x = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(dlmb)
+    return math.atan2(y, x)
+
+
+class _Trace:
+    """Rolling movement state of one session"""
+    __slots__ = ("latitude", "longitude", "since", "timestamp", "speed",
+                 "heading_x", "heading_y", "headings", "stopped", "speed_before_stop")
+
+    def __init__(self, latitude: float, longitude: float, timestamp: float):
+        # Anchor: the last position that was min_move_m from the one before,
+        # and when it was reached; the session has dwelt there since
+        self.latitude = latitude
+        self.longitude = longitude
+        self.since = timestamp
+        self.timestamp = timestamp      # latest fix
+        self.speed = 0.0                # EWMA speed between anchors, m/s
+        self.heading_x = 0.0            # EWMA of heading unit vectors
+        self.heading_y = 0.0
+        self.headings = 0               # heading samples seen (capped)
+        self.stopped = False
+        self.speed_before_stop = 0.0
+
+
+class MovementAnomalyDetector:
+    """
+    Movement anomaly signal (0-1) per session from its stream of fixes
+
+    - Abrupt stop: the session has stayed within min_move_m of one spot for
+      stop_after_s, and its EWMA speed just before was running pace
+      (run_speed_mps to max_foot_speed_mps). Stops from walking pace (a red
+      light) or vehicle speeds are not flagged. The signal holds for
+      stop_hold_s of dwell.
+    - Erratic path: while moving, the circular variance of recent headings
+      (1 minus the length of their EWMA unit vector) above heading_variance
+      scales the signal up to 1.
+    """
+
+    def __init__(self,
+                 alpha: float = 0.3,
+                 run_speed_mps: float = 2.5,
+                 max_foot_speed_mps: float = 7.0,
+                 stop_after_s: float = 10.0,
+                 stop_hold_s: float = 300.0,
+                 min_move_m: float = 5.0,
+                 heading_variance: float = 0.6,
+                 min_headings: int = 5,
+                 max_gap_s: float = 600.0,
+                 max_sessions: int = 100000):
+        """
+        Args:
+            alpha: EWMA weight of the newest fix
+            run_speed_mps: EWMA speed before a stop that makes it abrupt
+            max_foot_speed_mps: Faster than this the session is in a vehicle
+            stop_after_s: Dwell that counts as a stop
+            stop_hold_s: Dwell after an abrupt stop during which it is flagged
+            min_move_m: Displacement that counts as movement (smaller moves
+                are GPS jitter)
+            heading_variance: Circular heading variance treated as normal
+            min_headings: Heading samples needed before the path is judged
+            max_gap_s: A longer gap between fixes restarts the session's
+                statistics
+            max_sessions: Sessions tracked (least recently seen dropped)
+        """
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.run_speed_mps = run_speed_mps
+        self.max_foot_speed_mps = max_foot_speed_mps
+        self.stop_after_s = stop_after_s
+        self.stop_hold_s = stop_hold_s
+        self.min_move_m = min_move_m
+        self.heading_variance = heading_variance
+        self.min_headings = min_headings
+        self.max_gap_s = max_gap_s
+        self.max_sessions = max_sessions
+        self._traces: "OrderedDict[str, _Trace]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.fixes = 0
+        self.anomalies = 0
+
+    def update(self, session_id: str, latitude: float, longitude: float,
+               timestamp: Optional[float] = None) -> float:
+        """
+        Feed one fix
+
+        Returns:
+            Anomaly signal, 0.0 (normal) to 1.0
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            self.fixes += 1
+            trace = self._traces.get(session_id)
+            if trace is not None and timestamp <= trace.timestamp:
+                return self._signal(trace, timestamp)   # duplicate or out of order
+            if trace is None or timestamp - trace.timestamp > self.max_gap_s:
+                self._traces[session_id] = _Trace(latitude, longitude, timestamp)
+                self._traces.move_to_end(session_id)
+                if len(self._traces) > self.max_sessions:
+                    self._traces.popitem(last=False)
+                return 0.0
+            self._traces.move_to_end(session_id)
+            self._advance(trace, latitude, longitude, timestamp)
+            signal = self._signal(trace, timestamp)
+            if signal > 0.0:
+                self.anomalies += 1
+            return signal
+
+    def _advance(self, trace: _Trace, latitude: float, longitude: float, timestamp: float):
+        trace.timestamp = timestamp
+        distance = haversine_m(trace.latitude, trace.longitude, latitude, longitude)
+        if distance < self.min_move_m:
+            # Still within jitter of the anchor: dwelling
+            if not trace.stopped and timestamp - trace.since >= self.stop_after_s:
+                trace.stopped = True
+                trace.speed_before_stop = trace.speed
+                trace.speed = 0.0
+            return
+
+        a = self.alpha
+        speed = distance / (timestamp - trace.since)
+        trace.speed = a * speed + (1 - a) * trace.speed
+        heading = bearing_rad(trace.latitude, trace.longitude, latitude, longitude)
+        trace.heading_x = a * math.cos(heading) + (1 - a) * trace.heading_x
+        trace.heading_y = a * math.sin(heading) + (1 - a) * trace.heading_y
+        trace.headings = min(trace.headings + 1, self.min_headings)
+        trace.latitude = latitude
+        trace.longitude = longitude
+        trace.since = timestamp
+        trace.stopped = False
+
+    def _signal(self, trace: _Trace, timestamp: float) -> float:
+        if trace.stopped:
+            if self.run_speed_mps <= trace.speed_before_stop <= self.max_foot_speed_mps and \
+                    timestamp - trace.since <= self.stop_hold_s:
+                return 1.0
+            return 0.0
+        if trace.headings < self.min_headings:
+            return 0.0
+        variance = 1.0 - math.hypot(trace.heading_x, trace.heading_y)
+        if variance <= self.heading_variance:
+            return 0.0
+        return min(1.0, (variance - self.heading_variance) / (1.0 - self.heading_variance))
+
+    def session_stats(self, session_id: str) -> Optional[dict]:
+        """Current rolling statistics of a session, or None if untracked"""
+        with self._lock:
+            trace = self._traces.get(session_id)
+            if trace is None:
+                return None
+            return {
+                "speed_mps": round(trace.speed, 3),
+                "heading_variance": round(1.0 - math.hypot(trace.heading_x, trace.heading_y), 3),
+                "dwell_s": round(trace.timestamp - trace.since, 1)
+            }
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._traces),
+                "fixes": self.fixes,
+                "anomalies": self.anomalies
+            }
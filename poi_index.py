@@ -0,0 +1,124 @@
+"""
+Safe Place Index
+Nearest police stations, hospitals and 24h stores from a local POI file
+"""
+
+import csv
+import json
+import math
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from geo import EARTH_RADIUS_M, haversine_m
+
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+
+@dataclass
+class SafePlace:
+    name: str
+    category: str
+    latitude: float
+    longitude: float
+
+    def to_dict(self, distance_m: float) -> dict:
+        return {
+            "name": self.name,
+            "category": self.category,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "distance_m": round(distance_m, 1)
+        }
+
+
+class SafePlaceIndex:
+    """Grid-bucketed spatial index answering nearest-N queries by haversine distance"""
+
+    def __init__(self, places: Iterable[SafePlace], cell_deg: float = 0.01):
+        """
+        Args:
+            places: Safe places to index
+            cell_deg: Bucket size in degrees (0.01 is roughly 1 km)
+        """
+        self.cell_deg = cell_deg
+        self.places: List[SafePlace] = list(places)
+        self.cols = int(math.ceil(360 / cell_deg))
+        self.buckets: Dict[Tuple[int, int], List[int]] = {}
+        for i, place in enumerate(self.places):
+            self.buckets.setdefault(self._cell(place.latitude, place.longitude), []).append(i)
+
+    def __len__(self):
+        return len(self.places)
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        row = int(math.floor(latitude / self.cell_deg))
+        col = int(math.floor((longitude + 180) / self.cell_deg)) % self.cols
+        return row, col
+
+    def nearest(self,
+                latitude: float,
+                longitude: float,
+                n: int = 3,
+                max_distance_m: float = 5000,
+                categories: Optional[Iterable[str]] = None) -> List[Tuple[SafePlace, float]]:
+        """
+        Find the n closest places within max_distance_m
+
+        Searches rings of buckets outward from the query cell and stops once
+        no unvisited ring can hold anything closer than the current n-th hit.
+
+        Returns:
+            (place, distance_m) pairs, closest first
+        """
+        if n <= 0 or not self.places:
+            return []
+        wanted = set(categories) if categories else None
+        row0, col0 = self._cell(latitude, longitude)
+
+        # Smallest ground width of one bucket near the query point
+        cos_lat = math.cos(math.radians(min(89.9, abs(latitude) + self.cell_deg)))
+        cell_m = self.cell_deg * METERS_PER_DEGREE * cos_lat
+        max_ring = min(self.cols // 2, int(max_distance_m / cell_m) + 1)
+
+        found: List[Tuple[float, int]] = []
+        for ring in range(max_ring + 1):
+            for row in range(row0 - ring, row0 + ring + 1):
+                edge_row = row in (row0 - ring, row0 + ring)
+                step = 1 if edge_row else 2 * ring
+                for col in range(col0 - ring, col0 + ring + 1, step):
+                    for i in self.buckets.get((row, col % self.cols), ()):
+                        place = self.places[i]
+                        if wanted is not None and place.category not in wanted:
+                            continue
+                        distance = haversine_m(latitude, longitude, place.latitude, place.longitude)
+                        if distance <= max_distance_m:
+                            found.append((distance, i))
+            if len(found) >= n:
+                found.sort()
+                # Anything in ring + 1 or beyond is at least ring * cell_m away
+                if found[n - 1][0] <= ring * cell_m:
+                    break
+        found.sort()
+        return [(self.places[i], distance) for distance, i in found[:n]]
+
+    @classmethod
+    def load(cls, path: str, cell_deg: float = 0.01) -> "SafePlaceIndex":
+        """
+        Load places from a CSV (name,category,latitude,longitude columns)
+        or JSON (list of objects with the same keys) file
+        """
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            if path.lower().endswith(".json"):
+                rows = json.load(f)
+            else:
+                rows = list(csv.DictReader(f))
+        places = [
+            SafePlace(
+                name=str(row["name"]),
+                category=str(row.get("category", "")),
+                latitude=float(row["latitude"]),
+                longitude=float(row["longitude"])
+            )
+            for row in rows
+        ]
+        return cls(places, cell_deg=cell_deg)
@@ -0,0 +1,417 @@
+"""
+Queue Consumer
+Scores position events from a local queue instead of HTTP: a stand-in for
+a broker consumer, reading an append-only JSONL event file or a SQLite
+queue table
+
+Events are /api/assess request fields, one JSON object each. The consumer
+polls micro-batches of up to batch_size events, scores each batch with one
+assess_batch call, writes the results to a sink and only then commits the
+source offset. Delivery is at-least-once: after a crash or a failed write,
+events past the last committed offset are scored again.
+
+With concurrency > 1, that many batches are scored and written at once
+(the sink must then accept concurrent writes); offsets still commit in
+order, so a slow batch holds back the commits of those after it.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from analyzer_config import assess_inputs
+from assessment_log import AssessmentLog, LogRecord
+from safety_analyzer import SafetyAnalyzer, threat_mask
+
+# (offset, event) pairs; an event's offset is the source position just past it
+Batch = List[Tuple[int, dict]]
+
+
+class JSONLSource:
+    """
+    Tails an append-only file of JSON lines
+
+    Offsets are byte positions, committed to offset_path (default
+    <path>.offset) by atomic rename. A line is only read once its newline
+    is written. Lines that are not JSON objects are passed on as None.
+    """
+
+    lag_unit = "bytes"
+
+    def __init__(self, path: str, offset_path: Optional[str] = None):
+        self.path = path
+        self.offset_path = offset_path or path + ".offset"
+        try:
+            with open(self.offset_path, encoding="utf-8") as f:
+                self._committed = int(f.read().strip() or 0)
+        except FileNotFoundError:
+            self._committed = 0
+        self._position = self._committed
+
+    def committed(self) -> int:
+        return self._committed
+
+    def poll(self, max_events: int) -> Batch:
+        batch = []
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._position)
+                while len(batch) < max_events:
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        break   # partial line still being written
+                    self._position += len(line)
+                    if line.strip():
+                        batch.append((self._position, _parse(line)))
+        except FileNotFoundError:
+            pass
+        return batch
+
+    def commit(self, offset: int):
+        tmp = self.offset_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.offset_path)
+        self._committed = offset
+
+    def rewind(self):
+        """Read again from the committed offset"""
+        self._position = self._committed
+
+    def lag(self) -> int:
+        try:
+            return max(0, os.path.getsize(self.path) - self._committed)
+        except FileNotFoundError:
+            return 0
+
+    def close(self):
+        pass
+
+
+class SQLiteSource:
+    """
+    Reads a SQLite queue table in id order
+
+    Producers insert into the table (see publish); each consumer name keeps
+    its committed id in a consumer_offsets table of the same database.
+    """
+
+    lag_unit = "events"
+
+    def __init__(self, path: str, table: str = "events", consumer: str = "default"):
+        if not table.isidentifier():
+            raise ValueError(f"invalid table name {table!r}")
+        self.table = table
+        self.consumer = consumer
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(f"CREATE TABLE IF NOT EXISTS {table} "
+                         "(id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS consumer_offsets "
+                         "(consumer TEXT PRIMARY KEY, offset INTEGER NOT NULL)")
+        self._db.commit()
+        row = self._db.execute("SELECT offset FROM consumer_offsets WHERE consumer = ?",
+                               (consumer,)).fetchone()
+        self._committed = row[0] if row else 0
+        self._position = self._committed
+
+    def publish(self, events: List[dict]):
+        """Enqueue events (producer side)"""
+        with self._db:
+            self._db.executemany(f"INSERT INTO {self.table} (payload) VALUES (?)",
+                                 [(json.dumps(event),) for event in events])
+
+    def committed(self) -> int:
+        return self._committed
+
+    def poll(self, max_events: int) -> Batch:
+        rows = self._db.execute(
+            f"SELECT id, payload FROM {self.table} WHERE id > ? ORDER BY id LIMIT ?",
+            (self._position, max_events)
+        ).fetchall()
+        if rows:
+            self._position = rows[-1][0]
+        return [(row_id, _parse(payload)) for row_id, payload in rows]
+
+    def commit(self, offset: int):
+        with self._db:
+            self._db.execute("INSERT INTO consumer_offsets (consumer, offset) VALUES (?, ?) "
+                             "ON CONFLICT(consumer) DO UPDATE SET offset = excluded.offset",
+                             (self.consumer, offset))
+        self._committed = offset
+
+    def rewind(self):
+        self._position = self._committed
+
+    def lag(self) -> int:
+        return self._db.execute(f"SELECT COUNT(*) FROM {self.table} WHERE id > ?",
+                                (self._committed,)).fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+
+def _parse(line) -> Optional[dict]:
+    try:
+        event = json.loads(line)
+    except ValueError:
+        return None
+    return event if isinstance(event, dict) else None
+
+
+class JSONLSink:
+    """Appends one JSON result per line, flushed (and optionally fsynced) per batch"""
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.fsync = fsync
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, results: List[dict]):
+        text = "".join(json.dumps(result) + "\n" for result in results)
+        with self._lock:
+            self._file.write(text)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class AssessmentLogSink:
+    """
+    Writes results to an AssessmentLog
+
+    write returns once they are on disk and raises OSError if they could
+    not be written, so the consumer retries instead of committing.
+    """
+
+    def __init__(self, directory: str):
+        self.log = AssessmentLog(directory, fsync=True)
+
+    def write(self, results: List[dict]):
+        self.log.write_batch([
+            LogRecord(result["timestamp"], result["latitude"], result["longitude"],
+                      result["risk_score"], result["risk_level"],
+                      threat_mask(result["threat_factors"]))
+            for result in results
+        ])
+
+    def close(self):
+        self.log.close()
+
+
+class QueueConsumer:
+    """Polls a source, scores micro-batches and commits offsets after the sink write"""
+
+    def __init__(self,
+                 analyzer: SafetyAnalyzer,
+                 source,
+                 sink,
+                 batch_size: int = 256,
+                 concurrency: int = 1,
+                 poll_interval: float = 0.2,
+                 retry_backoff: float = 1.0):
+        """
+        Args:
+            analyzer: Analyzer scoring the events
+            source: JSONLSource or SQLiteSource
+            sink: Object with write(results), e.g. JSONLSink or AssessmentLogSink
+            batch_size: Most events scored per assess_batch call
+            concurrency: Batches scored and written at once
+            poll_interval: Sleep when the source has nothing new
+            retry_backoff: Sleep after a failed batch before re-reading
+        """
+        if batch_size < 1 or concurrency < 1:
+            raise ValueError("batch_size and concurrency must be at least 1")
+        self.analyzer = analyzer
+        self.source = source
+        self.sink = sink
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.retry_backoff = retry_backoff
+        self._executor = ThreadPoolExecutor(concurrency, thread_name_prefix="queue-consumer")
+        self._in_flight: deque = deque()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.consumed = 0
+        self.scored = 0
+        self.invalid = 0
+        self.batches = 0
+        self.failures = 0
+
+    def process(self, batch: Batch) -> int:
+        """Score one batch and write it to the sink; returns the offset to commit"""
+        inputs = []
+        results = []
+        invalid = 0
+        for offset, event in batch:
+            try:
+                if event is None:
+                    raise ValueError("not a JSON object")
+                kwargs = assess_inputs(self.analyzer, event)
+                timestamp = float(event.get("utc_timestamp") or time.time())
+            except (ValueError, TypeError, ArithmeticError):
+                invalid += 1   # poison events are skipped, not retried
+                continue
+            inputs.append(kwargs)
+            results.append({
+                "offset": offset,
+                "event_id": event.get("event_id"),
+                "session_id": event.get("session_id"),
+                "timestamp": timestamp,
+                "latitude": kwargs["latitude"],
+                "longitude": kwargs["longitude"],
+                "hour": kwargs["hour"]
+            })
+        for result, assessment in zip(results, self.analyzer.assess_batch(inputs)):
+            result.update(risk_score=assessment.risk_score, risk_level=assessment.risk_level,
+                          threat_factors=assessment.threat_factors,
+                          emergency=bool(assessment.emergency_actions))
+        if results:
+            self.sink.write(results)
+        with self._lock:
+            self.scored += len(results)
+            self.invalid += invalid
+        return batch[-1][0]
+
+    def run_once(self) -> int:
+        """
+        Poll one batch and commit the batches that have finished
+
+        Waits for the oldest batch in flight when every worker is busy or
+        the source has nothing new.
+
+        Returns:
+            Number of events polled
+        """
+        if len(self._in_flight) >= self.concurrency:
+            self._commit_finished(block=True)
+        batch = self.source.poll(self.batch_size)
+        if batch:
+            self.consumed += len(batch)
+            self.batches += 1
+            self._in_flight.append(self._executor.submit(self.process, batch))
+        self._commit_finished(block=not batch)
+        return len(batch)
+
+    def _commit_finished(self, block: bool):
+        """Commit the finished batches at the head; block waits for the oldest"""
+        offset = None
+        while self._in_flight and (block or self._in_flight[0].done()):
+            block = False
+            future = self._in_flight.popleft()
+            try:
+                offset = future.result()
+            except Exception:
+                # Nothing past the last good batch is committed: drop the
+                # batches behind it and read them again after a pause
+                self.failures += 1
+                for later in self._in_flight:
+                    later.cancel()
+                for later in self._in_flight:
+                    if not later.cancelled():
+                        try:
+                            later.result()
+                        except Exception:
+                            pass
+                self._in_flight.clear()
+                if offset is not None:
+                    self.source.commit(offset)
+                self.source.rewind()
+                self._stop.wait(self.retry_backoff)
+                return
+        if offset is not None:
+            self.source.commit(offset)
+
+    def drain(self):
+        """Process until the source is empty and every batch is committed"""
+        while self.run_once() or self._in_flight:
+            pass
+
+    def flush(self):
+        """Wait for the batches in flight and commit them"""
+        while self._in_flight:
+            self._commit_finished(block=True)
+
+    def run(self):
+        """Consume until stop() is called"""
+        while not self._stop.is_set():
+            if not self.run_once() and not self._in_flight:
+                self._stop.wait(self.poll_interval)
+        self.flush()
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.source.close()
+        close = getattr(self.sink, "close", None)
+        if close is not None:
+            close()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            scored, invalid = self.scored, self.invalid
+        return {
+            "consumed": self.consumed,
+            "scored": scored,
+            "invalid": invalid,
+            "batches": self.batches,
+            "failures": self.failures,
+            "in_flight": len(self._in_flight),
+            "committed_offset": self.source.committed(),
+            "lag": self.source.lag(),
+            "lag_unit": self.source.lag_unit
+        }
+
+
+def main(argv: List[str]) -> int:
+    """
+    Command line: queue_consumer.py <jsonl|sqlite> <source> <output> [batch_size] [concurrency]
+
+    The output is a JSONL file, or an assessment log directory when it ends
+    with a path separator.
+    """
+    if len(argv) < 3 or argv[0] not in ("jsonl", "sqlite"):
+        print("Usage: python queue_consumer.py <jsonl|sqlite> <source> <output> "
+              "[batch_size] [concurrency]")
+        return 1
+    from analyzer_config import build_analyzer
+    source = JSONLSource(argv[1]) if argv[0] == "jsonl" else SQLiteSource(argv[1])
+    sink = AssessmentLogSink(argv[2]) if argv[2].endswith(os.sep) else JSONLSink(argv[2])
+    consumer = QueueConsumer(build_analyzer(), source, sink,
+                             batch_size=int(argv[3]) if len(argv) > 3 else 256,
+                             concurrency=int(argv[4]) if len(argv) > 4 else 1)
+    reporter = threading.Thread(target=_report, args=(consumer,), daemon=True)
+    reporter.start()
+    try:
+        consumer.run()
+    except KeyboardInterrupt:
+        consumer.flush()
+    finally:
+        consumer.close()
+        print(json.dumps(consumer.metrics()))
+    return 0
+
+
+def _report(consumer: QueueConsumer, every_s: float = 10.0):
+    while True:
+        time.sleep(every_s)
+        print(json.dumps(consumer.metrics()), flush=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
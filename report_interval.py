@@ -0,0 +1,95 @@
+"""
+Adaptive Reporting Interval
+Server-computed advice on how soon a tracking client should report again
+
+Sessions at Low risk and standing still can report rarely; sessions at
+High risk, moving fast, or whose score is changing report often. A global
+load factor stretches the advice under pressure, except at High risk.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Seconds between reports for a steady, stationary session at each level
+BASE_INTERVALS_S = {"Low": 60.0, "Medium": 20.0, "High": 5.0}
+
+
+class ReportIntervalAdvisor:
+    """
+    next_report_after for a session's latest assessment
+
+    The level's base interval is shortened so a moving session reports at
+    least every max_distance_m, and divided by 1 + volatility / volatility_scale,
+    where volatility is the session's EWMA of score changes between reports.
+    Low and Medium advice is then multiplied by the load factor.
+    """
+
+    def __init__(self,
+                 base_intervals_s: Optional[Dict[str, float]] = None,
+                 min_interval_s: float = 2.0,
+                 max_interval_s: float = 300.0,
+                 max_distance_m: float = 100.0,
+                 volatility_scale: float = 10.0,
+                 alpha: float = 0.3,
+                 load_factor: float = 1.0,
+                 max_sessions: int = 100000):
+        """
+        Args:
+            base_intervals_s: Interval per risk level (BASE_INTERVALS_S by default)
+            min_interval_s: Shortest advice
+            max_interval_s: Longest advice
+            max_distance_m: Distance a moving session may cover between reports
+            volatility_scale: Score change per report that halves the interval
+            alpha: EWMA weight of the newest score change
+            load_factor: Stretch applied to Low and Medium advice (1.0 = none)
+            max_sessions: Sessions tracked (least recently seen dropped)
+        """
+        self.base_intervals_s = dict(base_intervals_s or BASE_INTERVALS_S)
+        self.min_interval_s = min_interval_s
+        self.max_interval_s = max_interval_s
+        self.max_distance_m = max_distance_m
+        self.volatility_scale = volatility_scale
+        self.alpha = alpha
+        self.load_factor = load_factor
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()   # score, volatility
+        self._lock = threading.Lock()
+
+    def advise(self, session_id: str, risk_level: str, risk_score: int,
+               movement_speed: float = 0.0, load: Optional[float] = None) -> float:
+        """
+        Seconds until the session should report again
+
+        Args:
+            movement_speed: Current speed in m/s
+            load: Current server load (LoadShedder.load()); above 0.5 it
+                stretches Low and Medium advice further, up to 3x at 1.5
+        """
+        with self._lock:
+            last = self._sessions.get(session_id)
+            volatility = 0.0
+            if last is not None:
+                volatility = self.alpha * abs(risk_score - last[0]) + (1 - self.alpha) * last[1]
+            self._sessions[session_id] = (risk_score, volatility)
+            self._sessions.move_to_end(session_id)
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+        interval = self.base_intervals_s.get(risk_level, self.min_interval_s)
+        if movement_speed > 0:
+            interval = min(interval, self.max_distance_m / movement_speed)
+        interval /= 1.0 + volatility / self.volatility_scale
+        if risk_level != "High":
+            factor = self.load_factor
+            if load is not None and load > 0.5:
+                factor *= 1.0 + 2.0 * (min(load, 1.5) - 0.5)
+            interval *= factor
+        return round(max(self.min_interval_s, min(self.max_interval_s, interval)), 1)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "load_factor": self.load_factor
+            }
@@ -0,0 +1,215 @@
+"""
+Assessment Rollups
+Incrementally maintained counters behind the /api/stats endpoint
+"""
+
+import glob
+import json
+import os
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from geo import geohash
+from safety_analyzer import RISK_LEVELS, SafetyAnalyzer
+
+
+class AssessmentRollup:
+    """
+    Risk level counts by hour, region and threat factor
+
+    record() touches a fixed number of counters (24 hours, one cell per
+    geohash prefix length, six factors), so it is O(1) per assessment and
+    stats are read straight from the counters. Across workers, each one
+    publishes its counters to a shared directory on a timer, and readers
+    cache the merged peer counters until a peer file changes.
+    """
+
+    def __init__(self, precision: int = 5):
+        """
+        Args:
+            precision: Longest geohash prefix counted (5 is a ~5 km region)
+        """
+        self.precision = precision
+        self._lock = threading.Lock()
+        self._state = self.empty()
+        self._peer_lock = threading.Lock()
+        self._peer_files: tuple = ()
+        self._peers = self.empty()
+        self._publisher: Optional[threading.Thread] = None
+        self._stop_publishing = threading.Event()
+
+    @staticmethod
+    def empty() -> dict:
+        return {
+            "total": 0,
+            "levels": [0] * len(RISK_LEVELS),
+            "by_hour": [[0] * len(RISK_LEVELS) for _ in range(24)],
+            "by_region": {},
+            "by_factor": {factor: 0 for factor in SafetyAnalyzer.ALL_FACTORS}
+        }
+
+    def record(self, hour: int, latitude: float, longitude: float,
+               risk_level: str, threat_factors: Optional[Iterable[str]] = None):
+        """Count one assessment"""
+        level = RISK_LEVELS.index(risk_level)
+        valid = -90 <= latitude <= 90 and -180 <= longitude <= 180
+        cell = geohash(latitude, longitude, self.precision) if valid else ""
+        with self._lock:
+            state = self._state
+            state["total"] += 1
+            state["levels"][level] += 1
+            if 0 <= hour < 24:
+                state["by_hour"][hour][level] += 1
+            by_region = state["by_region"]
+            for length in range(1, len(cell) + 1):
+                counts = by_region.get(cell[:length])
+                if counts is None:
+                    counts = by_region[cell[:length]] = [0] * len(RISK_LEVELS)
+                counts[level] += 1
+            for factor in threat_factors or ():
+                state["by_factor"][factor] += 1
+
+    def snapshot(self) -> dict:
+        """JSON-serialisable copy of the counters"""
+        with self._lock:
+            return json.loads(json.dumps(self._state))
+
+    def _summary(self, region: Optional[str]) -> dict:
+        """Copy of the counters stats() reads: everything but other regions"""
+        with self._lock:
+            state = self._state
+            counts = state["by_region"].get(region) if region is not None else None
+            return {
+                "total": state["total"],
+                "levels": list(state["levels"]),
+                "by_hour": [list(counts) for counts in state["by_hour"]],
+                "by_region": {region: list(counts)} if counts is not None else {},
+                "by_factor": dict(state["by_factor"])
+            }
+
+    def query(self, region: Optional[str] = None, top_factors: int = 3,
+              directory: Optional[str] = None, worker_id: Optional[str] = None) -> dict:
+        """
+        stats() of the live counters, plus the other workers' published
+        counters when a directory is given
+
+        Only the counters the answer needs are copied, so the cost does not
+        grow with the number of regions.
+        """
+        state = self._summary(region)
+        if directory is not None:
+            # The cached peer state is replaced, never mutated, so it is
+            # read without the lock
+            peers = self._peer_state(directory, worker_id)
+            counts = peers["by_region"].get(region) if region is not None else None
+            state = self.merge([state, dict(peers, by_region={region: counts} if counts else {})])
+        return self.stats(state, region, top_factors)
+
+    @staticmethod
+    def merge(snapshots: Iterable[dict]) -> dict:
+        """Sum snapshots from several workers into one"""
+        merged = AssessmentRollup.empty()
+        for snap in snapshots:
+            merged["total"] += snap["total"]
+            for level, count in enumerate(snap["levels"]):
+                merged["levels"][level] += count
+            for hour, counts in enumerate(snap["by_hour"]):
+                for level, count in enumerate(counts):
+                    merged["by_hour"][hour][level] += count
+            for cell, counts in snap["by_region"].items():
+                target = merged["by_region"].setdefault(cell, [0] * len(RISK_LEVELS))
+                for level, count in enumerate(counts):
+                    target[level] += count
+            for factor, count in snap["by_factor"].items():
+                merged["by_factor"][factor] = merged["by_factor"].get(factor, 0) + count
+        return merged
+
+    @staticmethod
+    def stats(state: dict, region: Optional[str] = None, top_factors: int = 3) -> dict:
+        """Summarise a snapshot, optionally for one geohash region prefix"""
+        def by_level(counts: List[int]) -> Dict[str, int]:
+            return dict(zip(RISK_LEVELS, counts))
+
+        factors = sorted(state["by_factor"].items(), key=lambda item: (-item[1], item[0]))
+        result = {
+            "total": state["total"],
+            "levels": by_level(state["levels"]),
+            "by_hour": {hour: by_level(counts) for hour, counts in enumerate(state["by_hour"])},
+            "top_threat_factors": [
+                {"factor": factor, "count": count}
+                for factor, count in factors[:top_factors] if count
+            ]
+        }
+        if region is not None:
+            result["region"] = {
+                "geohash": region,
+                "levels": by_level(state["by_region"].get(region, [0] * len(RISK_LEVELS)))
+            }
+        return result
+
+    # ---------------------------------------------------- cross-worker merge
+    def publish(self, directory: str, worker_id: Optional[str] = None):
+        """Write this worker's snapshot to a shared directory (atomic replace)"""
+        worker_id = worker_id or str(os.getpid())
+        path = os.path.join(directory, f"rollup-{worker_id}.json")
+        tmp = path + ".tmp"
+        with self._lock:
+            text = json.dumps(self._state, separators=(",", ":"))
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def start_publishing(self, directory: str, interval_s: float = 5.0,
+                         worker_id: Optional[str] = None):
+        """Publish every interval_s seconds from a background thread"""
+        def run():
+            while not self._stop_publishing.wait(interval_s):
+                try:
+                    self.publish(directory, worker_id)
+                except OSError as e:
+                    print(f"rollup publish failed: {e}", file=sys.stderr)
+
+        self._stop_publishing.clear()
+        self._publisher = threading.Thread(target=run, name="rollup-publisher", daemon=True)
+        self._publisher.start()
+
+    def stop_publishing(self, directory: Optional[str] = None, worker_id: Optional[str] = None):
+        """Stop the publisher thread, then publish once more if a directory is given"""
+        if self._publisher is not None:
+            self._stop_publishing.set()
+            self._publisher.join()
+            self._publisher = None
+        if directory is not None:
+            self.publish(directory, worker_id)
+
+    def _peer_state(self, directory: str, worker_id: Optional[str] = None) -> dict:
+        """Merged counters of the other workers, reread only when a file changed"""
+        worker_id = worker_id or str(os.getpid())
+        own = os.path.join(directory, f"rollup-{worker_id}.json")
+        files = []
+        for path in glob.glob(os.path.join(directory, "rollup-*.json")):
+            if path == own:
+                continue
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            files.append((path, info.st_mtime_ns, info.st_size))
+        files = tuple(sorted(files))
+        with self._peer_lock:
+            if files != self._peer_files:
+                snapshots = []
+                for path, _, _ in files:
+                    try:
+                        with open(path, "r", encoding="utf-8") as f:
+                            snapshots.append(json.load(f))
+                    except (OSError, ValueError):
+                        continue
+                self._peers = self.merge(snapshots)
+                self._peer_files = files
+            return self._peers
+
+    def merged_with_peers(self, directory: str, worker_id: Optional[str] = None) -> dict:
+        """This worker's live counters merged with the other workers' published ones"""
+        return self.merge([self.snapshot(), self._peer_state(directory, worker_id)])
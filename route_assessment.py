@@ -0,0 +1,140 @@
+"""
+Route Risk Assessment
+Scores an entire polyline (e.g. a walk home) in one call
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from geo import LatLon, densify, haversine_m
+from safety_analyzer import CrowdDensity, SafetyAnalyzer
+
+
+@dataclass
+class RouteSegment:
+    start: LatLon
+    end: LatLon
+    distance_m: float
+    start_offset_s: float   # seconds after departure
+    duration_s: float
+    hour: int               # local hour while walking this segment
+    crime_score: int
+    risk_score: int
+    risk_level: str
+
+
+@dataclass
+class RouteAssessment:
+    segments: List[RouteSegment] = field(default_factory=list)
+    total_distance_m: float = 0.0
+    total_duration_s: float = 0.0
+    max_risk_score: int = 0
+    mean_risk_score: float = 0.0
+    time_in_high_s: float = 0.0
+    risk_level: str = "Low"
+
+    def __str__(self):
+        return f"""Route Distance: {self.total_distance_m:.0f} m
+Route Duration: {self.total_duration_s / 60:.1f} min
+Max Risk Score: {self.max_risk_score}
+Mean Risk Score: {self.mean_risk_score:.1f}
+Time in High Risk: {self.time_in_high_s / 60:.1f} min
+Route Risk Level: {self.risk_level}"""
+
+
+def assess_route(analyzer: SafetyAnalyzer,
+                 polyline: List[LatLon],
+                 departure_hour: float,
+                 speed: float,
+                 crowd_density: CrowdDensity = CrowdDensity.MEDIUM,
+                 crime_score: int = 50,
+                 network_available: bool = True,
+                 step_m: float = 50.0,
+                 departure_weekday: Optional[int] = None) -> RouteAssessment:
+    """
+    Assess every segment of a route travelled at a constant speed
+
+    The polyline is densified to step_m segments. Segment factors are
+    gathered in one pass and scored once per distinct factor combination,
+    so the cost is linear in route length.
+
+    Args:
+        analyzer: SafetyAnalyzer used to score segments
+        polyline: Route vertices as (latitude, longitude) pairs
+        departure_hour: Departure time as a (fractional) hour of day, 0-24
+        speed: Travel speed in meters per second (> 0)
+        crowd_density: CrowdDensity enum applied along the route
+        crime_score: Crime history score (0-100) applied along the route
+        network_available: Boolean for network availability
+        step_m: Maximum segment length in meters
+        departure_weekday: Day of departure (0 = Monday); with a crime grid
+            on the analyzer, segments use their hour-of-week crime score
+
+    Returns:
+        RouteAssessment with per-segment scores and route aggregates
+    """
+    if len(polyline) < 2:
+        raise ValueError("A route needs at least two points")
+    if not 0 <= departure_hour < 24:
+        raise ValueError("Departure hour must be between 0 and 24")
+    if speed <= 0:
+        raise ValueError("Speed must be greater than 0")
+
+    points = densify([(float(lat), float(lon)) for lat, lon in polyline], step_m)
+
+    # Gather the per-segment inputs that vary along the route
+    legs = []
+    elapsed = 0.0
+    for start, end in zip(points, points[1:]):
+        distance = haversine_m(start[0], start[1], end[0], end[1])
+        duration = distance / speed
+        hours = int(departure_hour + elapsed / 3600)
+        hour = hours % 24
+        valid = (analyzer.is_valid_coordinates(*start)
+                 and analyzer.is_valid_coordinates(*end))
+        weekday = None if departure_weekday is None else departure_weekday + hours // 24
+        crime = analyzer.crime_score_at(start[0], start[1], hour, weekday, crime_score)
+        legs.append((start, end, distance, elapsed, duration, hour, valid, crime))
+        elapsed += duration
+
+    # Score each distinct factor combination once
+    scores: Dict[Tuple[int, bool, int], Tuple[int, str]] = {}
+    result = RouteAssessment()
+    score_sum = 0.0
+    for start, end, distance, offset, duration, hour, valid, crime in legs:
+        key = (hour, valid, crime)
+        scored = scores.get(key)
+        if scored is None:
+            # Any out-of-range endpoint marks the segment's GPS as invalid
+            latitude, longitude = start if valid else (999.0, 999.0)
+            risks = analyzer.factor_risks(hour, latitude, longitude, crowd_density,
+                                          crime, speed, network_available)
+            risk_score = analyzer.score_risks(risks)
+            scored = scores[key] = (risk_score, analyzer.risk_level_for(risk_score))
+        risk_score, risk_level = scored
+
+        result.segments.append(RouteSegment(
+            start=start,
+            end=end,
+            distance_m=distance,
+            start_offset_s=offset,
+            duration_s=duration,
+            hour=hour,
+            crime_score=crime,
+            risk_score=risk_score,
+            risk_level=risk_level
+        ))
+        score_sum += risk_score * distance  # distance (= time) weighted mean
+        if risk_score > result.max_risk_score:
+            result.max_risk_score = risk_score
+        if risk_level == "High":
+            result.time_in_high_s += duration
+
+    result.total_distance_m = sum(segment.distance_m for segment in result.segments)
+    result.total_duration_s = elapsed
+    if result.total_distance_m > 0:
+        result.mean_risk_score = score_sum / result.total_distance_m
+    else:
+        result.mean_risk_score = float(result.segments[0].risk_score)
+    result.risk_level = analyzer.risk_level_for(result.max_risk_score)
+    return result
@@ -0,0 +1,419 @@
+"""
+Safest-Route Search
+Finds low-risk walking routes over a local road graph, fully offline
+
+Graph file format (JSON, produced by `python routing.py convert map.osm graph.json`):
+    {
+        "format": "safety-road-graph",
+        "version": 1,
+        "nodes": [[lat, lon], ...],
+        "edges": [[from_node, to_node, length_m, crime_score, oneway], ...]
+    }
+crime_score (0-100) and oneway (0/1) are optional per edge.
+"""
+
+import heapq
+import json
+import math
+import sys
+import xml.etree.ElementTree as ET
+from array import array
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from geo import EARTH_RADIUS_M, LatLon, haversine_m
+from safety_analyzer import CrowdDensity, SafetyAnalyzer
+
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+GRAPH_FORMAT = "safety-road-graph"
+GRAPH_VERSION = 1
+
+# OSM highway types that are walkable
+WALKABLE_HIGHWAYS = {
+    "primary", "primary_link", "secondary", "secondary_link", "tertiary",
+    "tertiary_link", "unclassified", "residential", "living_street",
+    "service", "pedestrian", "footway", "path", "steps", "track", "cycleway"
+}
+
+
+class RoadGraph:
+    """Directed road graph in compressed adjacency (CSR) form"""
+
+    def __init__(self, nodes: List[LatLon], edges: List[list], default_crime_score: int = 50,
+                 cell_deg: float = 0.01):
+        """
+        Build the graph from node coordinates and an edge list
+
+        Args:
+            nodes: (latitude, longitude) per node id
+            edges: [from_node, to_node, length_m(, crime_score(, oneway))]
+            default_crime_score: Crime score for edges without one
+            cell_deg: Bucket size in degrees of the nearest-node grid
+        """
+        self.lat = array("d", (float(lat) for lat, _ in nodes))
+        self.lon = array("d", (float(lon) for _, lon in nodes))
+        for lat, lon in zip(self.lat, self.lon):
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                raise ValueError(f"Invalid node coordinates: ({lat}, {lon})")
+
+        arcs: List[List[Tuple[int, float, int]]] = [[] for _ in nodes]
+        for edge in edges:
+            u, v, length = int(edge[0]), int(edge[1]), float(edge[2])
+            crime = int(edge[3]) if len(edge) > 3 and edge[3] is not None else default_crime_score
+            oneway = len(edge) > 4 and bool(edge[4])
+            # A* needs arc lengths no shorter than the straight line
+            length = max(length, haversine_m(self.lat[u], self.lon[u], self.lat[v], self.lon[v]))
+            arcs[u].append((v, length, crime))
+            if not oneway:
+                arcs[v].append((u, length, crime))
+
+        self.offsets = array("l", [0])
+        self.targets = array("l")
+        self.lengths = array("d")
+        self.crime = array("B")
+        for node_arcs in arcs:
+            for v, length, crime in node_arcs:
+                self.targets.append(v)
+                self.lengths.append(length)
+                self.crime.append(min(100, max(0, crime)))
+            self.offsets.append(len(self.targets))
+
+        # Grid of node ids for nearest_node(), as in poi_index
+        self.cell_deg = cell_deg
+        self.buckets: Dict[Tuple[int, int], List[int]] = {}
+        for n in range(self.node_count):
+            self.buckets.setdefault(self._cell(self.lat[n], self.lon[n]), []).append(n)
+        rows = [row for row, _ in self.buckets] or [0]
+        cols = [col for _, col in self.buckets] or [0]
+        self._cell_bounds = (min(rows), max(rows), min(cols), max(cols))
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        # Columns are not wrapped: a local graph never spans the antimeridian
+        # twice, and the ring search below only needs to reach every bucket
+        return (int(math.floor(latitude / self.cell_deg)),
+                int(math.floor((longitude + 180) / self.cell_deg)))
+
+    @property
+    def node_count(self) -> int:
+        return len(self.lat)
+
+    @property
+    def arc_count(self) -> int:
+        return len(self.targets)
+
+    def nearest_node(self, latitude: float, longitude: float) -> int:
+        """
+        Node closest to a coordinate
+
+        Searches rings of grid buckets outward from the query cell and stops
+        once no unvisited ring can hold a closer node. A query far outside
+        the graph falls back to a linear scan.
+        """
+        if not self.node_count:
+            raise ValueError("Road graph has no nodes")
+        row0, col0 = self._cell(latitude, longitude)
+        min_row, max_row, min_col, max_col = self._cell_bounds
+        # Rings needed to reach every bucket
+        reach = max(row0 - min_row, max_row - row0, col0 - min_col, max_col - col0)
+        if reach > 64:
+            return min(range(self.node_count),
+                       key=lambda n: haversine_m(latitude, longitude, self.lat[n], self.lon[n]))
+
+        # Smallest ground width of one bucket near the query point
+        cos_lat = math.cos(math.radians(min(89.9, abs(latitude) + self.cell_deg)))
+        cell_m = self.cell_deg * METERS_PER_DEGREE * cos_lat
+        best, best_m = -1, math.inf
+        for ring in range(reach + 1):
+            for row in range(row0 - ring, row0 + ring + 1):
+                step = 1 if row in (row0 - ring, row0 + ring) else 2 * ring
+                for col in range(col0 - ring, col0 + ring + 1, step):
+                    for n in self.buckets.get((row, col), ()):
+                        distance = haversine_m(latitude, longitude, self.lat[n], self.lon[n])
+                        if distance < best_m or (distance == best_m and n < best):
+                            best, best_m = n, distance
+            # Anything in ring + 1 or beyond is at least ring * cell_m away
+            if best_m <= ring * cell_m:
+                break
+        return best
+
+    @classmethod
+    def load(cls, path: str) -> "RoadGraph":
+        """Load a graph file written by save() or the converter"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("format") != GRAPH_FORMAT or data.get("version") != GRAPH_VERSION:
+            raise ValueError(f"{path} is not a version {GRAPH_VERSION} road graph")
+        return cls(data["nodes"], data["edges"])
+
+    @staticmethod
+    def save(path: str, nodes: List[LatLon], edges: List[list]):
+        """Write nodes and edges in the graph file format"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "format": GRAPH_FORMAT,
+                "version": GRAPH_VERSION,
+                "nodes": [[round(lat, 7), round(lon, 7)] for lat, lon in nodes],
+                "edges": edges
+            }, f, separators=(",", ":"))
+
+
+def convert_osm_xml(source: str, destination: str) -> Tuple[int, int]:
+    """
+    Convert an OSM XML extract into the compact graph file format
+
+    Keeps walkable ways only and renumbers the nodes they use.
+
+    Returns:
+        (node_count, edge_count) written
+    """
+    coords: Dict[str, LatLon] = {}
+    ways: List[Tuple[List[str], bool]] = []
+    for _, element in ET.iterparse(source, events=("end",)):
+        if element.tag == "node":
+            coords[element.get("id")] = (float(element.get("lat")), float(element.get("lon")))
+        elif element.tag == "way":
+            tags = {tag.get("k"): tag.get("v") for tag in element.findall("tag")}
+            if tags.get("highway") in WALKABLE_HIGHWAYS:
+                refs = [nd.get("ref") for nd in element.findall("nd")]
+                oneway = tags.get("oneway") == "yes" and tags.get("highway") not in ("footway", "path", "pedestrian")
+                ways.append((refs, oneway))
+            element.clear()
+
+    ids: Dict[str, int] = {}
+    nodes: List[LatLon] = []
+    edges: List[list] = []
+    for refs, oneway in ways:
+        refs = [ref for ref in refs if ref in coords]
+        for a, b in zip(refs, refs[1:]):
+            for ref in (a, b):
+                if ref not in ids:
+                    ids[ref] = len(nodes)
+                    nodes.append(coords[ref])
+            u, v = ids[a], ids[b]
+            length = haversine_m(nodes[u][0], nodes[u][1], nodes[v][0], nodes[v][1])
+            edge = [u, v, round(length, 1)]
+            if oneway:
+                edge += [None, 1]
+            edges.append(edge)
+
+    RoadGraph.save(destination, nodes, edges)
+    return len(nodes), len(edges)
+
+
+@dataclass
+class Route:
+    nodes: List[int]
+    points: List[LatLon]
+    distance_m: float
+    cost: float
+    max_risk_score: int
+    mean_risk_score: float
+
+
+class SafeRouter:
+    """Ranks routes by distance inflated with SafetyAnalyzer risk"""
+
+    def __init__(self,
+                 graph: RoadGraph,
+                 analyzer: Optional[SafetyAnalyzer] = None,
+                 risk_weight: float = 1.0,
+                 speed: float = 1.4,
+                 crowd_density: CrowdDensity = CrowdDensity.MEDIUM,
+                 network_available: bool = True):
+        """
+        Args:
+            graph: Road graph to search
+            analyzer: SafetyAnalyzer used to score edges
+            risk_weight: Arc cost is length * (1 + risk_weight * risk_score / 100)
+            speed: Walking speed (m/s) used when scoring edges
+            crowd_density: Crowd density assumed along edges
+            network_available: Network availability assumed along edges
+        """
+        if risk_weight < 0:
+            raise ValueError("risk_weight must be 0 or greater")
+        self.graph = graph
+        self.analyzer = analyzer or SafetyAnalyzer()
+        self.risk_weight = risk_weight
+        self.speed = speed
+        self.crowd_density = crowd_density
+        self.network_available = network_available
+        self._tables: Dict[int, Tuple[array, array]] = {}
+
+    def edge_table(self, hour: int) -> Tuple[array, array]:
+        """
+        Per-arc (risk scores, costs) for an hour, built once and cached
+
+        Node coordinates are validated on load, so arcs only differ by
+        crime score and each distinct score is evaluated once per hour.
+
+        Raises:
+            ValueError: hour is not 0-23 (each hour holds a table for good)
+        """
+        if not 0 <= hour <= 23:
+            raise ValueError(f"hour must be 0-23, got {hour}")
+        table = self._tables.get(hour)
+        if table is not None:
+            return table
+
+        g = self.graph
+        by_crime: Dict[int, int] = {}
+        scores = array("B", bytes(g.arc_count))
+        costs = array("d", g.lengths)
+        for arc in range(g.arc_count):
+            crime = g.crime[arc]
+            score = by_crime.get(crime)
+            if score is None:
+                node = g.targets[arc]
+                risks = self.analyzer.factor_risks(hour, g.lat[node], g.lon[node], self.crowd_density,
+                                                   crime, self.speed, self.network_available)
+                score = by_crime[crime] = self.analyzer.score_risks(risks)
+            scores[arc] = score
+            costs[arc] = g.lengths[arc] * (1.0 + self.risk_weight * score / 100.0)
+
+        table = self._tables[hour] = (scores, costs)
+        return table
+
+    @property
+    def cache_bytes(self) -> int:
+        """Memory held by the cached hourly edge tables"""
+        return sum(scores.itemsize * len(scores) + costs.itemsize * len(costs)
+                   for scores, costs in self._tables.values())
+
+    def _search(self,
+                source: int,
+                target: int,
+                costs: array,
+                banned_nodes: Set[int] = frozenset(),
+                banned_arcs: Set[int] = frozenset()) -> Optional[Tuple[List[int], List[int], float]]:
+        """A* over arc costs; returns (nodes, arcs, cost) or None"""
+        g = self.graph
+        tlat, tlon = g.lat[target], g.lon[target]
+        best = {source: 0.0}
+        came_from: Dict[int, Tuple[int, int]] = {}
+        heap = [(haversine_m(g.lat[source], g.lon[source], tlat, tlon), 0.0, source)]
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            if node == target:
+                nodes, arcs = [target], []
+                while node != source:
+                    node, arc = came_from[node]
+                    nodes.append(node)
+                    arcs.append(arc)
+                return nodes[::-1], arcs[::-1], cost
+            if cost > best.get(node, float("inf")):
+                continue
+            for arc in range(g.offsets[node], g.offsets[node + 1]):
+                nxt = g.targets[arc]
+                if nxt in banned_nodes or arc in banned_arcs:
+                    continue
+                new_cost = cost + costs[arc]
+                if new_cost < best.get(nxt, float("inf")):
+                    best[nxt] = new_cost
+                    came_from[nxt] = (node, arc)
+                    # Costs are never below length, so straight-line distance is admissible
+                    heapq.heappush(heap, (new_cost + haversine_m(g.lat[nxt], g.lon[nxt], tlat, tlon),
+                                          new_cost, nxt))
+        return None
+
+    def safest_routes(self,
+                      source: int,
+                      target: int,
+                      hour: int,
+                      k: int = 3,
+                      max_distance_m: Optional[float] = None,
+                      max_detour: float = 1.5,
+                      max_candidates: int = 50) -> List[Route]:
+        """
+        Return up to k lowest-cost loopless routes within a distance budget
+
+        Uses Yen's k-shortest-paths over the cached hourly cost table.
+
+        Args:
+            source: Start node id
+            target: Destination node id
+            hour: Departure hour (0-23) used to score edges
+            k: Number of routes to return
+            max_distance_m: Absolute distance budget in meters
+            max_detour: Budget relative to the shortest route when
+                max_distance_m is not given
+            max_candidates: Limit on paths examined before giving up
+
+        Returns:
+            Routes ordered from lowest to highest cost
+        """
+        scores, costs = self.edge_table(hour)
+        g = self.graph
+        if max_distance_m is None:
+            shortest = self._search(source, target, g.lengths)
+            if shortest is None:
+                return []
+            max_distance_m = shortest[2] * max_detour
+
+        first = self._search(source, target, costs)
+        if first is None:
+            return []
+
+        def distance(arcs: List[int]) -> float:
+            return sum(g.lengths[a] for a in arcs)
+
+        accepted: List[Tuple[List[int], List[int], float]] = [first]
+        candidates: List[Tuple[float, List[int], List[int]]] = []
+        seen = {tuple(first[0])}
+        within = 1 if distance(first[1]) <= max_distance_m else 0
+        while within < k and len(accepted) < max_candidates:
+            prev_nodes, prev_arcs, _ = accepted[-1]
+            for i in range(len(prev_nodes) - 1):
+                spur_node = prev_nodes[i]
+                root_nodes, root_arcs = prev_nodes[:i + 1], prev_arcs[:i]
+                # Don't rediscover accepted routes sharing this root
+                banned_arcs = {arcs[i] for nodes, arcs, _ in accepted
+                               if nodes[:i + 1] == root_nodes and len(arcs) > i}
+                banned_nodes = set(root_nodes[:-1])
+                spur = self._search(spur_node, target, costs, banned_nodes, banned_arcs)
+                if spur is None:
+                    continue
+                nodes = root_nodes[:-1] + spur[0]
+                if tuple(nodes) in seen:
+                    continue
+                seen.add(tuple(nodes))
+                arcs = root_arcs + spur[1]
+                heapq.heappush(candidates, (sum(costs[a] for a in arcs), nodes, arcs))
+            if not candidates:
+                break
+            cost, nodes, arcs = heapq.heappop(candidates)
+            accepted.append((nodes, arcs, cost))
+            if distance(arcs) <= max_distance_m:
+                within += 1
+
+        routes = []
+        for nodes, arcs, cost in accepted:
+            length = distance(arcs)
+            if length > max_distance_m:
+                continue
+            weighted = sum(scores[a] * g.lengths[a] for a in arcs)
+            routes.append(Route(
+                nodes=nodes,
+                points=[(g.lat[n], g.lon[n]) for n in nodes],
+                distance_m=length,
+                cost=cost,
+                max_risk_score=max((scores[a] for a in arcs), default=0),
+                mean_risk_score=weighted / length if length > 0 else 0.0
+            ))
+            if len(routes) == k:
+                break
+        return routes
+
+
+def main(argv: List[str]):
+    """Command line converter: routing.py convert <map.osm> <graph.json>"""
+    if len(argv) != 3 or argv[0] != "convert":
+        print("Usage: python routing.py convert <map.osm> <graph.json>")
+        return 1
+    node_count, edge_count = convert_osm_xml(argv[1], argv[2])
+    print(f"Wrote {node_count} nodes and {edge_count} edges to {argv[2]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,391 @@
+"""
+RPC Server
+Unix-domain-socket scoring for services on the same host, without the
+HTTP/WSGI and JSON overhead of /api/assess
+
+Frames are length-prefixed: a little-endian u32 payload length, then the
+payload - u32 request id, u8 opcode, body. Request bodies are the
+application/x-safety-assess layout from wire_format; replies echo the
+request id with a u8 status (OK or ERROR) followed by the response struct,
+or the UTF-8 error text.
+
+OP_ASSESS scores one request. OP_BATCH carries a u16 count of u16
+length-prefixed requests and is answered with the count and, per request,
+a u8 status followed by the response struct or a u16-length error text.
+Clients may pipeline: every frame already received on a connection is
+scored in one assess_batch call and the replies go back, in order, in one
+write. A request that cannot be decoded or scored fails on its own; the
+other frames and batch items of the same read are still answered.
+
+Only the core score is served; tenants, geofences, the fix filter and SOS
+dispatch stay on the HTTP path.
+"""
+
+import os
+import socket
+import socketserver
+import stat
+import struct
+import sys
+import threading
+from typing import List, Optional, Union
+
+from analyzer_config import assess_inputs, build_analyzer
+from wire_format import RESPONSE, decode_request, decode_response, encode_request, encode_response
+
+LENGTH = struct.Struct("<I")
+HEADER = struct.Struct("<IB")       # request id, opcode
+STATUS = struct.Struct("<IBB")      # request id, opcode, status
+COUNT = struct.Struct("<H")
+ITEM_STATUS = struct.Struct("<B")   # per batch item
+
+OP_ASSESS = 1
+OP_BATCH = 2
+
+OK = 0
+ERROR = 1
+
+MAX_FRAME = 1 << 20
+MAX_BATCH = 0xFFFF
+
+
+def frame(request_id: int, opcode: int, body: bytes) -> bytes:
+    """Length-prefixed frame for one request"""
+    return LENGTH.pack(HEADER.size + len(body)) + HEADER.pack(request_id, opcode) + body
+
+
+def split_batch(body: memoryview) -> List[memoryview]:
+    """Request bodies of an OP_BATCH frame"""
+    if len(body) < COUNT.size:
+        raise ValueError("truncated batch")
+    count, = COUNT.unpack_from(body)
+    offset = COUNT.size
+    items = []
+    for _ in range(count):
+        if offset + COUNT.size > len(body):
+            raise ValueError("truncated batch")
+        length, = COUNT.unpack_from(body, offset)
+        offset += COUNT.size
+        if offset + length > len(body):
+            raise ValueError("truncated batch")
+        items.append(body[offset:offset + length])
+        offset += length
+    return items
+
+
+class RPCServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded Unix-socket server sharing one SafetyAnalyzer across connections"""
+
+    daemon_threads = True
+
+    def __init__(self, path: str, analyzer):
+        """
+        Args:
+            path: Socket path; a stale socket there is replaced
+            analyzer: SafetyAnalyzer scoring every connection's requests
+
+        Raises:
+            FileExistsError: Something other than a socket exists at path
+        """
+        try:
+            mode = os.lstat(path).st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(mode):
+                raise FileExistsError(f"{path} exists and is not a socket")
+            os.unlink(path)
+        self.analyzer = analyzer
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.connections = 0
+        self.frames = 0
+        self.requests = 0
+        self.errors = 0
+        self.score_calls = 0
+        super().__init__(path, RPCHandler)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+    def count(self, frames: int, requests: int, errors: int):
+        with self._lock:
+            self.frames += frames
+            self.requests += requests
+            self.errors += errors
+            self.score_calls += 1 if requests else 0
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "connections": self.connections,
+                "frames": self.frames,
+                "requests": self.requests,
+                "errors": self.errors,
+                "requests_per_score_call": round(self.requests / self.score_calls, 2)
+                if self.score_calls else 0.0
+            }
+
+    def score(self, requests: List[dict]) -> List[Union[bytes, str]]:
+        """
+        Response struct per decoded wire request, scored in one batch
+
+        A request whose fields are invalid, or that fails to score, gets
+        its error text instead; the others are unaffected.
+        """
+        results: List[Union[bytes, str]] = [""] * len(requests)
+        valid = []
+        for i, data in enumerate(requests):
+            try:
+                valid.append((i, assess_inputs(self.analyzer, data)))
+            except (ValueError, TypeError, ArithmeticError) as e:
+                results[i] = f"invalid request: {e}"
+        try:
+            assessments = self.analyzer.assess_batch([kwargs for _, kwargs in valid])
+        except Exception:
+            # Isolate the failing request instead of failing the whole batch
+            assessments = None
+        for j, (i, kwargs) in enumerate(valid):
+            if assessments is not None:
+                results[i] = self._encode(kwargs, assessments[j])
+                continue
+            try:
+                results[i] = self._encode(kwargs, self.analyzer.assess_safety(**kwargs))
+            except Exception as e:
+                results[i] = f"scoring failed: {e}"
+        return results
+
+    @staticmethod
+    def _encode(kwargs: dict, assessment) -> bytes:
+        return encode_response({
+            "risk_score": assessment.risk_score,
+            "risk_level": assessment.risk_level,
+            "emergency_actions": assessment.emergency_actions,
+            "threat_factors": assessment.threat_factors,
+            "hour": kwargs["hour"],
+            "crowd_density": kwargs["crowd_density"].name,
+            "location": {"latitude": kwargs["latitude"], "longitude": kwargs["longitude"]}
+        })
+
+
+class RPCHandler(socketserver.BaseRequestHandler):
+    """One client connection: read frames, score them together, reply in order"""
+
+    def setup(self):
+        with self.server._lock:
+            self.server.connections += 1
+
+    def handle(self):
+        sock = self.request
+        buffer = bytearray()
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                return
+            buffer += chunk
+            frames = []
+            offset = 0
+            while len(buffer) - offset >= LENGTH.size:
+                length, = LENGTH.unpack_from(buffer, offset)
+                if length < HEADER.size or length > MAX_FRAME:
+                    return   # not speaking the protocol; drop the connection
+                if len(buffer) - offset - LENGTH.size < length:
+                    break
+                start = offset + LENGTH.size
+                frames.append(bytes(buffer[start:start + length]))
+                offset = start + length
+            del buffer[:offset]
+            if frames:
+                sock.sendall(self.reply(frames))
+
+    def reply(self, frames: List[bytes]) -> bytes:
+        # Decode every frame first so all their requests share one score call.
+        # Each plan is a frame-level error (str) or (first item, item count).
+        requests: List[dict] = []
+        items: List[Union[int, str]] = []   # request index or decode error, per item
+        plans = []
+        for payload in frames:
+            request_id, opcode = HEADER.unpack_from(payload)
+            body = memoryview(payload)[HEADER.size:]
+            try:
+                if opcode == OP_ASSESS:
+                    bodies = [body]
+                elif opcode == OP_BATCH:
+                    bodies = split_batch(body)
+                else:
+                    raise ValueError(f"unknown opcode {opcode}")
+            except ValueError as e:
+                plans.append((request_id, opcode, str(e)))
+                continue
+            plans.append((request_id, opcode, (len(items), len(bodies))))
+            for item in bodies:
+                try:
+                    requests.append(decode_request(item))
+                    items.append(len(requests) - 1)
+                except (ValueError, UnicodeDecodeError) as e:
+                    items.append(f"invalid request: {e}")
+
+        scored = self.server.score(requests) if requests else []
+        results = [scored[item] if isinstance(item, int) else item for item in items]
+        errors = sum(1 for result in results if isinstance(result, str))
+
+        out = []
+        for request_id, opcode, plan in plans:
+            if isinstance(plan, str):
+                errors += 1
+                message = plan.encode("utf-8")
+                out += [LENGTH.pack(STATUS.size + len(message)),
+                        STATUS.pack(request_id, opcode, ERROR), message]
+                continue
+            first, count = plan
+            if opcode == OP_ASSESS:
+                result = results[first]
+                status = OK if isinstance(result, bytes) else ERROR
+                body = result if status == OK else result.encode("utf-8")
+                out += [LENGTH.pack(STATUS.size + len(body)),
+                        STATUS.pack(request_id, opcode, status), body]
+                continue
+            parts = [COUNT.pack(count)]
+            for result in results[first:first + count]:
+                if isinstance(result, bytes):
+                    parts += [ITEM_STATUS.pack(OK), result]
+                else:
+                    message = result.encode("utf-8")[:0xFFFF]
+                    parts += [ITEM_STATUS.pack(ERROR), COUNT.pack(len(message)), message]
+            body = b"".join(parts)
+            out += [LENGTH.pack(STATUS.size + len(body)),
+                    STATUS.pack(request_id, opcode, OK), body]
+        self.server.count(len(frames), len(requests), errors)
+        return b"".join(out)
+
+
+class RPCClient:
+    """
+    Blocking client for RPCServer
+
+    Not thread-safe: give each thread its own client (connections are
+    cheap on a Unix socket). assess_many and assess_batch return
+    {"error": message} for the requests the server refused.
+    """
+
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        self._buffer = bytearray()
+        self._next_id = 0
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def assess(self, request: dict) -> dict:
+        """
+        Score one request (JSON request fields); returns decode_response's dict
+
+        Raises:
+            ValueError: The server refused the request
+        """
+        result = self.assess_many([request])[0]
+        if "error" in result:
+            raise ValueError(result["error"])
+        return result
+
+    def assess_many(self, requests: List[dict]) -> List[dict]:
+        """Score requests pipelined as separate frames in one write"""
+        first = self._next_id
+        self._next_id = (first + len(requests)) & 0xFFFFFFFF
+        self.sock.sendall(b"".join(
+            frame((first + i) & 0xFFFFFFFF, OP_ASSESS, encode_request(request))
+            for i, request in enumerate(requests)
+        ))
+        results = []
+        for i in range(len(requests)):
+            status, body = self._read_frame((first + i) & 0xFFFFFFFF)
+            results.append(decode_response(body) if status == OK
+                           else {"error": str(body, "utf-8")})
+        return results
+
+    def assess_batch(self, requests: List[dict]) -> List[dict]:
+        """Score requests in one OP_BATCH frame"""
+        if len(requests) > MAX_BATCH:
+            raise ValueError(f"a batch holds at most {MAX_BATCH} requests")
+        parts = [COUNT.pack(len(requests))]
+        for request in requests:
+            body = encode_request(request)
+            parts.append(COUNT.pack(len(body)))
+            parts.append(body)
+        request_id = self._next_id
+        self._next_id = (request_id + 1) & 0xFFFFFFFF
+        self.sock.sendall(frame(request_id, OP_BATCH, b"".join(parts)))
+        body = self._read_reply(request_id)
+        count, = COUNT.unpack_from(body)
+        offset = COUNT.size
+        results = []
+        for _ in range(count):
+            status, = ITEM_STATUS.unpack_from(body, offset)
+            offset += ITEM_STATUS.size
+            if status == OK:
+                results.append(decode_response(body[offset:offset + RESPONSE.size]))
+                offset += RESPONSE.size
+            else:
+                length, = COUNT.unpack_from(body, offset)
+                offset += COUNT.size
+                results.append({"error": str(body[offset:offset + length], "utf-8")})
+                offset += length
+        return results
+
+    def _recv_exactly(self, size: int) -> bytes:
+        while len(self._buffer) < size:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("RPC server closed the connection")
+            self._buffer += chunk
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def _read_frame(self, request_id: int):
+        """(status, body) of the next reply, which must answer request_id"""
+        length, = LENGTH.unpack(self._recv_exactly(LENGTH.size))
+        payload = memoryview(self._recv_exactly(length))
+        reply_id, _, status = STATUS.unpack_from(payload)
+        if reply_id != request_id:
+            raise ConnectionError(f"reply {reply_id} out of order (expected {request_id})")
+        return status, payload[STATUS.size:]
+
+    def _read_reply(self, request_id: int) -> memoryview:
+        status, body = self._read_frame(request_id)
+        if status != OK:
+            raise ValueError(str(body, "utf-8"))
+        return body
+
+
+def main(argv: List[str]) -> int:
+    """Command line: rpc_server.py <socket path>"""
+    if len(argv) != 1:
+        print("usage: rpc_server.py <socket path>")
+        return 2
+    server = RPCServer(argv[0], build_analyzer())
+    print(f"Scoring on unix:{argv[0]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
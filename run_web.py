@@ -3,10 +3,11 @@ Web Application Startup Script
 Checks dependencies and starts the web server
 """
 
+import importlib.metadata
+import importlib.util
 import os
 import sys
 import subprocess
-import platform
 
 
 def check_python_version():
@@ -21,14 +22,16 @@ def check_python_version():
 
 
 def check_flask_installed():
-    """Check if Flask is installed"""
-    try:
-        import flask
-        print(f"✓ Flask {flask.__version__} installed")
-        return True
-    except ImportError:
+    """Check if Flask is installed (without importing it)"""
+    if importlib.util.find_spec('flask') is None:
         print("❌ Flask is not installed")
         return False
+    try:
+        version = importlib.metadata.version('flask')
+    except importlib.metadata.PackageNotFoundError:
+        version = "(unknown version)"
+    print(f"✓ Flask {version} installed")
+    return True
 
 
 def check_required_files():
@@ -5,8 +5,11 @@ Evaluates safety level based on environmental and situational inputs
 
 from dataclasses import dataclass
 from enum import Enum
-from typing import Tuple, Optional
-import math
+from typing import Dict, List, Tuple, Optional
+
+
+# Risk levels in ascending order; the index is the level's compact code
+RISK_LEVELS = ("Low", "Medium", "High")
 
 
 class CrowdDensity(Enum):
@@ -22,6 +25,9 @@ class SafetyAssessment:
     threat_reason: str
     recommended_action: str
     emergency_actions: list = None
+    nearest_safe_places: list = None
+    threat_factors: list = None
+    contributions: list = None
 
     def __str__(self):
         result = f"""Risk Score: {self.risk_score}
@@ -32,6 +38,15 @@ Recommended Action: {self.recommended_action}"""
             result += f"\nEmergency Actions:\n"
             for action in self.emergency_actions:
                 result += f"  - {action}\n"
+        if self.nearest_safe_places:
+            result += f"\nNearest Safe Places:\n"
+            for place in self.nearest_safe_places:
+                result += f"  - {place['name']} ({place['category']}, {place['distance_m']:.0f} m)\n"
+        if self.contributions:
+            result += f"\nFactor Contributions:\n"
+            for item in self.contributions:
+                result += (f"  - {item['factor']}: risk {item['risk']:.2f} x weight "
+                           f"{item['weight']:g} = {item['points']:.1f} points\n")
         return result
 
 
@@ -53,8 +68,94 @@ class SafetyAnalyzer:
         "gps_validity": 15
     }
     
-    def __init__(self):
-        pass
+    # Factor evaluation order (matches WEIGHTS) and the reason shown when a
+    # factor's risk exceeds 0.5
+    FACTORS = tuple(WEIGHTS)
+    THREAT_REASONS = {
+        "night_time": "night hours",
+        "crowd_density": "low crowd density",
+        "crime_history": "high crime area",
+        "network_availability": "no network connectivity",
+        "movement_speed": "stationary or slow movement",
+        "gps_validity": "invalid GPS coordinates",
+        "geofence": "inside a danger zone",
+        "movement_anomaly": "abrupt stop or erratic movement"
+    }
+    
+    # Optional factors, scored only when a caller supplies their risk (e.g.
+    # from a geofence); their weight then joins the total
+    EXTRA_WEIGHTS = {
+        "geofence": 20,
+        "movement_anomaly": 15
+    }
+    # Every factor that can appear in threat_factors (bit order of threat masks)
+    ALL_FACTORS = FACTORS + tuple(EXTRA_WEIGHTS)
+    
+    THREAT_REASON_PREFIX = "Multiple risk factors: "
+    SAFE_REASON = "Safe conditions detected"
+    
+    RECOMMENDED_ACTIONS = {
+        "Low": "Continue normal activities. Stay aware of surroundings.",
+        "Medium": "Increase vigilance. Consider moving to a safer area or increasing visibility. Contact trusted contacts about your location.",
+        "High": "Prioritize immediate safety. Move to a well-lit, populated area immediately."
+    }
+    
+    EMERGENCY_ACTIONS = (
+        "Trigger Alarm",
+        "Send SOS to emergency contacts",
+        "Flashlight Activation",
+        "Move to safer area immediately",
+        "Contact local authorities if needed"
+    )
+    
+    # Axes of the precomputed core score table (FACTORS order). Each factor
+    # takes a handful of discrete risk values; these inputs produce each one,
+    # mirroring the branches of the calculate_* methods.
+    CORE_HOURS = (12, 23, -1)                       # day, night, invalid
+    CORE_CROWD = {density: i for i, density in enumerate(CrowdDensity)}
+    CORE_CRIME = tuple(range(101)) + (-1, 101)      # valid, below range, above range
+    CORE_NETWORK = (True, False)
+    CORE_SPEEDS = (-1.0, 0.0, 1.0)                  # invalid, stationary, moving
+    CORE_POSITIONS = ((0.0, 0.0), (91.0, 0.0))      # valid, invalid
+    
+    def __init__(self, safe_places=None, safe_place_count: int = 3, crime_grid=None,
+                 tz_index=None, weights: Optional[Dict[str, float]] = None,
+                 low_risk_max: Optional[int] = None, medium_risk_max: Optional[int] = None):
+        """
+        Args:
+            safe_places: Optional SafePlaceIndex; High results then list
+                the nearest safe places
+            safe_place_count: Number of safe places returned
+            crime_grid: Optional CrimeGrid of hour-of-week crime scores that
+                replaces the static crime score when the weekday is known
+            tz_index: Optional TimezoneIndex used to derive local time from
+                timestamps; without one the nautical zone is used
+            weights: Per-factor weights replacing WEIGHTS for this analyzer
+                (every factor in FACTORS must be given)
+            low_risk_max: Highest Low score, replacing LOW_RISK_MAX
+            medium_risk_max: Highest Medium score, replacing MEDIUM_RISK_MAX
+        """
+        self.safe_places = safe_places
+        self.safe_place_count = safe_place_count
+        self.crime_grid = crime_grid
+        self.tz_index = tz_index
+
+        # Instance overrides shadow the class defaults (tenant profiles)
+        if weights is not None:
+            if set(weights) != set(self.FACTORS):
+                raise ValueError(f"weights must cover exactly {', '.join(self.FACTORS)}")
+            if any(weight < 0 for weight in weights.values()) or not sum(weights.values()):
+                raise ValueError("weights must be non-negative and not all zero")
+            self.WEIGHTS = {factor: weights[factor] for factor in self.FACTORS}
+        if low_risk_max is not None:
+            self.LOW_RISK_MAX = low_risk_max
+        if medium_risk_max is not None:
+            self.MEDIUM_RISK_MAX = medium_risk_max
+            self.HIGH_RISK_MIN = medium_risk_max + 1
+        if not 0 <= self.LOW_RISK_MAX <= self.MEDIUM_RISK_MAX <= 100:
+            raise ValueError("risk thresholds must satisfy 0 <= low <= medium <= 100")
+        self._core_table = None
+        self._core_risk_columns = None
     
     def is_valid_coordinates(self, latitude: float, longitude: float) -> bool:
         """Validate GPS coordinates"""
@@ -65,6 +166,17 @@ class SafetyAnalyzer:
         except (TypeError, ValueError):
             return False
     
+    def local_time(self, timestamp: float, latitude: float, longitude: float) -> Tuple[int, int]:
+        """Local (hour, weekday) at a coordinate for a UNIX timestamp"""
+        if self.tz_index is not None:
+            local = self.tz_index.local_time(timestamp, latitude, longitude)
+        else:
+            # Imported here so scalar scoring never loads the timezone stack
+            from datetime import datetime
+            from tz_index import nautical_timezone
+            local = datetime.fromtimestamp(timestamp, nautical_timezone(longitude))
+        return local.hour, local.weekday()
+    
     def calculate_night_time_risk(self, hour: int) -> float:
         """Calculate risk factor for time of day (21-6 is night)"""
         if not 0 <= hour < 24:
@@ -89,6 +201,14 @@ class SafetyAnalyzer:
             return 0.5  # Invalid score increases risk
         return crime_score / 100.0
     
+    def crime_score_at(self, latitude: float, longitude: float, hour: int,
+                       weekday: Optional[int], crime_score: int) -> int:
+        """Time-specific crime score from the crime grid, else the static score"""
+        if self.crime_grid is None or weekday is None or not 0 <= hour < 24:
+            return crime_score
+        value = self.crime_grid.lookup(latitude, longitude, (weekday % 7) * 24 + hour)
+        return crime_score if value is None else value
+    
     def calculate_network_risk(self, network_available: bool) -> float:
         """Calculate risk factor for network availability"""
         return 0.0 if network_available else 1.0
@@ -115,6 +235,66 @@ class SafetyAnalyzer:
         """Calculate risk factor for GPS validity"""
         return 0.0 if self.is_valid_coordinates(latitude, longitude) else 1.0
     
+    def factor_risks(self,
+                     hour: int,
+                     latitude: float,
+                     longitude: float,
+                     crowd_density: CrowdDensity,
+                     crime_score: int,
+                     movement_speed: float,
+                     network_available: bool) -> Tuple[float, ...]:
+        """Evaluate every risk factor, returned in FACTORS order"""
+        return (
+            self.calculate_night_time_risk(hour),
+            self.calculate_crowd_density_risk(crowd_density),
+            self.calculate_crime_history_risk(crime_score),
+            self.calculate_network_risk(network_available),
+            self.calculate_movement_speed_risk(movement_speed, crime_score),
+            self.calculate_gps_validity_risk(latitude, longitude)
+        )
+    
+    def score_risks(self, risks: Tuple[float, ...],
+                    extra_risks: Optional[Dict[str, float]] = None) -> int:
+        """Combine factor risks (FACTORS order) and any extra factor risks into a 0-100 risk score"""
+        total = 0.0
+        for factor, risk in zip(self.FACTORS, risks):
+            total += risk * self.WEIGHTS[factor]
+        weight = sum(self.WEIGHTS.values())
+        if extra_risks:
+            unknown = set(extra_risks) - set(self.EXTRA_WEIGHTS)
+            if unknown:
+                raise ValueError(f"Unknown extra factors: {', '.join(sorted(unknown))}")
+            for factor, factor_weight in self.EXTRA_WEIGHTS.items():
+                if factor in extra_risks:
+                    total += extra_risks[factor] * factor_weight
+                    weight += factor_weight
+        return int(round(total / weight * 100))
+    
+    def contributions(self, risks: Tuple[float, ...],
+                      extra_risks: Optional[Dict[str, float]] = None) -> List[dict]:
+        """
+        Per-factor breakdown of score_risks for the same arguments
+        
+        Each scored factor gives its raw risk, weight and points (its share
+        of the 0-100 score before rounding), in ALL_FACTORS order.
+        """
+        scored = list(zip(self.FACTORS, risks, (self.WEIGHTS[f] for f in self.FACTORS)))
+        if extra_risks:
+            scored += [(factor, extra_risks[factor], weight)
+                       for factor, weight in self.EXTRA_WEIGHTS.items() if factor in extra_risks]
+        total_weight = sum(weight for _, _, weight in scored)
+        return [{"factor": factor, "risk": risk, "weight": weight,
+                 "points": round(risk * weight / total_weight * 100, 2)}
+                for factor, risk, weight in scored]
+    
+    def risk_level_for(self, risk_score: int) -> str:
+        """Map a risk score onto its Low/Medium/High level"""
+        if risk_score <= self.LOW_RISK_MAX:
+            return "Low"
+        if risk_score <= self.MEDIUM_RISK_MAX:
+            return "Medium"
+        return "High"
+    
     def assess_safety(self,
                      hour: int,
                      latitude: float,
@@ -122,7 +302,11 @@ class SafetyAnalyzer:
                      crowd_density: CrowdDensity,
                      crime_score: int,
                      movement_speed: float,
-                     network_available: bool) -> SafetyAssessment:
+                     network_available: bool,
+                     weekday: Optional[int] = None,
+                     timestamp: Optional[float] = None,
+                     extra_risks: Optional[Dict[str, float]] = None,
+                     explain: bool = False) -> SafetyAssessment:
         """
         Comprehensive safety assessment combining all factors
         
@@ -134,85 +318,262 @@ class SafetyAnalyzer:
             crime_score: Crime history score (0-100)
             movement_speed: Current movement speed (>= 0)
             network_available: Boolean for network availability
+            weekday: Day of week (0 = Monday); with a crime grid, selects the
+                hour-of-week crime score for the location
+            timestamp: UNIX time; when given, hour and weekday are derived
+                from it in the local timezone of the coordinates
+            extra_risks: Risks (0-1) of optional factors in EXTRA_WEIGHTS,
+                e.g. {"geofence": 1.0}; factors left out are not scored
+            explain: Also fill contributions with the per-factor breakdown
             
         Returns:
             SafetyAssessment object with score, level, reasons, and actions
         """
         
-        # Calculate individual risk factors
-        night_risk = self.calculate_night_time_risk(hour)
-        crowd_risk = self.calculate_crowd_density_risk(crowd_density)
-        crime_risk = self.calculate_crime_history_risk(crime_score)
-        network_risk = self.calculate_network_risk(network_available)
-        movement_risk = self.calculate_movement_speed_risk(movement_speed, crime_score)
-        gps_risk = self.calculate_gps_validity_risk(latitude, longitude)
-        
-        # Calculate weighted risk score
-        total_score = (
-            night_risk * self.WEIGHTS["night_time"] +
-            crowd_risk * self.WEIGHTS["crowd_density"] +
-            crime_risk * self.WEIGHTS["crime_history"] +
-            network_risk * self.WEIGHTS["network_availability"] +
-            movement_risk * self.WEIGHTS["movement_speed"] +
-            gps_risk * self.WEIGHTS["gps_validity"]
-        ) / sum(self.WEIGHTS.values()) * 100
+        risks = self._resolved_risks(hour, latitude, longitude, crowd_density, crime_score,
+                                     movement_speed, network_available, weekday, timestamp)
+        assessment = self._assessment_from_risks(risks, extra_risks, explain)
+        self._add_safe_places(assessment, latitude, longitude)
+        return assessment
+    
+    def assess_batch(self, requests: List[dict]) -> List[SafetyAssessment]:
+        """
+        Assess many inputs in one call
         
-        risk_score = int(round(total_score))
+        Each request is a dict of assess_safety keyword arguments. Inputs
+        with identical factor risks share one scoring and text-building
+        pass, so batches of similar requests cost little more than one;
+        explained requests share the breakdown too.
         
-        # Determine risk level
-        if risk_score <= self.LOW_RISK_MAX:
-            risk_level = "Low"
-        elif risk_score <= self.MEDIUM_RISK_MAX:
-            risk_level = "Medium"
-        else:
-            risk_level = "High"
+        Returns:
+            SafetyAssessment per request, in order
+        """
+        built: Dict[tuple, SafetyAssessment] = {}
+        results = []
+        for kwargs in requests:
+            extra_risks = kwargs.get("extra_risks")
+            explain = kwargs.get("explain", False)
+            if "extra_risks" in kwargs or "explain" in kwargs:
+                kwargs = {key: value for key, value in kwargs.items()
+                          if key != "extra_risks" and key != "explain"}
+            risks = self._resolved_risks(**kwargs)
+            key = (risks, tuple(sorted(extra_risks.items()))) if extra_risks else risks
+            if explain:
+                key = (key, "explain")
+            template = built.get(key)
+            if template is None:
+                template = built[key] = self._assessment_from_risks(risks, extra_risks, explain)
+            assessment = SafetyAssessment(
+                risk_score=template.risk_score,
+                risk_level=template.risk_level,
+                threat_reason=template.threat_reason,
+                recommended_action=template.recommended_action,
+                emergency_actions=list(template.emergency_actions) if template.emergency_actions else None,
+                threat_factors=list(template.threat_factors),
+                contributions=[dict(item) for item in template.contributions]
+                if template.contributions else None
+            )
+            self._add_safe_places(assessment, kwargs["latitude"], kwargs["longitude"])
+            results.append(assessment)
+        return results
+    
+    def _resolved_risks(self,
+                        hour: int,
+                        latitude: float,
+                        longitude: float,
+                        crowd_density: CrowdDensity,
+                        crime_score: int,
+                        movement_speed: float,
+                        network_available: bool,
+                        weekday: Optional[int] = None,
+                        timestamp: Optional[float] = None) -> Tuple[float, ...]:
+        """Factor risks after deriving local time and the time-specific crime score"""
+        if timestamp is not None:
+            hour, weekday = self.local_time(timestamp, latitude, longitude)
+        crime_score = self.crime_score_at(latitude, longitude, hour, weekday, crime_score)
+        return self.factor_risks(hour, latitude, longitude, crowd_density,
+                                 crime_score, movement_speed, network_available)
+    
+    def _assessment_from_risks(self, risks: Tuple[float, ...],
+                               extra_risks: Optional[Dict[str, float]] = None,
+                               explain: bool = False) -> SafetyAssessment:
+        """Score, level, reasons and actions for a set of factor risks"""
+        risk_score = self.score_risks(risks, extra_risks)
+        risk_level = self.risk_level_for(risk_score)
         
         # Generate threat reason
-        threat_reasons = []
-        if night_risk > 0.5:
-            threat_reasons.append("night hours")
-        if crowd_risk > 0.5:
-            threat_reasons.append("low crowd density")
-        if crime_risk > 0.5:
-            threat_reasons.append("high crime area")
-        if network_risk > 0.5:
-            threat_reasons.append("no network connectivity")
-        if movement_risk > 0.5:
-            threat_reasons.append("stationary or slow movement")
-        if gps_risk > 0.5:
-            threat_reasons.append("invalid GPS coordinates")
+        threat_factors = self._threat_factors(risks, extra_risks)
+        threat_reasons = [self.THREAT_REASONS[factor] for factor in threat_factors]
         
         if threat_reasons:
-            threat_reason = "Multiple risk factors: " + ", ".join(threat_reasons)
+            threat_reason = self.THREAT_REASON_PREFIX + ", ".join(threat_reasons)
         else:
-            threat_reason = "Safe conditions detected"
+            threat_reason = self.SAFE_REASON
         
         # Generate recommended action
-        if risk_level == "Low":
-            recommended_action = "Continue normal activities. Stay aware of surroundings."
-        elif risk_level == "Medium":
-            recommended_action = "Increase vigilance. Consider moving to a safer area or increasing visibility. Contact trusted contacts about your location."
-        else:  # High
-            recommended_action = "Prioritize immediate safety. Move to a well-lit, populated area immediately."
+        recommended_action = self.RECOMMENDED_ACTIONS[risk_level]
         
         # Emergency actions for high risk
         emergency_actions = None
         if risk_level == "High":
-            emergency_actions = [
-                "Trigger Alarm",
-                "Send SOS to emergency contacts",
-                "Flashlight Activation",
-                "Move to safer area immediately",
-                "Contact local authorities if needed"
-            ]
+            emergency_actions = list(self.EMERGENCY_ACTIONS)
         
         return SafetyAssessment(
             risk_score=risk_score,
             risk_level=risk_level,
             threat_reason=threat_reason,
             recommended_action=recommended_action,
-            emergency_actions=emergency_actions
+            emergency_actions=emergency_actions,
+            threat_factors=threat_factors,
+            contributions=self.contributions(risks, extra_risks) if explain else None
+        )
+    
+    def _threat_factors(self, risks: Tuple[float, ...],
+                        extra_risks: Optional[Dict[str, float]] = None) -> List[str]:
+        """Factors whose risk exceeds 0.5, in ALL_FACTORS order"""
+        threat_factors = [factor for factor, risk in zip(self.FACTORS, risks) if risk > 0.5]
+        if extra_risks:
+            threat_factors += [factor for factor in self.EXTRA_WEIGHTS
+                               if extra_risks.get(factor, 0.0) > 0.5]
+        return threat_factors
+    
+    def core_table(self) -> Tuple[bytes, bytes]:
+        """
+        (scores, threat masks) for every combination of discrete factor
+        risks, built on first use (~11k entries)
+        
+        The risk of each factor per table class is kept alongside (see
+        _core_risks), so explained fast-path results read their breakdown
+        from the table too.
+        """
+        if self._core_table is None:
+            night = [self.calculate_night_time_risk(hour) for hour in self.CORE_HOURS]
+            crowd = [self.calculate_crowd_density_risk(density) for density in self.CORE_CROWD]
+            crime = [self.calculate_crime_history_risk(score) for score in self.CORE_CRIME]
+            network = [self.calculate_network_risk(available) for available in self.CORE_NETWORK]
+            # Movement speed risk depends on the crime score: one row per crime class
+            speed = [[self.calculate_movement_speed_risk(speed, score) for speed in self.CORE_SPEEDS]
+                     for score in self.CORE_CRIME]
+            gps = [self.calculate_gps_validity_risk(lat, lon) for lat, lon in self.CORE_POSITIONS]
+            scores = bytearray()
+            masks = bytearray()
+            for night_risk in night:
+                for crowd_risk in crowd:
+                    for crime_risk, speed_row in zip(crime, speed):
+                        for network_risk in network:
+                            for speed_risk in speed_row:
+                                for gps_risk in gps:
+                                    risks = (night_risk, crowd_risk, crime_risk,
+                                             network_risk, speed_risk, gps_risk)
+                                    scores.append(self.score_risks(risks))
+                                    masks.append(sum(1 << i for i, risk in enumerate(risks)
+                                                     if risk > 0.5))
+            self._core_risk_columns = (night, crowd, crime, network, speed, gps)
+            self._core_table = (bytes(scores), bytes(masks))
+        return self._core_table
+    
+    @property
+    def cache_bytes(self) -> int:
+        """Memory held by the core table (0 until first built)"""
+        return sum(len(part) for part in self._core_table) if self._core_table else 0
+    
+    def _core_classes(self, hour: int, latitude: float, longitude: float,
+                      crowd_density: CrowdDensity, crime_score: int, movement_speed: float,
+                      network_available: bool) -> Optional[Tuple[int, ...]]:
+        """Class of each input along the core table axes (None for non-integer crime scores)"""
+        if not isinstance(crime_score, int):
+            return None
+        night = (1 if 21 <= hour or hour < 6 else 0) if 0 <= hour < 24 else 2
+        crowd = self.CORE_CROWD.get(crowd_density, 1)
+        crime = crime_score if 0 <= crime_score <= 100 else (101 if crime_score < 0 else 102)
+        network = 0 if network_available else 1
+        speed = 2 if movement_speed > 0 else 1 if movement_speed == 0 else 0
+        gps = 0 if self.is_valid_coordinates(latitude, longitude) else 1
+        return night, crowd, crime, network, speed, gps
+    
+    def _core_index(self, classes: Tuple[int, ...]) -> int:
+        """Core table index for the classes of _core_classes"""
+        night, crowd, crime, network, speed, gps = classes
+        return ((((night * 3 + crowd) * len(self.CORE_CRIME) + crime) * 2 + network) * 3 + speed) * 2 + gps
+    
+    def _core_risks(self, classes: Tuple[int, ...]) -> Tuple[float, ...]:
+        """Factor risks (FACTORS order) stored with the core table for the classes"""
+        self.core_table()
+        night, crowd, crime, network, speed, gps = self._core_risk_columns
+        return (night[classes[0]], crowd[classes[1]], crime[classes[2]],
+                network[classes[3]], speed[classes[2]][classes[4]], gps[classes[5]])
+    
+    def assess_core(self,
+                    hour: int,
+                    latitude: float,
+                    longitude: float,
+                    crowd_density: CrowdDensity,
+                    crime_score: int,
+                    movement_speed: float,
+                    network_available: bool,
+                    extra_risks: Optional[Dict[str, float]] = None,
+                    explain: bool = False) -> SafetyAssessment:
+        """
+        Score and level straight from the core table (deadline fast path)
+        
+        Skips the crime grid, safe places and reason text; threat_factors
+        still names the factors. Score and level equal assess_safety's for
+        the same inputs when no crime grid applies. Extra factor risks are
+        scored directly, bypassing the table. With explain, contributions
+        come from the risks stored with the table.
+        """
+        classes = None
+        if not extra_risks:
+            classes = self._core_classes(hour, latitude, longitude, crowd_density, crime_score,
+                                         movement_speed, network_available)
+        contributions = None
+        if classes is None:
+            risks = self.factor_risks(hour, latitude, longitude, crowd_density, crime_score,
+                                      movement_speed, network_available)
+            risk_score = self.score_risks(risks, extra_risks)
+            threat_factors = self._threat_factors(risks, extra_risks)
+            if explain:
+                contributions = self.contributions(risks, extra_risks)
+        else:
+            scores, masks = self.core_table()
+            index = self._core_index(classes)
+            risk_score = scores[index]
+            threat_factors = threat_factors_from_mask(masks[index])
+            if explain:
+                contributions = self.contributions(self._core_risks(classes))
+        risk_level = self.risk_level_for(risk_score)
+        return SafetyAssessment(
+            risk_score=risk_score,
+            risk_level=risk_level,
+            threat_reason="",
+            recommended_action="",
+            emergency_actions=list(self.EMERGENCY_ACTIONS) if risk_level == "High" else None,
+            threat_factors=threat_factors,
+            contributions=contributions
         )
+    
+    def _add_safe_places(self, assessment: SafetyAssessment, latitude: float, longitude: float):
+        """Attach the nearest safe places to High results"""
+        if (assessment.risk_level == "High" and self.safe_places is not None
+                and self.is_valid_coordinates(latitude, longitude)):
+            assessment.nearest_safe_places = [
+                place.to_dict(distance)
+                for place, distance in self.safe_places.nearest(latitude, longitude,
+                                                                self.safe_place_count)
+            ]
+
+
+def threat_mask(threat_factors: Optional[list]) -> int:
+    """Pack threat factor names into a bitmask (bit i = SafetyAnalyzer.ALL_FACTORS[i])"""
+    mask = 0
+    for factor in threat_factors or ():
+        mask |= 1 << SafetyAnalyzer.ALL_FACTORS.index(factor)
+    return mask
+
+
+def threat_factors_from_mask(mask: int) -> list:
+    """Unpack a threat bitmask into factor names"""
+    return [factor for i, factor in enumerate(SafetyAnalyzer.ALL_FACTORS) if mask >> i & 1]
 
 
 def main():
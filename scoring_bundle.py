@@ -0,0 +1,314 @@
+"""
+Scoring Bundle
+Exports an analyzer's compiled scoring rules for on-device / offline
+evaluation, plus a reference evaluator that reproduces assess_safety
+
+A bundle is a JSON document holding the weights, thresholds and texts, the
+per-class risk of every factor, the core score/threat-mask table and,
+optionally, a tile of the crime grid. Its sha256 (over the canonical JSON
+of everything else) is both the integrity check and the version clients
+sync on.
+"""
+
+import base64
+import hashlib
+import json
+import math
+import sys
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+FORMAT = "safety-scoring-bundle"
+VERSION = 1
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text.encode("ascii"))
+
+
+def bundle_hash(bundle: dict) -> str:
+    """sha256 of a bundle's canonical JSON, excluding its own hash"""
+    body = {key: value for key, value in bundle.items() if key != "sha256"}
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def build_bundle(analyzer, crime_bbox: Optional[Tuple[float, float, float, float]] = None) -> dict:
+    """
+    Compile a SafetyAnalyzer's rules into a bundle
+
+    Args:
+        analyzer: SafetyAnalyzer (its weights and thresholds, which may be
+            a tenant's, are exported)
+        crime_bbox: (south, west, north, east) of the crime grid tile to
+            include; requires the analyzer to have a crime grid
+    """
+    from safety_analyzer import CrowdDensity
+
+    scores, masks = analyzer.core_table()
+    night_classes = {analyzer.calculate_night_time_risk(hour): i
+                     for i, hour in enumerate(analyzer.CORE_HOURS)}
+    bundle = {
+        "format": FORMAT,
+        "version": VERSION,
+        "factors": list(analyzer.FACTORS),
+        "weights": dict(analyzer.WEIGHTS),
+        "extra_weights": dict(analyzer.EXTRA_WEIGHTS),
+        "thresholds": {"low_risk_max": analyzer.LOW_RISK_MAX,
+                       "medium_risk_max": analyzer.MEDIUM_RISK_MAX},
+        "texts": {
+            "threat_reasons": dict(analyzer.THREAT_REASONS),
+            "threat_reason_prefix": analyzer.THREAT_REASON_PREFIX,
+            "safe_reason": analyzer.SAFE_REASON,
+            "recommended_actions": dict(analyzer.RECOMMENDED_ACTIONS),
+            "emergency_actions": list(analyzer.EMERGENCY_ACTIONS)
+        },
+        # Input -> class rules (see BundleEvaluator.classes)
+        "classes": {
+            "hours": [night_classes[analyzer.calculate_night_time_risk(hour)] for hour in range(24)],
+            "crowd_density": {density.name: i for density, i in analyzer.CORE_CROWD.items()},
+            "crowd_density_default": analyzer.CORE_CROWD[CrowdDensity.MEDIUM],
+            "crime_max": 100
+        },
+        "shape": [len(analyzer.CORE_HOURS), len(analyzer.CORE_CROWD), len(analyzer.CORE_CRIME),
+                  len(analyzer.CORE_NETWORK), len(analyzer.CORE_SPEEDS), len(analyzer.CORE_POSITIONS)],
+        # Risk of each factor per class; movement speed is per (crime class, speed class)
+        "risks": {
+            "night_time": [analyzer.calculate_night_time_risk(h) for h in analyzer.CORE_HOURS],
+            "crowd_density": [analyzer.calculate_crowd_density_risk(d) for d in analyzer.CORE_CROWD],
+            "crime_history": [analyzer.calculate_crime_history_risk(c) for c in analyzer.CORE_CRIME],
+            "network_availability": [analyzer.calculate_network_risk(n)
+                                     for n in analyzer.CORE_NETWORK],
+            "movement_speed": [[analyzer.calculate_movement_speed_risk(speed, c)
+                                for speed in analyzer.CORE_SPEEDS] for c in analyzer.CORE_CRIME],
+            "gps_validity": [analyzer.calculate_gps_validity_risk(lat, lon)
+                             for lat, lon in analyzer.CORE_POSITIONS]
+        },
+        "table": {"scores": _b64(scores), "masks": _b64(masks)},
+        "crime_tile": None
+    }
+    if crime_bbox is not None:
+        grid = analyzer.crime_grid
+        if grid is None:
+            raise ValueError("crime_bbox needs an analyzer with a crime grid")
+        row0, col0, rows, cols, body = grid.tile(*crime_bbox)
+        bundle["crime_tile"] = {
+            "south": grid.south, "west": grid.west, "cell_deg": grid.cell_deg,
+            "row0": row0, "col0": col0, "rows": rows, "cols": cols,
+            "scores": _b64(zlib.compress(body, 9))   # 168 bytes per cell, 255 = no data
+        }
+    bundle["sha256"] = bundle_hash(bundle)
+    return bundle
+
+
+def dump_bundle(bundle: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(bundle, f, separators=(",", ":"))
+
+
+def load_bundle(path: str) -> dict:
+    """Read a bundle file, checking its format, version and hash"""
+    with open(path, "r", encoding="utf-8") as f:
+        bundle = json.load(f)
+    verify_bundle(bundle)
+    return bundle
+
+
+def verify_bundle(bundle: dict):
+    """Raise ValueError unless the bundle is an intact bundle of this version"""
+    if bundle.get("format") != FORMAT or bundle.get("version") != VERSION:
+        raise ValueError(f"not a version {VERSION} scoring bundle")
+    if bundle.get("sha256") != bundle_hash(bundle):
+        raise ValueError("scoring bundle hash mismatch")
+
+
+class BundleEvaluator:
+    """
+    Reference evaluator of a scoring bundle
+
+    Written against the bundle alone (no analyzer) so it doubles as the
+    specification for on-device ports. For the same inputs it returns the
+    score, level, reason, action, emergency actions and threat factors of
+    assess_safety on the exporting analyzer; crime grid scores are used
+    inside the exported tile only, and safe places are not included.
+    Crime scores must be integers.
+    """
+
+    def __init__(self, bundle: dict):
+        verify_bundle(bundle)
+        self.bundle = bundle
+        self.factors: List[str] = bundle["factors"]
+        self.weights: Dict[str, float] = bundle["weights"]
+        self.extra_weights: Dict[str, float] = bundle["extra_weights"]
+        self.low_risk_max = bundle["thresholds"]["low_risk_max"]
+        self.medium_risk_max = bundle["thresholds"]["medium_risk_max"]
+        self.texts = bundle["texts"]
+        self.rules = bundle["classes"]
+        self.shape = bundle["shape"]
+        self.risks = bundle["risks"]
+        self.scores = _unb64(bundle["table"]["scores"])
+        self.masks = _unb64(bundle["table"]["masks"])
+        tile = bundle.get("crime_tile")
+        self.tile = tile
+        self.tile_scores = zlib.decompress(_unb64(tile["scores"])) if tile else b""
+
+    def crime_score_at(self, latitude: float, longitude: float, hour: int,
+                       weekday: Optional[int], crime_score: int) -> int:
+        """Crime score from the tile for the hour of week, else the static score"""
+        tile = self.tile
+        if tile is None or weekday is None or not 0 <= hour < 24:
+            return crime_score
+        row = int((latitude - tile["south"]) // tile["cell_deg"]) - tile["row0"]
+        col = int((longitude - tile["west"]) // tile["cell_deg"]) - tile["col0"]
+        if not (0 <= row < tile["rows"] and 0 <= col < tile["cols"]):
+            return crime_score
+        value = self.tile_scores[(row * tile["cols"] + col) * 168 + (weekday % 7) * 24 + hour]
+        return crime_score if value == 255 else value
+
+    def classes(self, hour: float, latitude: float, longitude: float, crowd_density,
+                crime_score: int, movement_speed: float,
+                network_available: bool) -> Tuple[int, int, int, int, int, int]:
+        """Class of each input along the table axes"""
+        if not isinstance(crime_score, int):
+            raise ValueError("crime_score must be an integer")
+        # Hours outside 0-23 take the last (invalid) class
+        night = self.rules["hours"][int(math.floor(hour))] if 0 <= hour < 24 else self.shape[0] - 1
+        name = getattr(crowd_density, "name", crowd_density)
+        crowd = self.rules["crowd_density"].get(name, self.rules["crowd_density_default"])
+        crime_max = self.rules["crime_max"]
+        crime = crime_score if 0 <= crime_score <= crime_max else \
+            (crime_max + 1 if crime_score < 0 else crime_max + 2)
+        network = 0 if network_available else 1
+        speed = 2 if movement_speed > 0 else 1 if movement_speed == 0 else 0
+        gps = 0 if -90 <= latitude <= 90 and -180 <= longitude <= 180 else 1
+        return night, crowd, crime, network, speed, gps
+
+    def assess(self,
+               hour: float,
+               latitude: float,
+               longitude: float,
+               crowd_density,
+               crime_score: int,
+               movement_speed: float,
+               network_available: bool,
+               weekday: Optional[int] = None,
+               extra_risks: Optional[Dict[str, float]] = None,
+               explain: bool = False) -> dict:
+        """Assessment fields as assess_safety returns them (contributions too with explain)"""
+        crime_score = self.crime_score_at(latitude, longitude, hour, weekday, crime_score)
+        classes = self.classes(hour, latitude, longitude, crowd_density, crime_score,
+                               movement_speed, network_available)
+        if extra_risks:
+            risk_score, threat_factors = self._score_direct(classes, extra_risks)
+        else:
+            index = 0
+            for size, value in zip(self.shape, classes):
+                index = index * size + value
+            risk_score = self.scores[index]
+            threat_factors = [factor for i, factor in enumerate(self.factors)
+                              if self.masks[index] >> i & 1]
+
+        if risk_score <= self.low_risk_max:
+            risk_level = "Low"
+        elif risk_score <= self.medium_risk_max:
+            risk_level = "Medium"
+        else:
+            risk_level = "High"
+        reasons = [self.texts["threat_reasons"][factor] for factor in threat_factors]
+        result = {
+            "risk_score": risk_score,
+            "risk_level": risk_level,
+            "threat_reason": self.texts["threat_reason_prefix"] + ", ".join(reasons)
+            if reasons else self.texts["safe_reason"],
+            "recommended_action": self.texts["recommended_actions"][risk_level],
+            "emergency_actions": list(self.texts["emergency_actions"])
+            if risk_level == "High" else None,
+            "threat_factors": threat_factors
+        }
+        if explain:
+            result["contributions"] = self.contributions(classes, extra_risks)
+        return result
+
+    def _risks(self, classes: Tuple[int, ...]) -> Tuple[float, ...]:
+        night, crowd, crime, network, speed, gps = classes
+        return (
+            self.risks["night_time"][night],
+            self.risks["crowd_density"][crowd],
+            self.risks["crime_history"][crime],
+            self.risks["network_availability"][network],
+            self.risks["movement_speed"][crime][speed],
+            self.risks["gps_validity"][gps]
+        )
+
+    def contributions(self, classes: Tuple[int, ...],
+                      extra_risks: Optional[Dict[str, float]] = None) -> List[dict]:
+        """Per-factor breakdown, as SafetyAnalyzer.contributions gives it"""
+        scored = [(factor, risk, self.weights[factor])
+                  for factor, risk in zip(self.factors, self._risks(classes))]
+        if extra_risks:
+            scored += [(factor, extra_risks[factor], weight)
+                       for factor, weight in self.extra_weights.items() if factor in extra_risks]
+        total_weight = sum(weight for _, _, weight in scored)
+        return [{"factor": factor, "risk": risk, "weight": weight,
+                 "points": round(risk * weight / total_weight * 100, 2)}
+                for factor, risk, weight in scored]
+
+    def _score_direct(self, classes: Tuple[int, ...],
+                      extra_risks: Dict[str, float]) -> Tuple[int, List[str]]:
+        # Same arithmetic, in the same order, as SafetyAnalyzer.score_risks
+        risks = self._risks(classes)
+        unknown = set(extra_risks) - set(self.extra_weights)
+        if unknown:
+            raise ValueError(f"Unknown extra factors: {', '.join(sorted(unknown))}")
+        total = 0.0
+        for factor, risk in zip(self.factors, risks):
+            total += risk * self.weights[factor]
+        weight = sum(self.weights.values())
+        for factor, factor_weight in self.extra_weights.items():
+            if factor in extra_risks:
+                total += extra_risks[factor] * factor_weight
+                weight += factor_weight
+        threat_factors = [factor for factor, risk in zip(self.factors, risks) if risk > 0.5]
+        threat_factors += [factor for factor in self.extra_weights
+                           if extra_risks.get(factor, 0.0) > 0.5]
+        return int(round(total / weight * 100)), threat_factors
+
+
+def main(argv: List[str]) -> int:
+    """Command line: scoring_bundle.py export <out.json> [crime_grid south,west,north,east] | verify <bundle.json>"""
+    if len(argv) < 2 or argv[0] not in ("export", "verify") or \
+            (argv[0] == "export" and len(argv) not in (2, 4)):
+        print("Usage: python scoring_bundle.py export <out.json> [crime_grid south,west,north,east]"
+              " | verify <bundle.json>")
+        return 1
+    if argv[0] == "verify":
+        try:
+            bundle = load_bundle(argv[1])
+        except ValueError as e:
+            print(f"{argv[1]}: {e}")
+            return 1
+        print(f"{argv[1]}: ok, sha256 {bundle['sha256']}")
+        return 0
+
+    from safety_analyzer import SafetyAnalyzer
+    grid = bbox = None
+    if len(argv) == 4:
+        from crime_grid import CrimeGrid
+        grid = CrimeGrid(argv[2])
+        bbox = tuple(float(value) for value in argv[3].split(","))
+    try:
+        bundle = build_bundle(SafetyAnalyzer(crime_grid=grid), bbox)
+    finally:
+        if grid is not None:
+            grid.close()
+    dump_bundle(bundle, argv[1])
+    print(f"Wrote {argv[1]} (sha256 {bundle['sha256']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,410 @@
+"""
+SOS Dispatch
+Server-side fan-out of SOS alerts for High-risk sessions to notifier backends
+(webhook, SMTP, SMS gateway or local stubs) with retries and dedupe
+"""
+
+import hashlib
+import heapq
+import json
+import os
+import random
+import smtplib
+import sqlite3
+import sys
+import threading
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from email.message import EmailMessage
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class SOSJob:
+    idempotency_key: str
+    session_id: str
+    latitude: float
+    longitude: float
+    risk_score: int
+    threat_factors: List[str] = field(default_factory=list)
+    triggered_at: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def text(self) -> str:
+        """Short human-readable alert (SMS body, email text)"""
+        return (f"SOS: High risk (score {self.risk_score}) for session {self.session_id} "
+                f"at https://maps.google.com/?q={self.latitude:.6f},{self.longitude:.6f}")
+
+
+# ----------------------------------------------------------------- notifiers
+class Notifier:
+    """Delivery backend; send() raises on failure and may be retried"""
+    name = "notifier"
+
+    def send(self, job: SOSJob):
+        raise NotImplementedError
+
+
+class WebhookNotifier(Notifier):
+    """POSTs the job as JSON with an Idempotency-Key header"""
+    name = "webhook"
+
+    def __init__(self, url: str, timeout: float = 5.0, headers: Optional[Dict[str, str]] = None):
+        self.url = url
+        self.timeout = timeout
+        self.headers = headers or {}
+
+    def send(self, job: SOSJob):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(job.to_dict()).encode("utf-8"),
+            headers={"Content-Type": "application/json",
+                     "Idempotency-Key": job.idempotency_key, **self.headers},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class SMSGatewayNotifier(WebhookNotifier):
+    """Sends the alert text to each recipient through an HTTP SMS gateway"""
+    name = "sms"
+
+    def __init__(self, url: str, recipients: List[str], api_key: Optional[str] = None,
+                 timeout: float = 5.0):
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        super().__init__(url, timeout, headers)
+        self.recipients = recipients
+
+    def send(self, job: SOSJob):
+        for recipient in self.recipients:
+            request = urllib.request.Request(
+                self.url,
+                data=json.dumps({"to": recipient, "body": job.text()}).encode("utf-8"),
+                headers={"Content-Type": "application/json",
+                         "Idempotency-Key": f"{job.idempotency_key}:{recipient}", **self.headers},
+                method="POST"
+            )
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+
+
+class SMTPNotifier(Notifier):
+    """Emails the alert to the emergency contacts"""
+    name = "smtp"
+
+    def __init__(self, host: str, sender: str, recipients: List[str], port: int = 587,
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 starttls: bool = True, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = recipients
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def send(self, job: SOSJob):
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.recipients)
+        message["Subject"] = f"SOS alert (risk score {job.risk_score})"
+        # Lets receiving systems drop duplicates of a retried send
+        message["Message-ID"] = f"<{job.idempotency_key}@sos>"
+        message.set_content(job.text())
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            smtp.send_message(message)
+
+
+class StubNotifier(Notifier):
+    """Local stand-in that records deliveries (development, tests, benchmarks)"""
+
+    def __init__(self, name: str = "stub", delay_s: float = 0.0, failure_rate: float = 0.0,
+                 seed: Optional[int] = None, log: bool = False, keep: int = 1000):
+        """
+        Args:
+            delay_s: Simulated delivery latency
+            failure_rate: Fraction of sends that raise (transient failures)
+            log: Print each delivered alert to stderr
+            keep: Most recent deliveries kept in `sent`
+        """
+        self.name = name
+        self.delay_s = delay_s
+        self.failure_rate = failure_rate
+        self.log = log
+        self.sent: deque = deque(maxlen=keep)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def send(self, job: SOSJob):
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        with self._lock:
+            if self._random.random() < self.failure_rate:
+                raise ConnectionError(f"{self.name}: simulated failure")
+            self.sent.append(job)
+        if self.log:
+            print(f"[{self.name}] {job.text()}", file=sys.stderr)
+
+
+# ---------------------------------------------------------------- dispatcher
+class _Delivery:
+    __slots__ = ("job", "notifier", "attempts")
+
+    def __init__(self, job: SOSJob, notifier: Notifier):
+        self.job = job
+        self.notifier = notifier
+        self.attempts = 0
+
+
+class SOSDispatcher:
+    """
+    Fans SOS jobs out to every notifier concurrently, off the request path
+
+    A session at High opens an episode: one job is sent, and further High
+    fixes of that session are deduplicated until it goes episode_s without
+    a High fix. Lower levels in between do not end the episode, so a score
+    hovering around the High threshold sends one alert, not one per swing. Each (job, notifier) delivery is
+    retried with exponential backoff under the job's idempotency key.
+
+    With a path, episodes live in a SQLite file so the workers on a host
+    share them and only one sends the job. The key is derived from the
+    session and its episode start. Without a shared file, the start is
+    floored to an episode_s bucket, so workers that see the same episode
+    still derive the same key and downstream services can dedupe.
+    """
+
+    def __init__(self,
+                 notifiers: List[Notifier],
+                 workers: int = 8,
+                 max_attempts: int = 5,
+                 backoff_s: float = 0.5,
+                 max_backoff_s: float = 30.0,
+                 episode_s: float = 900.0,
+                 max_pending: int = 10000,
+                 path: Optional[str] = None):
+        """
+        Args:
+            notifiers: Backends every job is sent to
+            workers: Deliveries in flight at once
+            max_attempts: Sends tried per delivery before giving up
+            backoff_s: Delay before the first retry; doubles per attempt
+            max_backoff_s: Longest delay between retries
+            episode_s: Quiet time after which a session's episode ends
+            max_pending: Deliveries queued or waiting to retry before new
+                jobs are refused
+            path: SQLite file of episodes shared by the workers, or None
+                for in-process episodes
+        """
+        if not notifiers:
+            raise ValueError("at least one notifier is required")
+        self.notifiers = notifiers
+        self.max_attempts = max_attempts
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.episode_s = episode_s
+        self.max_pending = max_pending
+        self.path = path
+        self._local = threading.local()
+
+        self._episodes: Dict[str, Tuple[str, float]] = {}   # session -> (key, last High)
+        self._due: List[Tuple[float, int, _Delivery]] = []  # retry heap
+        self._seq = 0
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._closing = False
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sos")
+
+        # Metrics
+        self.triggered = 0
+        self.deduplicated = 0
+        self.refused = 0
+        self.delivered = 0
+        self.retries = 0
+        self.failed = 0
+        self.store_errors = 0
+        self._latencies_ms: deque = deque(maxlen=4096)
+        if path is not None:
+            self._connection()   # create the table up front
+
+        self._scheduler = threading.Thread(target=self._run, name="sos-scheduler", daemon=True)
+        self._scheduler.start()
+
+    def observe(self, session_id: str, risk_level: str, latitude: float, longitude: float,
+                risk_score: int, threat_factors: Optional[List[str]] = None,
+                now: Optional[float] = None) -> Optional[str]:
+        """
+        Feed one assessment; dispatches when a session enters High
+
+        Returns:
+            The session's episode idempotency key while it is at High, else None
+        """
+        now = time.time() if now is None else now
+        with self._cond:
+            if risk_level != "High":
+                return None   # the episode expires episode_s after its last High fix
+            key, opened = self._open_episode(session_id, now)
+            if not opened:
+                self.deduplicated += 1
+                return key
+            if self._pending + len(self.notifiers) > self.max_pending:
+                self._end_episode(session_id)   # the next High fix tries again
+                self.refused += 1
+                return None
+            job = SOSJob(key, session_id, latitude, longitude, risk_score,
+                         list(threat_factors or ()), now)
+            self.triggered += 1
+            self._pending += len(self.notifiers)
+            for notifier in self.notifiers:
+                self._schedule(_Delivery(job, notifier), 0.0)
+        return key
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread and process (connections do not survive fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS sos_episodes "
+                         "(session TEXT PRIMARY KEY, key TEXT, last_high REAL)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _key(self, session_id: str, started: float) -> str:
+        return hashlib.sha256(f"{session_id}:{started!r}".encode("utf-8")).hexdigest()[:32]
+
+    def _open_episode(self, session_id: str, now: float) -> Tuple[str, bool]:
+        """(episode key, True if this call opened the episode); caller holds self._cond"""
+        if self.path is not None:
+            try:
+                conn = self._connection()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = conn.execute("SELECT key, last_high FROM sos_episodes WHERE session = ?",
+                                       (session_id,)).fetchone()
+                    if row is not None and now - row[1] < self.episode_s:
+                        conn.execute("UPDATE sos_episodes SET last_high = ? WHERE session = ?",
+                                     (max(row[1], now), session_id))
+                        return row[0], False
+                    key = self._key(session_id, now)
+                    conn.execute("INSERT OR REPLACE INTO sos_episodes VALUES (?, ?, ?)",
+                                 (session_id, key, now))
+                    if self.triggered % 1024 == 0:
+                        conn.execute("DELETE FROM sos_episodes WHERE last_high < ?",
+                                     (now - self.episode_s,))
+                    return key, True
+                finally:
+                    conn.execute("COMMIT")
+            except sqlite3.Error:
+                # Fall back to this process's episodes: a broken store must
+                # not suppress alerts
+                self.store_errors += 1
+
+        episode = self._episodes.get(session_id)
+        if episode is not None and now - episode[1] < self.episode_s:
+            self._episodes[session_id] = (episode[0], now)
+            return episode[0], False
+        key = self._key(session_id, now // self.episode_s * self.episode_s)
+        self._episodes[session_id] = (key, now)
+        if len(self._episodes) > 4 * self.max_pending:
+            self._episodes = {s: e for s, e in self._episodes.items()
+                              if now - e[1] < self.episode_s}
+        return key, True
+
+    def _end_episode(self, session_id: str):
+        """Caller holds self._cond"""
+        self._episodes.pop(session_id, None)
+        if self.path is not None:
+            try:
+                self._connection().execute("DELETE FROM sos_episodes WHERE session = ?",
+                                           (session_id,))
+            except sqlite3.Error:
+                self.store_errors += 1
+
+    def _schedule(self, delivery: _Delivery, delay: float):
+        # Caller holds self._cond
+        self._seq += 1
+        heapq.heappush(self._due, (time.monotonic() + delay, self._seq, delivery))
+        self._cond.notify_all()   # flush() waits on the same condition
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._due:
+                        wait = self._due[0][0] - time.monotonic()
+                        if wait <= 0:
+                            break
+                    elif self._closing:
+                        return
+                    else:
+                        wait = None
+                    self._cond.wait(wait)
+                _, _, delivery = heapq.heappop(self._due)
+            self._pool.submit(self._deliver, delivery)
+
+    def _deliver(self, delivery: _Delivery):
+        delivery.attempts += 1
+        try:
+            delivery.notifier.send(delivery.job)
+        except Exception as e:
+            with self._cond:
+                if delivery.attempts < self.max_attempts and not self._closing:
+                    self.retries += 1
+                    delay = min(self.max_backoff_s, self.backoff_s * 2 ** (delivery.attempts - 1))
+                    self._schedule(delivery, delay * random.uniform(0.5, 1.0))
+                    return
+                self.failed += 1
+                self._pending -= 1
+                self._cond.notify_all()
+            print(f"SOS {delivery.job.idempotency_key} via {delivery.notifier.name} "
+                  f"failed after {delivery.attempts} attempt(s): {e}", file=sys.stderr)
+            return
+        with self._cond:
+            self.delivered += 1
+            self._pending -= 1
+            self._latencies_ms.append((time.time() - delivery.job.triggered_at) * 1000)
+            self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued delivery has succeeded or given up"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """Finish in-flight sends and stop; pending retries are abandoned"""
+        self.flush(timeout)
+        with self._cond:
+            self._closing = True
+            self._due.clear()
+            self._cond.notify_all()
+        self._scheduler.join(timeout)
+        self._pool.shutdown(wait=True)
+
+    def metrics(self) -> dict:
+        with self._cond:
+            latencies = sorted(self._latencies_ms)
+            return {
+                "triggered": self.triggered,
+                "deduplicated": self.deduplicated,
+                "refused": self.refused,
+                "delivered": self.delivered,
+                "retries": self.retries,
+                "failed": self.failed,
+                "pending": self._pending,
+                "shared": self.path is not None,
+                "store_errors": self.store_errors,
+                "p50_latency_ms": round(latencies[len(latencies) // 2], 3) if latencies else 0.0,
+                "p99_latency_ms": round(latencies[int(len(latencies) * 0.99)], 3) if latencies else 0.0
+            }
@@ -0,0 +1,170 @@
+"""
+Tenant Profiles
+Per-organization scoring weights and thresholds, selected per request
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional
+
+from safety_analyzer import SafetyAnalyzer
+
+# Rough size of a tenant's analyzer and bookkeeping, before any caches
+STATE_OVERHEAD_BYTES = 4096
+
+
+@dataclass
+class TenantProfile:
+    tenant_id: str
+    weights: Optional[Dict[str, float]] = None
+    low_risk_max: Optional[int] = None
+    medium_risk_max: Optional[int] = None
+    api_keys: List[str] = field(default_factory=list)
+
+
+class TenantState:
+    """A tenant's analyzer plus the caches built for it (e.g. route edge tables)"""
+
+    def __init__(self, profile: TenantProfile, analyzer: SafetyAnalyzer):
+        self.profile = profile
+        self.analyzer = analyzer
+        self.caches: Dict[Hashable, Any] = {}
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held; the analyzer and caches report theirs via cache_bytes"""
+        return STATE_OVERHEAD_BYTES + self.analyzer.cache_bytes + sum(
+            getattr(cache, "cache_bytes", 0) for cache in self.caches.values())
+
+
+class TenantRegistry:
+    """
+    Resolves requests to tenant state, built on first use
+
+    Tenant analyzers share the base analyzer's read-only indexes (safe
+    places, crime grid, timezones) and only differ in weights and
+    thresholds. Resolving is a couple of dict lookups however many tenants
+    exist. When cached state outgrows memory_budget, the least recently used
+    tenants are dropped and rebuilt on their next request.
+    """
+
+    def __init__(self,
+                 profiles: List[TenantProfile],
+                 base: SafetyAnalyzer,
+                 memory_budget: int = 256 * 1024 * 1024):
+        """
+        Args:
+            profiles: Known tenants
+            base: Analyzer for requests that name no tenant; its indexes
+                are shared with every tenant analyzer
+            memory_budget: Bytes of tenant state kept before LRU eviction
+        """
+        self.profiles = {profile.tenant_id: profile for profile in profiles}
+        self._by_key = {key: profile.tenant_id for profile in profiles for key in profile.api_keys}
+        self.base = base
+        self.memory_budget = memory_budget
+        self._states: "OrderedDict[str, TenantState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        # Fail at startup, not on a tenant's first request, on bad weights
+        for profile in profiles:
+            self._build(profile)
+
+    def resolve(self, tenant_id: Optional[str] = None,
+                api_key: Optional[str] = None) -> Optional[TenantState]:
+        """
+        State for a request's API key or tenant id
+
+        Returns None when neither is given (score with the base analyzer).
+        Tenants with API keys can only be selected by key.
+        """
+        if api_key:
+            tenant_id = self._by_key.get(api_key)
+            if tenant_id is None:
+                raise ValueError("Unknown API key")
+        elif tenant_id:
+            profile = self.profiles.get(tenant_id)
+            if profile is None:
+                raise ValueError(f"Unknown tenant: {tenant_id}")
+            if profile.api_keys:
+                raise ValueError(f"Tenant {tenant_id} requires an API key")
+        else:
+            return None
+
+        with self._lock:
+            state = self._states.get(tenant_id)
+            if state is not None:
+                self._states.move_to_end(tenant_id)
+                return state
+        state = self._build(self.profiles[tenant_id])
+        with self._lock:
+            # Another thread may have built it meanwhile; keep the first
+            state = self._states.setdefault(tenant_id, state)
+            self._states.move_to_end(tenant_id)
+        self.trim()
+        return state
+
+    def _build(self, profile: TenantProfile) -> TenantState:
+        base = self.base
+        analyzer = type(base)(
+            safe_places=base.safe_places,
+            safe_place_count=base.safe_place_count,
+            crime_grid=base.crime_grid,
+            tz_index=base.tz_index,
+            weights=profile.weights,
+            low_risk_max=profile.low_risk_max,
+            medium_risk_max=profile.medium_risk_max
+        )
+        return TenantState(profile, analyzer)
+
+    def trim(self) -> int:
+        """
+        Evict least recently used tenants until cached state fits the budget
+
+        Call after a tenant's caches grow. The most recent tenant is kept
+        even when it alone exceeds the budget.
+
+        Returns:
+            Number of tenants evicted
+        """
+        evicted = 0
+        with self._lock:
+            total = sum(state.nbytes for state in self._states.values())
+            while total > self.memory_budget and len(self._states) > 1:
+                _, state = self._states.popitem(last=False)
+                total -= state.nbytes
+                evicted += 1
+            self.evictions += evicted
+        return evicted
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "tenants": len(self.profiles),
+                "cached": len(self._states),
+                "cached_bytes": sum(state.nbytes for state in self._states.values()),
+                "memory_budget": self.memory_budget,
+                "evictions": self.evictions
+            }
+
+
+def load_profiles(path: str) -> List[TenantProfile]:
+    """
+    Load tenant profiles from JSON:
+    {"tenants": [{"id": ..., "api_keys": [...], "weights": {...},
+                  "low_risk_max": ..., "medium_risk_max": ...}]}
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    profiles = []
+    for entry in data["tenants"]:
+        profiles.append(TenantProfile(
+            tenant_id=str(entry["id"]),
+            weights=entry.get("weights"),
+            low_risk_max=entry.get("low_risk_max"),
+            medium_risk_max=entry.get("medium_risk_max"),
+            api_keys=[str(key) for key in entry.get("api_keys", [])]
+        ))
+    return profiles
@@ -327,6 +327,114 @@ class TestSafetyAnalyzer(unittest.TestCase):
         
         self.assertIsNone(assessment.emergency_actions)
 
+    def test_assess_batch_matches_scalar(self):
+        """Test batch results equal individual assessments, in order"""
+        requests = [
+            dict(hour=hour, latitude=40.7128, longitude=-74.0060,
+                 crowd_density=density, crime_score=crime,
+                 movement_speed=speed, network_available=network)
+            for hour in (3, 14)
+            for density in CrowdDensity
+            for crime in (10, 85)
+            for speed in (0.0, 1.5)
+            for network in (True, False)
+        ]
+        results = self.analyzer.assess_batch(requests)
+        self.assertEqual(len(results), len(requests))
+        for request, result in zip(requests, results):
+            self.assertEqual(result, self.analyzer.assess_safety(**request))
+        # Results never share mutable lists
+        high = [r for r in results if r.emergency_actions]
+        self.assertIsNot(high[0].emergency_actions, high[1].emergency_actions)
+
+    def test_assess_core_matches_scalar(self):
+        """Test the core-table fast path scores exactly like assess_safety"""
+        for hour in (-1, 3, 5.5, 6, 14, 21, 24):
+            for latitude in (40.7128, 95.0):
+                for density in list(CrowdDensity) + [None]:
+                    for crime in (-5, 0, 33, 60, 61, 100, 150):
+                        for speed in (-1.0, 0.0, 1.5):
+                            for network in (True, False):
+                                args = (hour, latitude, -74.0060, density, crime, speed, network)
+                                full = self.analyzer.assess_safety(*args)
+                                core = self.analyzer.assess_core(*args)
+                                self.assertEqual(
+                                    (core.risk_score, core.risk_level, core.threat_factors,
+                                     core.emergency_actions),
+                                    (full.risk_score, full.risk_level, full.threat_factors,
+                                     full.emergency_actions), args)
+        # Non-integer crime scores fall back to direct scoring
+        core = self.analyzer.assess_core(23, 40.7128, -74.0060, CrowdDensity.LOW, 72.5, 0.0, False)
+        self.assertEqual(core.risk_score, self.analyzer.assess_safety(
+            23, 40.7128, -74.0060, CrowdDensity.LOW, 72.5, 0.0, False).risk_score)
+        self.assertEqual(core.threat_reason, "")
+
+    def test_core_table_per_weights(self):
+        """Test the core table follows instance weights and reports its size"""
+        self.assertEqual(self.analyzer.cache_bytes, 0)
+        weighted = SafetyAnalyzer(weights={factor: 1 for factor in SafetyAnalyzer.FACTORS})
+        args = (23, 40.7128, -74.0060, CrowdDensity.MEDIUM, 50, 1.0, True)
+        self.assertEqual(weighted.assess_core(*args).risk_score,
+                         weighted.assess_safety(*args).risk_score)
+        self.assertNotEqual(weighted.assess_core(*args).risk_score,
+                            self.analyzer.assess_core(*args).risk_score)
+        self.assertGreater(weighted.cache_bytes, 0)
+
+    def test_extra_factor_scoring(self):
+        """Test extra factors join the score only when supplied"""
+        args = (14, 40.7128, -74.0060, CrowdDensity.MEDIUM, 40, 1.0, True)
+        plain = self.analyzer.assess_safety(*args)
+        self.assertEqual(self.analyzer.assess_safety(*args, extra_risks={}), plain)
+        inside = self.analyzer.assess_safety(*args, extra_risks={"geofence": 1.0})
+        self.assertGreater(inside.risk_score, plain.risk_score)
+        self.assertIn("geofence", inside.threat_factors)
+        self.assertIn("inside a danger zone", inside.threat_reason)
+        safe = self.analyzer.assess_safety(*args, extra_risks={"geofence": 0.0})
+        self.assertLessEqual(safe.risk_score, plain.risk_score)
+        core = self.analyzer.assess_core(*args, extra_risks={"geofence": 1.0})
+        self.assertEqual((core.risk_score, core.threat_factors),
+                         (inside.risk_score, inside.threat_factors))
+        batch = self.analyzer.assess_batch([
+            dict(zip(("hour", "latitude", "longitude", "crowd_density", "crime_score",
+                      "movement_speed", "network_available"), args), extra_risks=extra)
+            for extra in (None, {"geofence": 1.0})
+        ])
+        self.assertEqual([r.risk_score for r in batch], [plain.risk_score, inside.risk_score])
+        with self.assertRaises(ValueError):
+            self.analyzer.score_risks((0.0,) * 6, {"unknown": 1.0})
+
+    def test_explain_contributions(self):
+        """Test the breakdown is opt-in and agrees across scalar, batch and table paths"""
+        names = ("hour", "latitude", "longitude", "crowd_density", "crime_score",
+                 "movement_speed", "network_available")
+        self.assertIsNone(self.analyzer.assess_safety(23, 0.0, 0.0, CrowdDensity.LOW,
+                                                      80, 0.0, False).contributions)
+        for args in ((23, 40.7128, -74.0060, CrowdDensity.LOW, 80, 0.0, False),
+                     (14, 95.0, 0.0, CrowdDensity.HIGH, 10, 1.0, True),
+                     (-1, 40.7128, -74.0060, CrowdDensity.MEDIUM, 120, -1.0, True)):
+            scalar = self.analyzer.assess_safety(*args, explain=True)
+            self.assertEqual([item["factor"] for item in scalar.contributions],
+                             list(SafetyAnalyzer.FACTORS))
+            self.assertAlmostEqual(sum(item["points"] for item in scalar.contributions),
+                                   scalar.risk_score, delta=0.55)
+            night = scalar.contributions[0]
+            self.assertEqual((night["risk"], night["weight"]),
+                             (self.analyzer.calculate_night_time_risk(args[0]), 15))
+            self.assertEqual(self.analyzer.assess_core(*args, explain=True).contributions,
+                             scalar.contributions)
+            batch = self.analyzer.assess_batch([dict(zip(names, args), explain=True),
+                                                dict(zip(names, args))])
+            self.assertEqual(batch[0].contributions, scalar.contributions)
+            self.assertIsNone(batch[1].contributions)
+        extra = self.analyzer.assess_safety(*args, extra_risks={"geofence": 1.0}, explain=True)
+        self.assertEqual(extra.contributions[-1],
+                         {"factor": "geofence", "risk": 1.0, "weight": 20,
+                          "points": round(20 / 120 * 100, 2)})
+        self.assertEqual(self.analyzer.assess_core(*args, extra_risks={"geofence": 1.0},
+                                                   explain=True).contributions,
+                         extra.contributions)
+        self.assertIn("Factor Contributions", str(extra))
+
 
 class TestSafetyAssessment(unittest.TestCase):
     """Test SafetyAssessment dataclass"""
@@ -0,0 +1,119 @@
+"""
+Unit tests for the append-only assessment log
+"""
+
+import os
+import tempfile
+import unittest
+from assessment_log import ROW_MAGIC, AssessmentLog, LogRecord
+from safety_analyzer import threat_mask, threat_factors_from_mask
+
+
+class TestAssessmentLog(unittest.TestCase):
+    """Test suite for AssessmentLog"""
+
+    def setUp(self):
+        """Log with one-hour segments compacted per day"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log = AssessmentLog(self.tmp.name, rotate_s=3600, compact_window_s=86400)
+
+    def tearDown(self):
+        self.log.close()
+        self.tmp.cleanup()
+
+    def record(self, timestamp, latitude=40.7, longitude=-74.0, score=45, level="Medium"):
+        return LogRecord(timestamp, latitude, longitude, score, level,
+                         threat_mask(["night_time", "crowd_density"]))
+
+    def test_append_and_scan(self):
+        """Test appended records are readable after flush"""
+        for i in range(100):
+            self.log.append(self.record(1000.0 + i))
+        self.assertTrue(self.log.flush(timeout=5))
+        records = list(self.log.scan(1010, 1019))
+        self.assertEqual([r.timestamp for r in records], [1010.0 + i for i in range(10)])
+        self.assertEqual(threat_factors_from_mask(records[0].threat_mask),
+                         ["night_time", "crowd_density"])
+        self.assertLess(self.log.commits, 100)  # group commit batches writes
+
+    def test_rotation_and_compaction(self):
+        """Test segments rotate hourly and closed days compact into blocks"""
+        day = 86400
+        for hour in range(3):
+            self.log.append(self.record(hour * 3600 + 5, score=10 * hour))
+        self.log.append(self.record(day + 5, latitude=51.5, longitude=-0.1, level="High"))
+        self.log.flush(timeout=5)
+        names = sorted(os.listdir(self.tmp.name))
+        self.assertEqual(len([n for n in names if n.startswith("cols-")]), 1)
+        self.assertEqual(len([n for n in names if n.startswith("rows-")]), 1)
+
+        self.assertEqual([r.risk_score for r in self.log.scan(0, day)], [0, 10, 20])
+        self.assertEqual(len(list(self.log.scan())), 4)
+        london = list(self.log.scan(bbox=(51.0, -1.0, 52.0, 1.0)))
+        self.assertEqual(len(london), 1)
+        self.assertEqual(london[0].risk_level, "High")
+
+    def test_bad_record_fails_its_batch_only(self):
+        """Test a record that cannot be packed raises and the writer keeps running"""
+        with self.assertRaises(OSError):
+            self.log.write_batch([self.record(5.0, level="Bogus")])
+        self.log.append(self.record(6.0, level="Bogus"))
+        with self.assertRaises(OSError):
+            self.log.flush(timeout=5)
+        self.log.write_batch([self.record(7.0)])
+        self.assertTrue(self.log.flush(timeout=5))
+        self.assertEqual([r.timestamp for r in self.log.scan()], [7.0])
+        self.assertEqual(self.log.write_errors, 2)
+
+    def test_processes_share_the_directory(self):
+        """Test each process writes its own segments and compaction by another is survived"""
+        day = 86400
+        self.log.write_batch([self.record(5.0), self.record(6.0)])
+        with open(os.path.join(self.tmp.name, "rows-3600-999999.log"), "wb") as f:
+            f.write(ROW_MAGIC + self.record(3605.0).pack())
+        other = AssessmentLog(self.tmp.name, rotate_s=3600, compact_window_s=86400)
+        try:
+            self.assertEqual(other.compact(before=day), 1)   # takes this log's open segment too
+        finally:
+            other.close()
+        self.log.write_batch([self.record(7.0)])
+        self.assertEqual([r.timestamp for r in self.log.scan()], [5.0, 6.0, 3605.0, 7.0])
+        self.log.write_batch([self.record(day + 5)])
+        names = os.listdir(self.tmp.name)
+        self.assertEqual(len([n for n in names if n.startswith("cols-")]), 2)
+        self.assertEqual(sorted(r.timestamp for r in self.log.scan()),
+                         [5.0, 6.0, 7.0, 3605.0, day + 5])
+
+    def test_close_flushes_queue(self):
+        """Test close writes out everything queued"""
+        for i in range(50):
+            self.log.append(self.record(float(i)))
+        self.log.close()
+        reopened = AssessmentLog(self.tmp.name)
+        try:
+            self.assertEqual(len(list(reopened.scan())), 50)
+        finally:
+            reopened.close()
+
+    def test_failed_writes_raise(self):
+        """Test write_batch and flush raise when their records were not written"""
+        self.log.write_batch([self.record(5.0)])
+        self.log.close()
+        log = AssessmentLog(os.path.join(self.tmp.name, "sub"))
+        try:
+            os.rmdir(log.directory)
+            with open(log.directory, "w", encoding="utf-8"):
+                pass
+            with self.assertRaises(OSError):
+                log.write_batch([self.record(6.0)])
+            log.append(self.record(7.0))
+            with self.assertRaises(OSError):
+                log.flush(timeout=5)
+            self.assertTrue(log.flush(timeout=5))   # reported once
+            self.assertEqual(log.write_errors, 2)
+        finally:
+            log.close()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
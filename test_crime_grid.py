@@ -0,0 +1,83 @@
+"""
+Unit tests for the temporal crime grid
+"""
+
+import os
+import tempfile
+import unittest
+from crime_grid import CrimeGrid, HEADER, HOURS_PER_WEEK, hour_of_week
+from safety_analyzer import SafetyAnalyzer, CrowdDensity
+
+
+class TestCrimeGrid(unittest.TestCase):
+    """Test suite for CrimeGrid"""
+
+    def setUp(self):
+        """Write a 2x2 grid of 0.01 degree cells over lower Manhattan"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "crime.grid")
+        saturday_nights = [90 if h in (hour_of_week(5, 23), hour_of_week(6, 1)) else 20
+                           for h in range(HOURS_PER_WEEK)]
+        CrimeGrid.write(self.path, 40.70, -74.01, 0.01, 2, 2, {
+            (0, 0): saturday_nights,
+            (1, 1): [5] * HOURS_PER_WEEK
+        })
+        self.grid = CrimeGrid(self.path)
+
+    def tearDown(self):
+        self.grid.close()
+        self.tmp.cleanup()
+
+    def test_lookup(self):
+        """Test hour-of-week values and missing cells"""
+        self.assertEqual(self.grid.lookup(40.705, -74.005, hour_of_week(5, 23)), 90)
+        self.assertEqual(self.grid.lookup(40.705, -74.005, hour_of_week(5, 22)), 20)
+        self.assertEqual(self.grid.lookup(40.715, -73.995, 0), 5)
+        self.assertIsNone(self.grid.lookup(40.715, -74.005, 0))   # no data cell
+        self.assertIsNone(self.grid.lookup(41.0, -74.005, 0))     # outside grid
+
+    def test_file_is_compact(self):
+        """Test storage is one byte per cell-hour"""
+        self.assertEqual(os.path.getsize(self.path), HEADER.size + 4 * HOURS_PER_WEEK)
+
+    def test_tile(self):
+        """Test tiles hold the overlapping cells, clipped to the grid"""
+        row0, col0, rows, cols, body = self.grid.tile(40.705, -73.995, 41.0, -73.0)
+        self.assertEqual((row0, col0, rows, cols), (0, 1, 2, 1))
+        self.assertEqual(body[HOURS_PER_WEEK:], bytes([5] * HOURS_PER_WEEK))
+        self.assertEqual(self.grid.tile(50.0, 0.0, 51.0, 1.0)[2:4], (0, 0))
+
+    def test_rejects_truncated_file(self):
+        """Test a truncated grid fails to open"""
+        with open(self.path, "rb") as f:
+            data = f.read()
+        bad = os.path.join(self.tmp.name, "bad.grid")
+        with open(bad, "wb") as f:
+            f.write(data[:-1])
+        with self.assertRaises(ValueError):
+            CrimeGrid(bad)
+
+    def test_analyzer_uses_time_specific_score(self):
+        """Test the analyzer prefers the grid score when the weekday is known"""
+        analyzer = SafetyAnalyzer(crime_grid=self.grid)
+        args = (23, 40.705, -74.005, CrowdDensity.MEDIUM, 50, 1.0, True)
+        saturday = analyzer.assess_safety(*args, weekday=5)
+        friday = analyzer.assess_safety(*args, weekday=4)
+        static = analyzer.assess_safety(*args)
+        self.assertIn("high crime area", saturday.threat_reason)
+        self.assertGreater(saturday.risk_score, static.risk_score)
+        self.assertLess(friday.risk_score, static.risk_score)
+
+    def test_build_from_incidents(self):
+        """Test incident counts are scaled so the peak scores 100"""
+        path = os.path.join(self.tmp.name, "built.grid")
+        incidents = [(40.705, -74.005, 4, 22)] * 4 + [(40.705, -74.005, 0, 9)]
+        CrimeGrid.build_from_incidents(path, incidents, 40.70, -74.01, 0.01, 2, 2)
+        with CrimeGrid(path) as grid:
+            self.assertEqual(grid.lookup(40.705, -74.005, hour_of_week(4, 22)), 100)
+            self.assertEqual(grid.lookup(40.705, -74.005, hour_of_week(0, 9)), 25)
+            self.assertEqual(grid.lookup(40.715, -73.995, 0), 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,56 @@
+"""
+Unit tests for the crowd density estimator
+"""
+
+import unittest
+from crowd_estimator import CrowdDensityEstimator
+from safety_analyzer import CrowdDensity
+
+
+class TestCrowdDensityEstimator(unittest.TestCase):
+    """Test suite for CrowdDensityEstimator"""
+
+    def setUp(self):
+        """Estimator with a 10 minute window in 1 minute buckets"""
+        self.estimator = CrowdDensityEstimator(window_s=600, bucket_s=60,
+                                               medium_sessions=3, high_sessions=6)
+        self.lat, self.lon = 40.7128, -74.0060
+
+    def test_counts_distinct_sessions(self):
+        """Test repeat fixes from one session count once"""
+        for t in range(0, 300, 10):
+            self.estimator.observe("alice", self.lat, self.lon, now=1000 + t)
+        self.estimator.observe("bob", self.lat, self.lon, now=1300)
+        self.assertEqual(self.estimator.active_sessions(self.lat, self.lon, now=1300), 2)
+
+    def test_density_levels(self):
+        """Test thresholds map counts onto LOW/MEDIUM/HIGH"""
+        self.assertEqual(self.estimator.estimate(self.lat, self.lon, now=0), CrowdDensity.LOW)
+        for i in range(3):
+            self.estimator.observe(i, self.lat, self.lon, now=0)
+        self.assertEqual(self.estimator.estimate(self.lat, self.lon, now=0), CrowdDensity.MEDIUM)
+        for i in range(3, 6):
+            self.estimator.observe(i, self.lat, self.lon, now=0)
+        self.assertEqual(self.estimator.estimate(self.lat, self.lon, now=0), CrowdDensity.HIGH)
+
+    def test_window_expiry(self):
+        """Test sessions expire once the window slides past them"""
+        self.estimator.observe("alice", self.lat, self.lon, now=0)
+        self.estimator.observe("bob", self.lat, self.lon, now=300)
+        self.assertEqual(self.estimator.active_sessions(self.lat, self.lon, now=599), 2)
+        self.assertEqual(self.estimator.active_sessions(self.lat, self.lon, now=660), 1)
+        # A fresh sighting keeps alice active
+        self.estimator.observe("alice", self.lat, self.lon, now=650)
+        self.assertEqual(self.estimator.active_sessions(self.lat, self.lon, now=850), 2)
+
+    def test_idle_cells_evicted(self):
+        """Test memory is bounded by active cells"""
+        for i in range(100):
+            self.estimator.observe(i, self.lat + i * 0.01, self.lon, now=0)
+        self.assertEqual(len(self.estimator), 100)
+        self.estimator.observe("late", self.lat, self.lon, now=10000)
+        self.assertEqual(len(self.estimator), 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,76 @@
+"""
+Unit tests for the GPS fix filter
+"""
+
+import random
+import unittest
+from fix_filter import FixFilter, INACCURATE, NO_MOVEMENT, TOO_SOON
+
+METER = 1 / 111320   # degrees of latitude per meter
+
+
+class TestFixFilter(unittest.TestCase):
+    """Test suite for FixFilter"""
+
+    def setUp(self):
+        self.filter = FixFilter(min_displacement_m=10, min_interval_s=1, max_interval_s=30,
+                                max_accuracy_m=100)
+
+    def scored(self, session_id, lat, lon, now, accuracy=None, signature="sig"):
+        """Feed a fix; remember a response when it passes. Returns the absorb reason."""
+        fix = self.filter.filter(session_id, lat, lon, accuracy, signature, now)
+        if fix.absorbed is None:
+            self.filter.remember(session_id, {"at": now})
+        return fix.absorbed
+
+    def test_jitter_is_absorbed(self):
+        """Test stationary jitter is answered from the last response"""
+        rng = random.Random(1)
+        reasons = [self.scored("s1", 40.7 + rng.uniform(-5, 5) * METER, -74.0, t * 2)
+                   for t in range(10)]
+        self.assertIsNone(reasons[0])
+        self.assertEqual(reasons[1:], [NO_MOVEMENT] * 9)
+        fix = self.filter.filter("s1", 40.7, -74.0, None, "sig", 19)
+        self.assertEqual(fix.response, {"at": 0})
+        metrics = self.filter.metrics()
+        self.assertEqual((metrics["passed"], metrics["suppressed"]), (1, 10))
+
+    def test_movement_interval_and_refresh(self):
+        """Test real movement rescored, rapid fixes absorbed, stale responses refreshed"""
+        self.assertIsNone(self.scored("s1", 40.7, -74.0, 0))
+        self.assertEqual(self.scored("s1", 40.7 + 50 * METER, -74.0, 0.5), TOO_SOON)
+        self.assertIsNone(self.scored("s1", 40.7 + 50 * METER, -74.0, 5))
+        self.assertEqual(self.scored("s1", 40.7 + 50 * METER, -74.0, 10), NO_MOVEMENT)
+        self.assertIsNone(self.scored("s1", 40.7 + 50 * METER, -74.0, 40))
+
+    def test_changed_inputs_force_rescore(self):
+        """Test a different signature (e.g. new hour) is never absorbed"""
+        self.scored("s1", 40.7, -74.0, 0)
+        self.assertIsNone(self.scored("s1", 40.7, -74.0, 5, signature="next hour"))
+
+    def test_inaccurate_fixes(self):
+        """Test inaccurate fixes are rejected and weigh little in the smoothing"""
+        self.scored("s1", 40.7, -74.0, 0, accuracy=10)
+        self.assertEqual(self.scored("s1", 40.71, -74.0, 5, accuracy=500), INACCURATE)
+        # Without a response to reuse it is scored, but barely moves the estimate
+        self.filter.filter("s2", 40.7, -74.0, 10, None, 0)
+        fix = self.filter.filter("s2", 40.71, -74.0, 500, None, 5)
+        self.assertIsNone(fix.absorbed)
+        self.assertLess(fix.latitude - 40.7, 0.001)
+
+    def test_smoothing_follows_movement(self):
+        """Test the smoothed position tracks a moving session"""
+        for t in range(60):
+            fix = self.filter.filter("s1", 40.7 + 1.4 * t * METER, -74.0, 10, None, t)
+        self.assertLess(abs(fix.latitude - (40.7 + 1.4 * 59 * METER)) / METER, 10)
+
+    def test_sessions_bounded(self):
+        """Test least recently seen sessions are dropped"""
+        bounded = FixFilter(max_sessions=2)
+        for i in range(3):
+            bounded.filter(f"s{i}", 40.7, -74.0, None, None, 0)
+        self.assertEqual(bounded.metrics()["sessions"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
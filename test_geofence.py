@@ -0,0 +1,108 @@
+"""
+Unit tests for the geofence engine
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from geofence import DANGER, SAFE, GeofenceTracker, Zone, ZoneIndex, zone_risk
+
+
+def box(south, west, north, east):
+    return [[(south, west), (south, east), (north, east), (north, west), (south, west)]]
+
+
+class TestZoneIndex(unittest.TestCase):
+    """Test suite for ZoneIndex"""
+
+    def setUp(self):
+        self.index = ZoneIndex([
+            Zone("park", DANGER, [box(40.700, -74.010, 40.710, -74.000)], risk=0.8),
+            Zone("home", SAFE, [box(40.705, -74.005, 40.706, -74.004)]),
+            # Triangle: its bounding box covers points the polygon does not
+            Zone("wedge", DANGER, [[[(40.72, -74.02), (40.72, -74.00), (40.74, -74.02)]]]),
+            Zone("city", SAFE, [box(40.0, -75.0, 41.5, -73.0)]),
+        ], max_cells_per_zone=100)
+
+    def test_lookup(self):
+        """Test lookups refine candidates with point-in-polygon"""
+        ids = lambda lat, lon: [zone.zone_id for zone in self.index.zones_at(lat, lon)]
+        self.assertEqual(ids(40.7055, -74.0045), ["park", "home", "city"])
+        self.assertEqual(ids(40.702, -74.008), ["park", "city"])
+        self.assertEqual(ids(40.725, -74.015), ["wedge", "city"])
+        self.assertEqual(ids(40.738, -74.001), ["city"])   # in the wedge's box only
+        self.assertEqual(ids(10.0, 10.0), [])
+
+    def test_large_zones_stay_out_of_grid(self):
+        """Test zones spanning many cells are checked by bounding box instead"""
+        self.assertEqual(self.index.large, (3,))
+        self.assertTrue(all(3 not in candidates for candidates in self.index.cells.values()))
+
+    def test_zone_risk(self):
+        """Test the geofence factor risk"""
+        self.assertEqual(zone_risk(self.index.zones_at(40.702, -74.008)), 0.8)
+        self.assertEqual(zone_risk(self.index.zones_at(40.738, -74.001)), 0.0)
+        self.assertIsNone(zone_risk(self.index.zones_at(10.0, 10.0)))
+
+    def test_validation(self):
+        """Test bad zones are rejected"""
+        with self.assertRaises(ValueError):
+            Zone("z", "unknown", [box(0, 0, 1, 1)])
+        with self.assertRaises(ValueError):
+            Zone("z", DANGER, [box(0, 0, 1, 1)], risk=2.0)
+        with self.assertRaises(ValueError):
+            ZoneIndex([Zone("z", DANGER, [box(0, 0, 1, 1)]), Zone("z", SAFE, [box(0, 0, 1, 1)])])
+
+    def test_load_geojson(self):
+        """Test loading zones from GeoJSON (lon, lat order)"""
+        collection = {"type": "FeatureCollection", "features": [{
+            "type": "Feature",
+            "properties": {"id": "park", "kind": "danger", "risk": 0.5, "name": "Park"},
+            "geometry": {"type": "Polygon", "coordinates": [
+                [[-74.01, 40.70], [-74.00, 40.70], [-74.00, 40.71], [-74.01, 40.71], [-74.01, 40.70]]
+            ]}
+        }]}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "zones.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(collection, f)
+            index = ZoneIndex.load(path)
+        zones = index.zones_at(40.705, -74.005)
+        self.assertEqual([(zone.zone_id, zone.risk, zone.name) for zone in zones], [("park", 0.5, "Park")])
+
+
+class TestGeofenceTracker(unittest.TestCase):
+    """Test suite for GeofenceTracker"""
+
+    def setUp(self):
+        self.tracker = GeofenceTracker(ZoneIndex([
+            Zone("park", DANGER, [box(40.700, -74.010, 40.710, -74.000)]),
+            Zone("home", SAFE, [box(40.720, -74.010, 40.730, -74.000)]),
+        ]), max_sessions=2)
+
+    def events(self, session_id, lat, lon):
+        _, events = self.tracker.update(session_id, lat, lon)
+        return [(event.zone_id, event.event, event.alert) for event in events]
+
+    def test_enter_and_exit_edges(self):
+        """Test events fire only on membership changes"""
+        self.assertEqual(self.events("s1", 40.725, -74.005), [("home", "enter", False)])
+        self.assertEqual(self.events("s1", 40.726, -74.005), [])
+        self.assertEqual(self.events("s1", 40.705, -74.005),
+                         [("home", "exit", True), ("park", "enter", True)])
+        self.assertEqual(self.events("s1", 40.750, -74.005), [("park", "exit", False)])
+        self.assertEqual(self.tracker.metrics()["alerts"], 2)
+
+    def test_sessions_are_independent_and_bounded(self):
+        """Test per-session state and least-recently-seen eviction"""
+        self.assertEqual(len(self.events("s1", 40.705, -74.005)), 1)
+        self.assertEqual(len(self.events("s2", 40.705, -74.005)), 1)
+        self.assertEqual(self.events("s1", 40.705, -74.005), [])
+        self.events("s3", 40.0, -74.0)   # evicts s2
+        self.assertEqual(self.events("s2", 40.705, -74.005), [("park", "enter", True)])
+        self.assertEqual(self.tracker.metrics()["sessions"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
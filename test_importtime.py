@@ -0,0 +1,26 @@
+"""
+Unit tests for the startup import budget
+"""
+
+import unittest
+from bench_importtime import BUDGETS, check, import_profile
+
+
+class TestImportTime(unittest.TestCase):
+    """Test suite for lazy imports on the scoring path"""
+
+    def test_profile_reports_module(self):
+        """Test the import profile times the module and lists what it imported"""
+        total, imported = import_profile("safety_analyzer")
+        self.assertGreater(total, 0)
+        self.assertIn("safety_analyzer", imported)
+
+    def test_scalar_scoring_skips_web_and_optional_modules(self):
+        """Test scoring modules import none of their forbidden modules"""
+        for module, (_, forbidden) in BUDGETS.items():
+            _, leaked = check(module, forbidden, runs=1)
+            self.assertEqual(leaked, [], module)
+
+
+if __name__ == '__main__':
+    unittest.main()
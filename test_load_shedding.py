@@ -0,0 +1,137 @@
+"""
+Unit tests for rate limiting and load shedding
+"""
+
+import importlib.util
+import os
+import tempfile
+import unittest
+from load_shedding import (TokenBucketLimiter, SessionPriorities, LoadShedder,
+                           PRIORITY_LOW, PRIORITY_NORMAL, PRIORITY_CRITICAL)
+
+
+class TestTokenBucketLimiter(unittest.TestCase):
+    """Test suite for TokenBucketLimiter"""
+
+    def check_bucket(self, limiter):
+        # A full bucket allows a burst, then refills at `rate`
+        self.assertEqual([limiter.acquire("a", now=100.0) for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(limiter.acquire("a", now=100.0), 0.5)
+        self.assertEqual(limiter.acquire("b", now=100.0), 0.0)   # clients are independent
+        self.assertEqual(limiter.acquire("a", now=100.5), 0.0)
+        self.assertGreater(limiter.acquire("a", now=100.5), 0.0)
+        self.assertEqual(limiter.limited, 2)
+
+    def test_in_process(self):
+        """Test per-process buckets allow a burst and then refill at the rate"""
+        self.check_bucket(TokenBucketLimiter(rate=2, burst=3))
+
+    def test_shared_across_limiters(self):
+        """Test limiters sharing a SQLite file draw from the same buckets"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "limits.db")
+            self.check_bucket(TokenBucketLimiter(rate=2, burst=3, path=path))
+            # A second worker sees the same, now empty, bucket
+            other = TokenBucketLimiter(rate=2, burst=3, path=path)
+            self.assertGreater(other.acquire("a", now=100.5), 0.0)
+            self.assertEqual(other.acquire("a", now=110.0), 0.0)
+
+    def test_prunes_idle_clients(self):
+        """Test idle clients are pruned once max_clients is exceeded"""
+        limiter = TokenBucketLimiter(rate=1, burst=1, max_clients=2)
+        for i, client in enumerate("abc"):
+            limiter.acquire(client, now=float(i * 10))
+        self.assertEqual(len(limiter._buckets), 1)
+
+    def test_evicts_least_recently_used_when_all_active(self):
+        """Test a full table of active clients evicts the oldest ones in one pass"""
+        limiter = TokenBucketLimiter(rate=1, burst=5, max_clients=8)
+        for i in range(9):
+            limiter.acquire(f"c{i}", now=100.0)
+        self.assertEqual(list(limiter._buckets), [f"c{i}" for i in range(3, 9)])
+        limiter.acquire("c9", now=100.0)   # below the limit again: no rebuild
+        self.assertEqual(len(limiter._buckets), 7)
+
+    def test_invalid_settings(self):
+        """Test a non-positive rate is rejected"""
+        with self.assertRaises(ValueError):
+            TokenBucketLimiter(rate=0, burst=1)
+
+
+class TestSessionPriorities(unittest.TestCase):
+    """Test suite for SessionPriorities"""
+
+    def test_priorities(self):
+        """Test High sessions are critical and repeat polls are low"""
+        sessions = SessionPriorities(poll_interval_s=5)
+        self.assertEqual(sessions.priority("s", now=0), PRIORITY_NORMAL)
+        sessions.record("s", "Low", now=0)
+        self.assertEqual(sessions.priority("s", now=2), PRIORITY_LOW)     # repeat poll
+        self.assertEqual(sessions.priority("s", now=10), PRIORITY_NORMAL)
+        sessions.record("s", "High", now=10)
+        self.assertEqual(sessions.priority("s", now=11), PRIORITY_CRITICAL)
+
+    def test_bounded(self):
+        """Test the oldest sessions are forgotten past max_sessions"""
+        sessions = SessionPriorities(max_sessions=2)
+        for session in "abc":
+            sessions.record(session, "High", now=0)
+        self.assertEqual(sessions.priority("a", now=1), PRIORITY_NORMAL)
+        self.assertEqual(sessions.priority("c", now=1), PRIORITY_CRITICAL)
+
+
+class TestLoadShedder(unittest.TestCase):
+    """Test suite for LoadShedder"""
+
+    def test_sheds_low_priority_first(self):
+        """Test low priority is shed at half load and critical never"""
+        shedder = LoadShedder(max_in_flight=4, low_load=0.5)
+        self.assertTrue(shedder.admit(PRIORITY_LOW))
+        self.assertTrue(shedder.admit(PRIORITY_NORMAL))
+        self.assertFalse(shedder.admit(PRIORITY_LOW))         # load 0.5
+        self.assertTrue(shedder.admit(PRIORITY_NORMAL))
+        self.assertTrue(shedder.admit(PRIORITY_NORMAL))
+        self.assertFalse(shedder.admit(PRIORITY_NORMAL))      # load 1.0
+        self.assertTrue(shedder.admit(PRIORITY_CRITICAL))     # never shed
+        for _ in range(5):
+            shedder.release()
+        self.assertTrue(shedder.admit(PRIORITY_LOW))
+        metrics = shedder.metrics()
+        self.assertEqual(metrics["shed"], {"low": 1, "normal": 1, "critical": 0})
+        self.assertEqual(metrics["in_flight"], 1)
+
+    def test_queue_delay_counts_as_load(self):
+        """Test queueing delay raises the load seen by admit"""
+        shedder = LoadShedder(max_in_flight=100, max_queue_delay_ms=200)
+        self.assertTrue(shedder.admit(PRIORITY_LOW, queue_delay_ms=50))
+        self.assertFalse(shedder.admit(PRIORITY_LOW, queue_delay_ms=120))
+        self.assertFalse(shedder.admit(PRIORITY_NORMAL, queue_delay_ms=250))
+        self.assertTrue(shedder.admit(PRIORITY_CRITICAL, queue_delay_ms=1000))
+
+
+@unittest.skipUnless(importlib.util.find_spec("flask"), "Flask not installed")
+class TestAdmissionControl(unittest.TestCase):
+    """Test suite for admission control in app.py"""
+
+    def setUp(self):
+        import app
+        saved = (app.limiter, app.session_priorities, app.shedder)
+
+        def restore():
+            app.limiter, app.session_priorities, app.shedder = saved
+        self.addCleanup(restore)
+        app.limiter = TokenBucketLimiter(rate=0.001, burst=2)
+        app.session_priorities = SessionPriorities()
+        app.shedder = None
+        self.client = app.app.test_client()
+
+    def test_rotating_api_keys_share_one_bucket(self):
+        """Test unrecognised API keys do not give a client a fresh bucket"""
+        statuses = [self.client.post('/api/assess', json={'hour': 12, 'crime_score': 10},
+                                     headers={'X-API-Key': f'key-{i}'}).status_code
+                    for i in range(4)]
+        self.assertEqual(statuses.count(429), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Unit tests for the micro-batcher
+"""
+
+import threading
+import unittest
+from micro_batcher import MicroBatcher
+from safety_analyzer import SafetyAnalyzer, CrowdDensity
+
+
+class TestMicroBatcher(unittest.TestCase):
+    """Test suite for MicroBatcher"""
+
+    def setUp(self):
+        self.analyzer = SafetyAnalyzer()
+        self.batcher = MicroBatcher(self.analyzer, max_batch=16, max_wait_ms=20)
+
+    def tearDown(self):
+        self.batcher.close()
+
+    def request(self, i):
+        return dict(hour=i % 24, latitude=40.7128, longitude=-74.0060,
+                    crowd_density=CrowdDensity.LOW, crime_score=i % 101,
+                    movement_speed=1.0, network_available=True)
+
+    def test_concurrent_requests_are_coalesced(self):
+        """Test concurrent callers share batches and get their own results"""
+        results = {}
+
+        def call(i):
+            results[i] = self.batcher.assess(timeout=5, **self.request(i))
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(64)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for i in range(64):
+            self.assertEqual(results[i], self.analyzer.assess_safety(**self.request(i)))
+        metrics = self.batcher.metrics()
+        self.assertEqual(metrics["items"], 64)
+        self.assertLess(metrics["batches"], 64)
+
+    def test_bad_request_is_isolated(self):
+        """Test one invalid request fails alone"""
+        bad = self.batcher.submit(hour=1)
+        good = self.batcher.submit(**self.request(5))
+        with self.assertRaises(TypeError):
+            bad.result(timeout=5)
+        self.assertEqual(good.result(timeout=5).risk_score,
+                         self.analyzer.assess_safety(**self.request(5)).risk_score)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
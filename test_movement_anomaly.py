@@ -0,0 +1,84 @@
+"""
+Unit tests for movement anomaly detection
+"""
+
+import math
+import random
+import unittest
+from movement_anomaly import MovementAnomalyDetector
+from safety_analyzer import SafetyAnalyzer, CrowdDensity
+
+METER = 1 / 111320   # degrees of latitude per meter
+
+
+class TestMovementAnomalyDetector(unittest.TestCase):
+    """Test suite for MovementAnomalyDetector"""
+
+    def setUp(self):
+        self.detector = MovementAnomalyDetector(max_sessions=3)
+        self.jitter = random.Random(5)
+
+    def move_then_stop(self, session_id, speed_mps, stop_s=30):
+        """Move north at speed_mps for 30 s, then stand still with GPS jitter"""
+        for t in range(30):
+            self.detector.update(session_id, 40.7 + speed_mps * t * METER, -74.0, t)
+        stop = 40.7 + speed_mps * 30 * METER
+        return [self.detector.update(session_id, stop + self.jitter.uniform(-2, 2) * METER, -74.0, t)
+                for t in range(30, 30 + stop_s)]
+
+    def test_abrupt_stop_after_running(self):
+        """Test a stop from running pace is flagged once it lasts"""
+        signals = self.move_then_stop("run", 3.0)
+        self.assertEqual(signals[0], 0.0)
+        self.assertEqual(signals[-1], 1.0)
+        self.assertGreater(self.detector.session_stats("run")["dwell_s"], 10)
+
+    def test_ordinary_stops_not_flagged(self):
+        """Test stops from walking pace (a red light) or driving are not flagged"""
+        self.assertEqual(max(self.move_then_stop("walk", 1.4)), 0.0)
+        self.assertEqual(max(self.move_then_stop("car", 12.0)), 0.0)
+
+    def test_erratic_path(self):
+        """Test random headings are flagged and a steady path is not"""
+        rng = random.Random(2)
+        erratic = steady = 0.0
+        lat, lon = 40.7, -74.0
+        for t in range(40):
+            heading = rng.uniform(0, 2 * math.pi)
+            lat += 8 * math.cos(heading) * METER
+            lon += 8 * math.sin(heading) * METER / 0.76
+            erratic = max(erratic, self.detector.update("erratic", lat, lon, t * 4))
+        for t in range(40):
+            heading = 0.3 + rng.gauss(0, 0.3)
+            lat += 8 * math.cos(heading) * METER
+            lon += 8 * math.sin(heading) * METER / 0.76
+            steady = max(steady, self.detector.update("steady", lat, lon, t * 4))
+        self.assertGreater(erratic, 0.5)
+        self.assertEqual(steady, 0.0)
+
+    def test_gap_and_order(self):
+        """Test long gaps restart a session and stale fixes are ignored"""
+        self.move_then_stop("run", 3.0, stop_s=15)
+        self.assertEqual(self.detector.update("run", 40.8, -74.0, 20), 1.0)   # stale
+        self.assertEqual(self.detector.update("run", 40.8, -74.0, 5000), 0.0)
+        self.assertEqual(self.detector.session_stats("run")["speed_mps"], 0.0)
+
+    def test_sessions_bounded(self):
+        """Test least recently seen sessions are dropped"""
+        for i in range(5):
+            self.detector.update(f"s{i}", 40.7, -74.0, 0)
+        self.assertIsNone(self.detector.session_stats("s0"))
+        self.assertEqual(self.detector.metrics()["sessions"], 3)
+
+    def test_feeds_movement_factor(self):
+        """Test the signal raises the risk score as an extra factor"""
+        analyzer = SafetyAnalyzer()
+        args = (22, 40.7128, -74.0060, CrowdDensity.LOW, 40, 0.0, True)
+        plain = analyzer.assess_safety(*args)
+        flagged = analyzer.assess_safety(*args, extra_risks={"movement_anomaly": 1.0})
+        self.assertGreater(flagged.risk_score, plain.risk_score)
+        self.assertIn("movement_anomaly", flagged.threat_factors)
+
+
+if __name__ == '__main__':
+    unittest.main()
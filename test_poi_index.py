@@ -0,0 +1,58 @@
+"""
+Unit tests for the safe place index
+"""
+
+import random
+import unittest
+from geo import haversine_m
+from poi_index import SafePlace, SafePlaceIndex
+from safety_analyzer import SafetyAnalyzer, CrowdDensity
+
+
+class TestSafePlaceIndex(unittest.TestCase):
+    """Test suite for SafePlaceIndex"""
+
+    def setUp(self):
+        """Scatter places around lower Manhattan"""
+        rng = random.Random(7)
+        categories = ["police", "hospital", "24h_store"]
+        self.places = [
+            SafePlace(f"place-{i}", categories[i % 3],
+                      40.70 + rng.uniform(-0.05, 0.05), -74.00 + rng.uniform(-0.05, 0.05))
+            for i in range(500)
+        ]
+        self.index = SafePlaceIndex(self.places)
+
+    def test_matches_brute_force(self):
+        """Test nearest results equal a full scan"""
+        rng = random.Random(11)
+        for _ in range(50):
+            lat, lon = 40.70 + rng.uniform(-0.04, 0.04), -74.00 + rng.uniform(-0.04, 0.04)
+            expected = sorted(haversine_m(lat, lon, p.latitude, p.longitude) for p in self.places)[:5]
+            found = [distance for _, distance in self.index.nearest(lat, lon, 5)]
+            self.assertEqual(len(found), 5)
+            for a, b in zip(found, expected):
+                self.assertAlmostEqual(a, b)
+
+    def test_category_filter_and_radius(self):
+        """Test category filtering and the distance cap"""
+        results = self.index.nearest(40.70, -74.00, 3, categories=["police"])
+        self.assertTrue(all(place.category == "police" for place, _ in results))
+        self.assertEqual(self.index.nearest(10.0, 10.0, 3), [])
+
+    def test_high_risk_assessment_lists_places(self):
+        """Test High results carry the nearest safe places"""
+        analyzer = SafetyAnalyzer(safe_places=self.index, safe_place_count=2)
+        high = analyzer.assess_safety(2, 40.70, -74.00, CrowdDensity.LOW, 90, 0.0, False)
+        self.assertEqual(high.risk_level, "High")
+        self.assertEqual(len(high.nearest_safe_places), 2)
+        self.assertLessEqual(high.nearest_safe_places[0]["distance_m"],
+                             high.nearest_safe_places[1]["distance_m"])
+        self.assertIn("Nearest Safe Places:", str(high))
+
+        low = analyzer.assess_safety(12, 40.70, -74.00, CrowdDensity.HIGH, 10, 2.0, True)
+        self.assertIsNone(low.nearest_safe_places)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
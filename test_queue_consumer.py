@@ -0,0 +1,160 @@
+"""
+Unit tests for the queue consumer
+"""
+
+import json
+import os
+import tempfile
+import unittest
+import shutil
+from queue_consumer import (AssessmentLogSink, JSONLSink, JSONLSource, QueueConsumer,
+                            SQLiteSource)
+from safety_analyzer import SafetyAnalyzer, CrowdDensity
+
+
+def events(count, start=0):
+    return [{"event_id": start + i, "hour": (start + i) % 24, "latitude": 40.7,
+             "longitude": -74.0, "crowd_density": "LOW", "crime_score": (start + i) % 101,
+             "movement_speed": 1.0, "network_available": True} for i in range(count)]
+
+
+class FlakySink:
+    """Collects results; fails the first fail_writes writes"""
+
+    def __init__(self, fail_writes=0):
+        self.fail_writes = fail_writes
+        self.results = []
+
+    def write(self, results):
+        if self.fail_writes:
+            self.fail_writes -= 1
+            raise OSError("sink unavailable")
+        self.results.extend(results)
+
+
+class TestQueueConsumer(unittest.TestCase):
+    """Test suite for event-driven scoring"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.analyzer = SafetyAnalyzer()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def append(self, path, lines):
+        with open(path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+
+    def consumer(self, source, sink, **kwargs):
+        kwargs.setdefault("retry_backoff", 0)
+        return QueueConsumer(self.analyzer, source, sink, **kwargs)
+
+    def test_jsonl_scores_and_commits(self):
+        """Test file events are scored like assess_safety and the offset survives restarts"""
+        path = self.path("events.jsonl")
+        self.append(path, [json.dumps(event) + "\n" for event in events(50)])
+        self.append(path, ['not json\n', '{"crime_score": "high"}\n', '{"hour": 3'])
+        sink = FlakySink()
+        consumer = self.consumer(JSONLSource(path), sink, batch_size=8, concurrency=3)
+        consumer.drain()
+        consumer.close()
+        self.assertEqual([r["event_id"] for r in sink.results], list(range(50)))
+        for result, event in zip(sink.results, events(50)):
+            expected = self.analyzer.assess_safety(event["hour"], 40.7, -74.0, CrowdDensity.LOW,
+                                                   event["crime_score"], 1.0, True)
+            self.assertEqual((result["risk_score"], result["threat_factors"]),
+                             (expected.risk_score, expected.threat_factors))
+        metrics = consumer.metrics()
+        self.assertEqual((metrics["scored"], metrics["invalid"]), (50, 2))
+        # Only the unfinished last line is left
+        self.assertEqual((metrics["lag"], metrics["lag_unit"]), (len('{"hour": 3'), "bytes"))
+
+        # Restarting resumes after the committed offset
+        self.append(path, ['}\n'])
+        sink = FlakySink()
+        consumer = self.consumer(JSONLSource(path), sink)
+        consumer.drain()
+        self.assertEqual([r["hour"] for r in sink.results], [3])
+        self.assertEqual(consumer.metrics()["lag"], 0)
+
+    def test_sqlite_queue(self):
+        """Test the SQLite queue with per-consumer offsets and lag in events"""
+        db = self.path("queue.db")
+        source = SQLiteSource(db)
+        source.publish(events(20))
+        self.assertEqual(source.lag(), 20)
+        sink = FlakySink()
+        consumer = self.consumer(source, sink, batch_size=6)
+        consumer.drain()
+        self.assertEqual(len(sink.results), 20)
+        self.assertEqual((consumer.metrics()["lag"], consumer.metrics()["committed_offset"]),
+                         (0, 20))
+        consumer.close()
+        other = SQLiteSource(db, consumer="audit")
+        self.assertEqual((SQLiteSource(db).lag(), other.lag()), (0, 20))
+
+    def test_failed_write_is_retried(self):
+        """Test offsets are not committed past a failed write (at-least-once)"""
+        path = self.path("events.jsonl")
+        self.append(path, [json.dumps(event) + "\n" for event in events(30)])
+        sink = FlakySink(fail_writes=1)
+        consumer = self.consumer(JSONLSource(path), sink, batch_size=10, concurrency=2)
+        consumer.drain()
+        self.assertEqual(consumer.metrics()["failures"], 1)
+        # Every event arrives at least once, in no particular order
+        self.assertEqual({r["event_id"] for r in sink.results}, set(range(30)))
+        self.assertEqual(consumer.metrics()["lag"], 0)
+
+    def test_poison_events_are_skipped(self):
+        """Test out-of-range numbers count as invalid instead of failing the batch"""
+        path = self.path("events.jsonl")
+        self.append(path, [json.dumps(events(1)[0]) + "\n", '{"hour": 1e999}\n',
+                           '{"utc_timestamp": 1e20}\n', '{"latitude": NaN}\n',
+                           json.dumps(events(1, start=1)[0]) + "\n"])
+        sink = FlakySink()
+        consumer = self.consumer(JSONLSource(path), sink)
+        for _ in range(3):
+            consumer.run_once()
+        metrics = consumer.metrics()
+        self.assertEqual((metrics["failures"], metrics["invalid"], metrics["lag"]), (0, 3, 0))
+        self.assertEqual([r["event_id"] for r in sink.results], [0, 1])
+
+    def test_assessment_log_write_failure_is_retried(self):
+        """Test a failed assessment log write is not committed and is retried"""
+        path = self.path("events.jsonl")
+        self.append(path, [json.dumps(event) + "\n" for event in events(3)])
+        log_dir = self.path("log")
+        sink = AssessmentLogSink(log_dir)
+        shutil.rmtree(log_dir)
+        with open(log_dir, "w", encoding="utf-8"):
+            pass   # a file where the directory was: every write fails
+        consumer = self.consumer(JSONLSource(path), sink)
+        consumer.run_once()
+        consumer.run_once()   # nothing new: waits for the batch and sees it fail
+        metrics = consumer.metrics()
+        self.assertEqual((metrics["failures"], metrics["committed_offset"]), (1, 0))
+        os.remove(log_dir)
+        os.makedirs(log_dir)
+        consumer.drain()
+        consumer.close()
+        self.assertEqual(consumer.metrics()["lag"], 0)
+        self.assertEqual(len(list(sink.log.scan())), 3)
+
+    def test_jsonl_sink(self):
+        """Test the file sink appends one result per line"""
+        path = self.path("events.jsonl")
+        self.append(path, [json.dumps(event) + "\n" for event in events(5)])
+        out = self.path("out.jsonl")
+        consumer = self.consumer(JSONLSource(path), JSONLSink(out, fsync=False))
+        consumer.drain()
+        consumer.close()
+        with open(out, encoding="utf-8") as f:
+            self.assertEqual([json.loads(line)["event_id"] for line in f], list(range(5)))
+
+
+if __name__ == '__main__':
+    unittest.main()
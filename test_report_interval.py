@@ -0,0 +1,46 @@
+"""
+Unit tests for adaptive reporting-interval advice
+"""
+
+import unittest
+from report_interval import ReportIntervalAdvisor
+
+
+class TestReportIntervalAdvisor(unittest.TestCase):
+    """Test suite for ReportIntervalAdvisor"""
+
+    def setUp(self):
+        self.advisor = ReportIntervalAdvisor()
+
+    def test_level_base_intervals(self):
+        """Test steady stationary sessions get the level's base interval"""
+        self.assertEqual(self.advisor.advise("low", "Low", 20), 60.0)
+        self.assertEqual(self.advisor.advise("medium", "Medium", 45), 20.0)
+        self.assertEqual(self.advisor.advise("high", "High", 80), 5.0)
+
+    def test_speed_bounds_distance(self):
+        """Test moving sessions report at least every max_distance_m"""
+        self.assertEqual(self.advisor.advise("walk", "Low", 20, movement_speed=1.25), 60.0)
+        self.assertEqual(self.advisor.advise("car", "Low", 20, movement_speed=10.0), 10.0)
+        self.assertEqual(self.advisor.advise("train", "Low", 20, movement_speed=100.0), 2.0)
+
+    def test_volatile_scores_report_sooner(self):
+        """Test score changes between reports shorten the interval"""
+        for score in (20, 50, 20, 50):
+            interval = self.advisor.advise("s1", "Low", score)
+        self.assertLess(interval, 40.0)
+        for _ in range(30):
+            interval = self.advisor.advise("s1", "Low", 20)
+        self.assertGreater(interval, 55.0)
+
+    def test_load_stretches_all_but_high(self):
+        """Test the load factor and server load slow Low/Medium but never High"""
+        self.assertEqual(self.advisor.advise("a", "Medium", 45, load=1.0), 40.0)
+        self.assertEqual(self.advisor.advise("b", "High", 80, load=1.5), 5.0)
+        self.advisor.load_factor = 4.0
+        self.assertEqual(self.advisor.advise("c", "Low", 20), 240.0)
+        self.assertEqual(self.advisor.advise("d", "Low", 20, load=1.5), 300.0)   # capped
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Unit tests for assessment rollups
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from rollups import AssessmentRollup
+
+
+class TestAssessmentRollup(unittest.TestCase):
+    """Test suite for AssessmentRollup"""
+
+    def setUp(self):
+        """Rollup with a few NYC and London assessments"""
+        self.rollup = AssessmentRollup()
+        self.rollup.record(23, 40.7128, -74.0060, "High", ["night_time", "crime_history"])
+        self.rollup.record(23, 40.7130, -74.0062, "Medium", ["night_time"])
+        self.rollup.record(14, 51.5074, -0.1278, "Low", [])
+
+    def test_counters(self):
+        """Test totals, hourly counts and top factors"""
+        stats = AssessmentRollup.stats(self.rollup.snapshot())
+        self.assertEqual(stats["total"], 3)
+        self.assertEqual(stats["levels"], {"Low": 1, "Medium": 1, "High": 1})
+        self.assertEqual(stats["by_hour"][23], {"Low": 0, "Medium": 1, "High": 1})
+        self.assertEqual(stats["top_threat_factors"][0], {"factor": "night_time", "count": 2})
+        self.assertEqual(len(stats["top_threat_factors"]), 2)
+
+    def test_region_prefixes(self):
+        """Test any geohash prefix up to the precision answers directly"""
+        state = self.rollup.snapshot()
+        for region in ("d", "dr5", "dr5re"):
+            levels = AssessmentRollup.stats(state, region=region)["region"]["levels"]
+            self.assertEqual(levels, {"Low": 0, "Medium": 1, "High": 1})
+        london = AssessmentRollup.stats(state, region="gcpvj")["region"]["levels"]
+        self.assertEqual(london["Low"], 1)
+        self.assertEqual(AssessmentRollup.stats(state, region="zzzz")["region"]["levels"]["Low"], 0)
+
+    def test_merge_across_workers(self):
+        """Test published snapshots merge with live counters"""
+        other = AssessmentRollup()
+        other.record(2, 40.7128, -74.0060, "High", ["crime_history"])
+        with tempfile.TemporaryDirectory() as tmp:
+            other.publish(tmp, worker_id="2")
+            self.rollup.publish(tmp, worker_id="1")
+            self.rollup.record(3, 40.7128, -74.0060, "High", [])
+            merged = self.rollup.merged_with_peers(tmp, worker_id="1")
+            self.assertEqual(sorted(os.listdir(tmp)), ["rollup-1.json", "rollup-2.json"])
+        self.assertEqual(merged["total"], 5)
+        self.assertEqual(merged["by_factor"]["crime_history"], 2)
+        self.assertEqual(merged["by_region"]["dr5re"][2], 3)
+
+    def test_query_caches_peers_until_they_change(self):
+        """Test query matches stats() and rereads peer files only after a change"""
+        other = AssessmentRollup()
+        other.record(2, 40.7128, -74.0060, "High", ["crime_history"])
+        with tempfile.TemporaryDirectory() as tmp:
+            other.publish(tmp, worker_id="2")
+            stats = self.rollup.query(region="dr5re", directory=tmp, worker_id="1")
+            expected = AssessmentRollup.stats(
+                self.rollup.merged_with_peers(tmp, worker_id="1"), region="dr5re")
+            self.assertEqual(stats, expected)
+            self.assertEqual(stats["region"]["levels"]["High"], 2)
+            cached = self.rollup._peer_state(tmp, worker_id="1")
+            self.assertIs(self.rollup._peer_state(tmp, worker_id="1"), cached)
+
+            other.record(3, 40.7128, -74.0060, "Low", [])
+            other.publish(tmp, worker_id="2")
+            os.utime(os.path.join(tmp, "rollup-2.json"), ns=(1, 1))   # mtime granularity
+            self.assertEqual(self.rollup.query(directory=tmp, worker_id="1")["total"], 5)
+
+    def test_publishes_on_a_timer(self):
+        """Test the publisher thread writes snapshots without flush calls"""
+        with tempfile.TemporaryDirectory() as tmp:
+            self.rollup.start_publishing(tmp, interval_s=0.01, worker_id="1")
+            try:
+                path = os.path.join(tmp, "rollup-1.json")
+                for _ in range(500):
+                    if os.path.exists(path):
+                        break
+                    time.sleep(0.01)
+                self.assertTrue(os.path.exists(path))
+            finally:
+                self.rollup.stop_publishing()
+            self.assertEqual(AssessmentRollup().query(directory=tmp)["total"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
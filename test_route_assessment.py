@@ -0,0 +1,66 @@
+"""
+Unit tests for route risk assessment
+"""
+
+import unittest
+from safety_analyzer import SafetyAnalyzer, CrowdDensity
+from route_assessment import assess_route
+from geo import haversine_m, densify
+
+
+class TestRouteAssessment(unittest.TestCase):
+    """Test suite for assess_route"""
+
+    def setUp(self):
+        """Initialize analyzer and a ~1 km route for each test"""
+        self.analyzer = SafetyAnalyzer()
+        self.route = [(40.7128, -74.0060), (40.7218, -74.0060)]
+
+    def test_haversine_distance(self):
+        """Test one degree of latitude is ~111 km"""
+        self.assertAlmostEqual(haversine_m(0, 0, 1, 0) / 1000, 111.2, places=1)
+
+    def test_densify_respects_step(self):
+        """Test densified legs never exceed the step length"""
+        points = densify(self.route, 50)
+        for (lat1, lon1), (lat2, lon2) in zip(points, points[1:]):
+            self.assertLessEqual(haversine_m(lat1, lon1, lat2, lon2), 50.01)
+        self.assertEqual(points[0], self.route[0])
+        self.assertEqual(points[-1], self.route[-1])
+
+    def test_segments_match_point_assessment(self):
+        """Test segment scores equal a single-point assessment"""
+        route = assess_route(self.analyzer, self.route, departure_hour=14,
+                             speed=1.4, crowd_density=CrowdDensity.HIGH,
+                             crime_score=20)
+        expected = self.analyzer.assess_safety(14, 40.7128, -74.0060,
+                                               CrowdDensity.HIGH, 20, 1.4, True)
+        self.assertGreater(len(route.segments), 1)
+        for segment in route.segments:
+            self.assertEqual(segment.risk_score, expected.risk_score)
+        self.assertEqual(route.max_risk_score, expected.risk_score)
+        self.assertAlmostEqual(route.mean_risk_score, expected.risk_score)
+        self.assertEqual(route.time_in_high_s, 0)
+
+    def test_route_crossing_into_night(self):
+        """Test departure time advances the hour along the route"""
+        route = assess_route(self.analyzer, self.route, departure_hour=20.99,
+                             speed=0.5, crowd_density=CrowdDensity.LOW,
+                             crime_score=90, network_available=False)
+        self.assertEqual(route.segments[0].hour, 20)
+        self.assertEqual(route.segments[-1].hour, 21)
+        self.assertEqual(route.risk_level, "High")
+        self.assertGreater(route.time_in_high_s, 0)
+        self.assertLess(route.time_in_high_s, route.total_duration_s)
+        self.assertGreater(route.max_risk_score, route.segments[0].risk_score)
+
+    def test_invalid_route(self):
+        """Test invalid routes are rejected"""
+        with self.assertRaises(ValueError):
+            assess_route(self.analyzer, self.route[:1], 12, 1.4)
+        with self.assertRaises(ValueError):
+            assess_route(self.analyzer, self.route, 12, 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,120 @@
+"""
+Unit tests for safest-route search
+"""
+
+import os
+import random
+import tempfile
+import unittest
+from geo import haversine_m
+from routing import RoadGraph, SafeRouter, convert_osm_xml
+
+
+def grid_graph(crime_middle=90):
+    """
+    3x3 grid (~110 m spacing); node 4 in the middle sits on high-crime edges
+
+        6 - 7 - 8
+        |   |   |
+        3 - 4 - 5
+        |   |   |
+        0 - 1 - 2
+    """
+    nodes = [(40.700 + row * 0.001, -74.000 + col * 0.0013)
+             for row in range(3) for col in range(3)]
+    edges = []
+    for n in range(9):
+        row, col = divmod(n, 3)
+        for m in ([n + 1] if col < 2 else []) + ([n + 3] if row < 2 else []):
+            crime = crime_middle if 4 in (n, m) else 10
+            edges.append([n, m, 0, crime])
+    return RoadGraph(nodes, edges)
+
+
+class TestSafeRouter(unittest.TestCase):
+    """Test suite for RoadGraph and SafeRouter"""
+
+    def setUp(self):
+        """Build a router over the grid for each test"""
+        self.graph = grid_graph()
+        self.router = SafeRouter(self.graph, risk_weight=2.0)
+
+    def test_csr_layout(self):
+        """Test undirected edges become two arcs"""
+        self.assertEqual(self.graph.node_count, 9)
+        self.assertEqual(self.graph.arc_count, 24)
+        self.assertEqual(self.graph.offsets[-1], 24)
+
+    def test_nearest_node_matches_linear_scan(self):
+        """Test the grid search finds the same node as a scan, near and far from the graph"""
+        rng = random.Random(7)
+        nodes = [(40.6 + rng.random() * 0.2, -74.1 + rng.random() * 0.2) for _ in range(500)]
+        graph = RoadGraph(nodes, [])
+        queries = [(40.55 + rng.random() * 0.3, -74.15 + rng.random() * 0.3) for _ in range(200)]
+        for latitude, longitude in queries + [(51.5, -0.1), (-33.9, 151.2)]:
+            expected = min(range(len(nodes)), key=lambda n: haversine_m(
+                latitude, longitude, graph.lat[n], graph.lon[n]))
+            self.assertEqual(graph.nearest_node(latitude, longitude), expected)
+
+    def test_safest_route_avoids_high_crime(self):
+        """Test the best of the equal-length corner routes skips the middle"""
+        routes = self.router.safest_routes(0, 8, hour=23, k=1)
+        self.assertEqual(len(routes), 1)
+        self.assertNotIn(4, routes[0].nodes)
+        self.assertEqual(routes[0].nodes[0], 0)
+        self.assertEqual(routes[0].nodes[-1], 8)
+
+    def test_k_routes_sorted_and_within_budget(self):
+        """Test k routes are distinct, cost ordered and within budget"""
+        routes = self.router.safest_routes(0, 8, hour=12, k=3, max_distance_m=500)
+        self.assertEqual(len(routes), 3)
+        self.assertEqual(len({tuple(r.nodes) for r in routes}), 3)
+        self.assertEqual([r.cost for r in routes], sorted(r.cost for r in routes))
+        for route in routes:
+            self.assertLessEqual(route.distance_m, 500)
+
+    def test_distance_budget_excludes_detours(self):
+        """Test a tight budget only allows the direct route"""
+        routes = self.router.safest_routes(3, 5, hour=23, k=3, max_detour=1.0)
+        self.assertEqual(len(routes), 1)
+        self.assertIn(4, routes[0].nodes)
+
+    def test_edge_table_cached_per_hour(self):
+        """Test the hourly cost table is built once"""
+        table = self.router.edge_table(22)
+        self.assertIs(self.router.edge_table(22), table)
+        self.assertIsNot(self.router.edge_table(12), table)
+        scores, costs = table
+        self.assertTrue(all(c >= l for c, l in zip(costs, self.graph.lengths)))
+
+    def test_rejects_out_of_range_hours(self):
+        """Test hours outside 0-23 raise instead of caching another edge table"""
+        for hour in (-1, 24, 10 ** 6):
+            with self.assertRaises(ValueError):
+                self.router.safest_routes(0, 8, hour=hour)
+        self.assertEqual(self.router.cache_bytes, 0)
+
+    def test_convert_osm_xml(self):
+        """Test converting a tiny OSM extract and loading it back"""
+        osm = """<?xml version="1.0"?>
+<osm>
+  <node id="1" lat="40.700" lon="-74.000"/>
+  <node id="2" lat="40.701" lon="-74.000"/>
+  <node id="3" lat="40.702" lon="-74.000"/>
+  <node id="9" lat="40.800" lon="-74.000"/>
+  <way id="10"><nd ref="1"/><nd ref="2"/><nd ref="3"/><tag k="highway" v="residential"/></way>
+  <way id="11"><nd ref="3"/><nd ref="9"/><tag k="highway" v="motorway"/></way>
+</osm>"""
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "map.osm")
+            destination = os.path.join(tmp, "graph.json")
+            with open(source, "w") as f:
+                f.write(osm)
+            self.assertEqual(convert_osm_xml(source, destination), (3, 2))
+            graph = RoadGraph.load(destination)
+        self.assertEqual(graph.arc_count, 4)
+        self.assertEqual(graph.nearest_node(40.7021, -74.0), 2)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
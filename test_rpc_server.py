@@ -0,0 +1,127 @@
+"""
+Unit tests for the Unix-socket RPC server and client
+"""
+
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from rpc_server import LENGTH, MAX_FRAME, OP_ASSESS, RPCClient, RPCServer, frame
+from safety_analyzer import SafetyAnalyzer, CrowdDensity
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Unix sockets not available")
+class TestRPCServer(unittest.TestCase):
+    """Test suite for RPC scoring"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "safety.sock")
+        self.analyzer = SafetyAnalyzer()
+        self.server = RPCServer(self.path, self.analyzer)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.client = RPCClient(self.path, timeout=5)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.tmp.cleanup()
+
+    def requests(self):
+        return [{"hour": hour, "latitude": 40.7, "longitude": -74.0, "crowd_density": density,
+                 "crime_score": crime, "movement_speed": 0.5, "network_available": hour % 2 == 0}
+                for hour in (2, 14, 23) for density in ("LOW", "HIGH") for crime in (10, 80)]
+
+    def expected(self, request):
+        return self.analyzer.assess_safety(
+            request["hour"], request["latitude"], request["longitude"],
+            CrowdDensity[request["crowd_density"]], request["crime_score"],
+            request["movement_speed"], request["network_available"])
+
+    def assert_matches(self, requests, replies):
+        self.assertEqual(len(replies), len(requests))
+        for request, reply in zip(requests, replies):
+            assessment = self.expected(request)
+            self.assertEqual((reply["risk_score"], reply["risk_level"], reply["threat_factors"],
+                              reply["emergency"], reply["hour"]),
+                             (assessment.risk_score, assessment.risk_level,
+                              assessment.threat_factors, bool(assessment.emergency_actions),
+                              request["hour"]))
+
+    def test_assess_matches_analyzer(self):
+        """Test single, pipelined and batched calls all score like assess_safety"""
+        requests = self.requests()
+        self.assert_matches(requests[:1], [self.client.assess(requests[0])])
+        self.assert_matches(requests, self.client.assess_many(requests))
+        self.assert_matches(requests, self.client.assess_batch(requests))
+        self.assertEqual(self.client.assess_batch([]), [])
+
+    def test_pipelined_frames_share_a_score_call(self):
+        """Test frames arriving together are scored in one batch"""
+        self.client.assess_many(self.requests())
+        metrics = self.server.metrics()
+        self.assertEqual(metrics["requests"], len(self.requests()))
+        self.assertGreater(metrics["requests_per_score_call"], 1)
+
+    def test_timestamp_and_auto_density(self):
+        """Test server-side local time and AUTO crowd density fall back like /api/assess"""
+        reply = self.client.assess({"utc_timestamp": 1760000000.0, "latitude": 40.7,
+                                    "longitude": -74.0, "crowd_density": "AUTO"})
+        hour, _ = self.analyzer.local_time(1760000000.0, 40.7, -74.0)
+        self.assertEqual((reply["hour"], reply["crowd_density"]), (hour, "MEDIUM"))
+
+    def test_errors_keep_the_connection(self):
+        """Test a bad frame is answered with an error and later calls still work"""
+        self.client.sock.sendall(frame(0, 9, b""))
+        self.client._next_id = 0
+        with self.assertRaises(ValueError):
+            self.client._read_reply(0)
+        self.client.sock.sendall(frame(1, OP_ASSESS, b"\x01"))
+        with self.assertRaises(ValueError):
+            self.client._read_reply(1)
+        self.client._next_id = 2
+        self.assert_matches(self.requests()[:1], [self.client.assess(self.requests()[0])])
+        self.assertEqual(self.server.metrics()["errors"], 2)
+
+    def test_bad_requests_fail_alone(self):
+        """Test a request that cannot be scored gets its own error; its neighbours are answered"""
+        good = self.requests()[:2]
+        poison = {"utc_timestamp": 1e20, "latitude": 40.7, "longitude": -74.0}
+        for replies in (self.client.assess_batch([good[0], poison, good[1]]),
+                        self.client.assess_many([good[0], poison, good[1]])):
+            self.assertIn("utc_timestamp", replies[1]["error"])
+            self.assert_matches(good, [replies[0], replies[2]])
+        with self.assertRaises(ValueError):
+            self.client.assess(poison)
+        self.assert_matches(good[:1], [self.client.assess(good[0])])
+
+    def test_batch_failure_falls_back_to_single_scoring(self):
+        """Test requests are scored one by one when the batch call raises"""
+        def failing_batch(requests):
+            raise RuntimeError("batch path down")
+        self.analyzer.assess_batch = failing_batch
+        requests = self.requests()
+        self.assert_matches(requests, self.client.assess_many(requests))
+
+    def test_refuses_to_replace_a_regular_file(self):
+        """Test only a stale socket at the path is removed"""
+        path = os.path.join(self.tmp.name, "data.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("keep me")
+        with self.assertRaises(FileExistsError):
+            RPCServer(path, self.analyzer)
+        self.assertTrue(os.path.exists(path))
+
+    def test_oversized_frame_drops_the_connection(self):
+        """Test a frame past MAX_FRAME closes the connection"""
+        self.client.sock.sendall(LENGTH.pack(MAX_FRAME + 1))
+        with self.assertRaises(ConnectionError):
+            self.client._read_reply(0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Unit tests for scoring bundles and the reference evaluator
+"""
+
+import io
+import json
+import os
+import random
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from crime_grid import CrimeGrid, HOURS_PER_WEEK
+from safety_analyzer import SafetyAnalyzer, CrowdDensity
+from scoring_bundle import BundleEvaluator, build_bundle, load_bundle, main, verify_bundle
+
+FIELDS = ("risk_score", "risk_level", "threat_reason", "recommended_action",
+          "emergency_actions", "threat_factors", "contributions")
+
+
+class TestScoringBundle(unittest.TestCase):
+    """Test suite for scoring bundles"""
+
+    def setUp(self):
+        """A 10x10 crime grid with some empty cells; the bundle tile covers part of it"""
+        rng = random.Random(3)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.grid_path = os.path.join(self.tmp.name, "crime.grid")
+        CrimeGrid.write(self.grid_path, 40.70, -74.02, 0.01, 10, 10, {
+            (row, col): [rng.randrange(101) for _ in range(HOURS_PER_WEEK)]
+            for row in range(10) for col in range(10) if rng.random() < 0.8
+        })
+        self.grid = CrimeGrid(self.grid_path)
+        self.bbox = (40.725, -73.995, 40.765, -73.955)
+        self.points = [(40.725 + rng.random() * 0.04, -73.995 + rng.random() * 0.04)
+                       for _ in range(5)] + [(95.0, 0.0)]
+
+    def tearDown(self):
+        self.grid.close()
+        self.tmp.cleanup()
+
+    def assert_reproduces(self, analyzer):
+        # Round-trip through JSON as a client would receive it
+        evaluator = BundleEvaluator(json.loads(json.dumps(build_bundle(analyzer, self.bbox))))
+        for hour in (-1, 0, 6, 14, 21, 24):
+            for density in CrowdDensity:
+                for crime in (-5, 0, 60, 61, 100, 150):
+                    for speed in (-1.0, 0.0, 1.5):
+                        for network in (True, False):
+                            for latitude, longitude in self.points:
+                                for weekday in (None, 5):
+                                    for extra in (None, {"geofence": 0.8},
+                                                  {"geofence": 0.2, "movement_anomaly": 1.0}):
+                                        args = (hour, latitude, longitude, density, crime,
+                                                speed, network)
+                                        full = analyzer.assess_safety(
+                                            *args, weekday=weekday, extra_risks=extra,
+                                            explain=True)
+                                        self.assertEqual(
+                                            evaluator.assess(*args, weekday=weekday,
+                                                             extra_risks=extra, explain=True),
+                                            {field: getattr(full, field) for field in FIELDS},
+                                            (args, weekday, extra))
+
+    def test_reproduces_assess_safety(self):
+        """Test the evaluator matches assess_safety exactly, crime tile and breakdown included"""
+        self.assert_reproduces(SafetyAnalyzer(crime_grid=self.grid))
+
+    def test_reproduces_tenant_rules(self):
+        """Test custom weights and thresholds are carried in the bundle"""
+        self.assert_reproduces(SafetyAnalyzer(
+            crime_grid=self.grid, low_risk_max=20, medium_risk_max=40,
+            weights={factor: i + 1.5 for i, factor in enumerate(SafetyAnalyzer.FACTORS)}
+        ))
+
+    def test_integrity(self):
+        """Test the hash is stable and detects tampering"""
+        bundle = build_bundle(SafetyAnalyzer())
+        self.assertEqual(bundle["sha256"], build_bundle(SafetyAnalyzer())["sha256"])
+        self.assertNotEqual(bundle["sha256"],
+                            build_bundle(SafetyAnalyzer(low_risk_max=25))["sha256"])
+        bundle["thresholds"]["low_risk_max"] = 90
+        with self.assertRaises(ValueError):
+            verify_bundle(bundle)
+        with self.assertRaises(ValueError):
+            BundleEvaluator(bundle)
+        with self.assertRaises(ValueError):
+            build_bundle(SafetyAnalyzer(), self.bbox)   # no crime grid to tile
+
+    def test_cli_export_and_verify(self):
+        """Test the export and verify commands"""
+        path = os.path.join(self.tmp.name, "bundle.json")
+        bbox = ",".join(str(value) for value in self.bbox)
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(main(["export", path, self.grid_path, bbox]), 0)
+            self.assertEqual(main(["verify", path]), 0)
+        bundle = load_bundle(path)
+        self.assertEqual((bundle["crime_tile"]["rows"], bundle["crime_tile"]["cols"]), (5, 5))
+        # Compact: the whole bundle with a 25-cell tile stays small
+        self.assertLess(os.path.getsize(path), 64 * 1024)
+        with open(path, "r+", encoding="utf-8") as f:
+            text = f.read().replace('"low_risk_max":30', '"low_risk_max":31')
+            f.seek(0)
+            f.write(text)
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(main(["verify", path]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Unit tests for SOS dispatch
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+from sos_dispatch import SOSDispatcher, StubNotifier, Notifier, SOSJob
+
+
+class BarrierNotifier(Notifier):
+    """Succeeds only once `parties` sends are in flight together"""
+
+    def __init__(self, name, barrier):
+        self.name = name
+        self.barrier = barrier
+
+    def send(self, job):
+        self.barrier.wait(2)
+
+
+class TestSOSDispatcher(unittest.TestCase):
+    """Test suite for SOSDispatcher"""
+
+    def make(self, notifiers, **kwargs):
+        dispatcher = SOSDispatcher(notifiers, backoff_s=0.001, max_backoff_s=0.01, **kwargs)
+        self.addCleanup(dispatcher.close)
+        return dispatcher
+
+    def test_fans_out_to_every_notifier(self):
+        """Test one High fix sends the same job through every notifier"""
+        webhook, sms = StubNotifier("webhook"), StubNotifier("sms")
+        dispatcher = self.make([webhook, sms])
+        key = dispatcher.observe("s1", "High", 40.7, -74.0, 85, ["night_time"])
+        self.assertTrue(dispatcher.flush(2))
+        for notifier in (webhook, sms):
+            self.assertEqual([job.idempotency_key for job in notifier.sent], [key])
+        self.assertEqual(sms.sent[0].threat_factors, ["night_time"])
+        self.assertEqual(dispatcher.metrics()["delivered"], 2)
+
+    def test_sends_concurrently(self):
+        """Test deliveries to different notifiers run in parallel"""
+        barrier = threading.Barrier(3)
+        dispatcher = self.make([BarrierNotifier(str(i), barrier) for i in range(3)], workers=3)
+        dispatcher.observe("s1", "High", 40.7, -74.0, 85)
+        self.assertTrue(dispatcher.flush(3))
+        self.assertEqual(dispatcher.metrics()["failed"], 0)
+
+    def test_dedupes_episode(self):
+        """Test High fixes within episode_s share one key and one send"""
+        stub = StubNotifier()
+        dispatcher = self.make([stub], episode_s=60)
+        first = dispatcher.observe("s1", "High", 40.7, -74.0, 85, now=0)
+        self.assertEqual(dispatcher.observe("s1", "High", 40.7, -74.0, 90, now=30), first)
+        self.assertEqual(dispatcher.observe("s1", "High", 40.7, -74.0, 90, now=80), first)
+        after_gap = dispatcher.observe("s1", "High", 40.7, -74.0, 85, now=200)   # new episode
+        dispatcher.flush(2)
+        self.assertNotEqual(first, after_gap)
+        self.assertEqual(len(stub.sent), 2)
+        self.assertEqual(dispatcher.metrics()["deduplicated"], 2)
+
+    def test_lower_level_does_not_end_episode(self):
+        """Test High, Medium, High within episode_s sends one SOS"""
+        stub = StubNotifier()
+        dispatcher = self.make([stub], episode_s=60)
+        first = dispatcher.observe("s1", "High", 40.7, -74.0, 85, now=0)
+        self.assertIsNone(dispatcher.observe("s1", "Medium", 40.7, -74.0, 50, now=10))
+        self.assertEqual(dispatcher.observe("s1", "High", 40.7, -74.0, 85, now=20), first)
+        dispatcher.flush(2)
+        self.assertEqual(len(stub.sent), 1)
+
+    def test_workers_share_episodes(self):
+        """Test dispatchers sharing a store send each episode once"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "sos.db")
+        stubs = [StubNotifier(), StubNotifier()]
+        workers = [self.make([stub], episode_s=60, path=path) for stub in stubs]
+        first = workers[0].observe("s1", "High", 40.7, -74.0, 85, now=10)
+        self.assertEqual(workers[1].observe("s1", "High", 40.7, -74.0, 85, now=20), first)
+        self.assertIsNone(workers[1].observe("s1", "Medium", 40.7, -74.0, 50, now=25))
+        self.assertEqual(workers[0].observe("s1", "High", 40.7, -74.0, 85, now=30), first)
+        second = workers[1].observe("s1", "High", 40.7, -74.0, 85, now=100)
+        for worker in workers:
+            worker.flush(2)
+        self.assertNotEqual(first, second)
+        self.assertEqual([job.idempotency_key for job in stubs[0].sent], [first])
+        self.assertEqual([job.idempotency_key for job in stubs[1].sent], [second])
+        self.assertTrue(workers[1].metrics()["shared"])
+
+    def test_key_is_deterministic_without_shared_state(self):
+        """Test unshared dispatchers derive the same key for one episode"""
+        workers = [self.make([StubNotifier()], episode_s=60) for _ in range(2)]
+        self.assertEqual(workers[0].observe("s1", "High", 40.7, -74.0, 85, now=130),
+                         workers[1].observe("s1", "High", 40.7, -74.0, 85, now=170))
+        self.assertNotEqual(workers[0].observe("s2", "High", 40.7, -74.0, 85, now=130),
+                            workers[1].observe("s1", "High", 40.7, -74.0, 85, now=130))
+
+    def test_retries_with_same_key(self):
+        """Test failed sends are retried under the job's idempotency key"""
+        flaky = StubNotifier(failure_rate=0.6, seed=3)
+        dispatcher = self.make([flaky], max_attempts=20)
+        keys = [dispatcher.observe(f"s{i}", "High", 40.7, -74.0, 85) for i in range(10)]
+        self.assertTrue(dispatcher.flush(5))
+        self.assertEqual(sorted(job.idempotency_key for job in flaky.sent), sorted(keys))
+        metrics = dispatcher.metrics()
+        self.assertGreater(metrics["retries"], 0)
+        self.assertEqual(metrics["delivered"], 10)
+
+    def test_gives_up_after_max_attempts(self):
+        """Test a dead notifier is given up on after max_attempts"""
+        dead = StubNotifier(failure_rate=1.0)
+        dispatcher = self.make([dead], max_attempts=3)
+        dispatcher.observe("s1", "High", 40.7, -74.0, 85)
+        self.assertTrue(dispatcher.flush(2))
+        metrics = dispatcher.metrics()
+        self.assertEqual((metrics["failed"], metrics["retries"], metrics["pending"]), (1, 2, 0))
+
+    def test_job_text(self):
+        """Test the alert text carries the position and score"""
+        job = SOSJob("k", "s1", 40.7128, -74.006, 88)
+        self.assertIn("score 88", job.text())
+        self.assertIn("40.712800,-74.006000", job.text())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Unit tests for tenant profiles
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from safety_analyzer import SafetyAnalyzer, CrowdDensity
+from tenants import TenantProfile, TenantRegistry, load_profiles, STATE_OVERHEAD_BYTES
+
+
+class FakeCache:
+    def __init__(self, cache_bytes):
+        self.cache_bytes = cache_bytes
+
+
+class TestTenantRegistry(unittest.TestCase):
+    """Test suite for TenantRegistry"""
+
+    def setUp(self):
+        self.base = SafetyAnalyzer(safe_place_count=5)
+        self.registry = TenantRegistry([
+            TenantProfile("night-shift", weights={
+                "night_time": 40, "crowd_density": 10, "crime_history": 20,
+                "network_availability": 10, "movement_speed": 10, "gps_validity": 10
+            }),
+            TenantProfile("strict", low_risk_max=10, medium_risk_max=20, api_keys=["key-1"]),
+        ], self.base)
+
+    def assess(self, analyzer, hour=23):
+        return analyzer.assess_safety(hour=hour, latitude=40.7, longitude=-74.0,
+                                      crowd_density=CrowdDensity.MEDIUM, crime_score=30,
+                                      movement_speed=1.0, network_available=True)
+
+    def test_no_tenant_uses_base(self):
+        """Test requests without a tenant use the base analyzer"""
+        self.assertIsNone(self.registry.resolve())
+
+    def test_resolve_by_id_and_key(self):
+        """Test tenants resolve by id or API key to one shared state"""
+        self.assertEqual(self.registry.resolve("night-shift").profile.tenant_id, "night-shift")
+        self.assertEqual(self.registry.resolve(api_key="key-1").profile.tenant_id, "strict")
+        # The same state is reused across requests
+        self.assertIs(self.registry.resolve("night-shift"), self.registry.resolve("night-shift"))
+
+    def test_resolve_errors(self):
+        """Test unknown tenants, bad keys and missing keys are refused"""
+        with self.assertRaises(ValueError):
+            self.registry.resolve("unknown")
+        with self.assertRaises(ValueError):
+            self.registry.resolve(api_key="bad-key")
+        with self.assertRaises(ValueError):
+            self.registry.resolve("strict")   # keyed tenants need their key
+
+    def test_profiles_change_scoring(self):
+        """Test profile weights and thresholds change scores without touching the defaults"""
+        night = self.registry.resolve("night-shift").analyzer
+        strict = self.registry.resolve(api_key="key-1").analyzer
+        base = self.assess(self.base)
+        self.assertGreater(self.assess(night).risk_score, base.risk_score)
+        self.assertEqual(self.assess(strict).risk_score, base.risk_score)
+        self.assertEqual(self.assess(strict).risk_level, "High")
+        self.assertNotEqual(base.risk_level, "High")
+        # The class defaults are untouched
+        self.assertEqual(SafetyAnalyzer.WEIGHTS["night_time"], 15)
+        self.assertEqual(SafetyAnalyzer.LOW_RISK_MAX, 30)
+
+    def test_shares_base_indexes(self):
+        """Test tenant analyzers reuse the base analyzer's indexes"""
+        analyzer = self.registry.resolve("night-shift").analyzer
+        self.assertEqual(analyzer.safe_place_count, 5)
+        self.assertIs(analyzer.crime_grid, self.base.crime_grid)
+
+    def test_invalid_profile_fails_at_startup(self):
+        """Test invalid weights and thresholds are rejected when the registry is built"""
+        with self.assertRaises(ValueError):
+            TenantRegistry([TenantProfile("bad", weights={"night_time": 1})], self.base)
+        with self.assertRaises(ValueError):
+            TenantRegistry([TenantProfile("bad", low_risk_max=70, medium_risk_max=50)], self.base)
+
+    def test_lru_eviction_over_budget(self):
+        """Test least recently used tenant state is evicted over the memory budget"""
+        profiles = [TenantProfile(f"t{i}") for i in range(4)]
+        registry = TenantRegistry(profiles, self.base,
+                                  memory_budget=3 * (STATE_OVERHEAD_BYTES + 1000))
+        for i in range(3):
+            registry.resolve(f"t{i}").caches["table"] = FakeCache(1000)
+        registry.resolve("t0")                    # t1 is now least recently used
+        registry.resolve("t3")                    # building t3 evicts t1
+        registry.resolve("t3").caches["table"] = FakeCache(1000)
+        self.assertEqual(registry.trim(), 0)
+        registry.resolve("t0").caches["table"] = FakeCache(2000)
+        self.assertEqual(registry.trim(), 1)      # t2 is next
+        metrics = registry.metrics()
+        self.assertEqual(metrics["cached"], 2)
+        self.assertEqual(metrics["evictions"], 2)
+        self.assertLessEqual(metrics["cached_bytes"], registry.memory_budget)
+        # An evicted tenant is rebuilt without its caches
+        self.assertEqual(registry.resolve("t1").caches, {})
+
+    def test_load_profiles(self):
+        """Test profiles load from a JSON file"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tenants.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"tenants": [{"id": "acme", "api_keys": ["k"], "medium_risk_max": 50}]}, f)
+            profiles = load_profiles(path)
+        self.assertEqual(profiles, [TenantProfile("acme", medium_risk_max=50, api_keys=["k"])])
+
+
+if __name__ == '__main__':
+    unittest.main()
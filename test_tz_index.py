@@ -0,0 +1,58 @@
+"""
+Unit tests for the offline timezone index
+"""
+
+import unittest
+from datetime import datetime, timezone
+from tz_index import TimezoneIndex, nautical_timezone
+from safety_analyzer import SafetyAnalyzer, CrowdDensity
+
+
+def box(south, west, north, east):
+    return [[(south, west), (south, east), (north, east), (north, west), (south, west)]]
+
+
+class TestTimezoneIndex(unittest.TestCase):
+    """Test suite for TimezoneIndex"""
+
+    def setUp(self):
+        """Two neighbouring zones split at a diagonal-free border of -80.3 degrees"""
+        self.index = TimezoneIndex([
+            ("America/New_York", [box(38.0, -80.3, 45.0, -72.0)]),
+            ("America/Chicago", [box(38.0, -90.0, 45.0, -80.3)]),
+        ])
+        # 2026-01-15 03:30 UTC
+        self.timestamp = datetime(2026, 1, 15, 3, 30, tzinfo=timezone.utc).timestamp()
+
+    def test_interior_and_border_lookups(self):
+        """Test interior cells and refined border cells"""
+        self.assertEqual(self.index.zone_at(40.7128, -74.0060), "America/New_York")
+        self.assertEqual(self.index.zone_at(41.8781, -87.6298), "America/Chicago")
+        self.assertEqual(self.index.zone_at(40.0, -80.2), "America/New_York")
+        self.assertEqual(self.index.zone_at(40.0, -80.4), "America/Chicago")
+        self.assertIsNone(self.index.zone_at(0.0, -30.0))
+
+    def test_local_time(self):
+        """Test local time follows the zone's UTC offset"""
+        self.assertEqual(self.index.local_time(self.timestamp, 40.7128, -74.0060).hour, 22)
+        self.assertEqual(self.index.local_time(self.timestamp, 41.8781, -87.6298).hour, 21)
+        # Open ocean falls back to the nautical zone (UTC-2)
+        self.assertEqual(self.index.local_time(self.timestamp, 0.0, -30.0).hour, 1)
+
+    def test_nautical_timezone(self):
+        """Test nautical offsets are rounded and clamped"""
+        self.assertEqual(nautical_timezone(-74.0).utcoffset(None).total_seconds(), -5 * 3600)
+        self.assertEqual(nautical_timezone(179.9).utcoffset(None).total_seconds(), 12 * 3600)
+
+    def test_analyzer_derives_hour(self):
+        """Test assess_safety derives night time from the timestamp"""
+        analyzer = SafetyAnalyzer(tz_index=self.index)
+        self.assertEqual(analyzer.local_time(self.timestamp, 40.7128, -74.0060), (22, 2))
+        args = (12, 40.7128, -74.0060, CrowdDensity.MEDIUM, 30, 1.0, True)
+        derived = analyzer.assess_safety(*args, timestamp=self.timestamp)
+        self.assertIn("night hours", derived.threat_reason)
+        self.assertNotIn("night hours", analyzer.assess_safety(*args).threat_reason)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,78 @@
+"""
+Unit tests for the compact wire formats
+"""
+
+import unittest
+from wire_format import (JSON_TYPE, MSGPACK_TYPE, REQUEST, RESPONSE, STRUCT_TYPE, content_types,
+                         decode_request, decode_response, encode_request, encode_response,
+                         negotiate)
+
+
+class TestWireFormat(unittest.TestCase):
+    """Test suite for the binary /api/assess encodings"""
+
+    def test_request_round_trip(self):
+        """Test requests decode to the JSON request fields"""
+        request = {"hour": 23, "weekday": 5, "latitude": 40.7128, "longitude": -74.006,
+                   "crowd_density": "low", "crime_score": 65, "movement_speed": 0.5,
+                   "network_available": "false", "accuracy": 12.5, "session_id": "sess-é"}
+        body = encode_request(request)
+        self.assertEqual(len(body), REQUEST.size + len("sess-é".encode("utf-8")))
+        self.assertEqual(decode_request(body), {
+            "hour": 23, "weekday": 5, "utc_timestamp": None, "accuracy": 12.5,
+            "crowd_density": "LOW", "network_available": False, "crime_score": 65,
+            "latitude": 40.7128, "longitude": -74.006, "movement_speed": 0.5,
+            "session_id": "sess-é"
+        })
+        # Optional fields stay absent
+        decoded = decode_request(encode_request({"utc_timestamp": 1760000000.5}))
+        self.assertEqual((decoded["hour"], decoded["weekday"], decoded["session_id"]),
+                         (None, None, None))
+        self.assertEqual(decoded["utc_timestamp"], 1760000000.5)
+
+    def test_rejects_bad_requests(self):
+        """Test truncated, foreign-version and bad-code bodies are refused"""
+        body = encode_request({"session_id": "abc"})
+        for bad in (body[:10], body[:-1], b"\x09" + body[1:],
+                    body[:4] + b"\x09" + body[5:]):
+            with self.assertRaises(ValueError):
+                decode_request(bad)
+
+    def test_response_round_trip(self):
+        """Test responses carry the level code and threat bitmask, not strings"""
+        data = {"risk_score": 72, "risk_level": "High", "threat_reason": "Multiple risk factors",
+                "emergency_actions": ["Trigger Alarm"], "sos_idempotency_key": "k",
+                "threat_factors": ["night_time", "crowd_density", "geofence"],
+                "hour": 23, "crowd_density": "LOW", "next_report_after": 5.0,
+                "location": {"latitude": 40.7128, "longitude": -74.006}}
+        body = encode_response(data)
+        self.assertEqual(len(body), RESPONSE.size)
+        self.assertEqual(decode_response(body), {
+            "risk_score": 72, "risk_level": "High",
+            "threat_factors": ["night_time", "crowd_density", "geofence"],
+            "emergency": True, "fix_suppressed": False, "sos_sent": True,
+            "hour": 23, "crowd_density": "LOW",
+            "location": {"latitude": 40.7128, "longitude": -74.006},
+            "next_report_after": 5.0
+        })
+
+    def test_negotiation(self):
+        """Test Accept wins, then the request's binary type, then JSON"""
+        self.assertEqual(negotiate(f"{STRUCT_TYPE}, {JSON_TYPE}"), STRUCT_TYPE)
+        self.assertEqual(negotiate("*/*", STRUCT_TYPE), STRUCT_TYPE)
+        self.assertEqual(negotiate(JSON_TYPE, STRUCT_TYPE), JSON_TYPE)
+        self.assertEqual(negotiate(None), JSON_TYPE)
+        self.assertEqual(negotiate("text/html"), JSON_TYPE)
+
+    @unittest.skipUnless(MSGPACK_TYPE in content_types(), "msgpack not installed")
+    def test_msgpack_round_trip(self):
+        """Test the msgpack encoding carries the same fields"""
+        data = {"risk_score": 10, "risk_level": "Low", "threat_factors": [],
+                "hour": 12, "crowd_density": "HIGH",
+                "location": {"latitude": 1.0, "longitude": 2.0}}
+        decoded = decode_response(encode_response(data, MSGPACK_TYPE), MSGPACK_TYPE)
+        self.assertEqual((decoded["risk_score"], decoded["risk_level"]), (10, "Low"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Unit tests for the write-behind queue
+"""
+
+import threading
+import unittest
+from write_behind import WriteBehindQueue, DROP_NEWEST, DROP_OLDEST, BLOCK
+
+
+class TestWriteBehindQueue(unittest.TestCase):
+    """Test suite for WriteBehindQueue"""
+
+    def setUp(self):
+        self.store = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def flush(self, batch):
+        self.gate.wait(5)
+        self.store.extend(batch)
+
+    def test_flushes_in_batches(self):
+        """Test items reach the store in bulk and in order"""
+        queue = WriteBehindQueue(self.flush, batch_size=10, flush_interval=0.01)
+        for i in range(95):
+            self.assertTrue(queue.put(i))
+        self.assertTrue(queue.drain(timeout=5))
+        queue.close()
+        self.assertEqual(self.store, list(range(95)))
+        metrics = queue.metrics()
+        self.assertEqual(metrics["flushed"], 95)
+        self.assertGreaterEqual(metrics["flush_count"], 10)
+        self.assertEqual(metrics["depth"], 0)
+
+    def stalled_queue(self, overflow):
+        """Queue of 5 whose writer is stuck flushing item 0"""
+        self.gate.clear()
+        queue = WriteBehindQueue(self.flush, maxsize=5, batch_size=1, flush_interval=0.001,
+                                 overflow=overflow, block_timeout=0.01)
+        queue.put(0)
+        while queue.depth:
+            pass
+        for i in range(1, 6):
+            queue.put(i)
+        return queue
+
+    def test_drop_newest(self):
+        """Test a full queue rejects new items"""
+        queue = self.stalled_queue(DROP_NEWEST)
+        self.assertFalse(queue.put(6))
+        self.gate.set()
+        queue.close()
+        self.assertEqual(self.store, [0, 1, 2, 3, 4, 5])
+        self.assertEqual(queue.metrics()["dropped"], 1)
+
+    def test_drop_oldest(self):
+        """Test a full queue evicts its oldest item"""
+        queue = self.stalled_queue(DROP_OLDEST)
+        self.assertTrue(queue.put(6))
+        self.gate.set()
+        queue.close()
+        self.assertEqual(self.store, [0, 2, 3, 4, 5, 6])
+
+    def test_block_then_reject(self):
+        """Test BLOCK waits briefly for room before rejecting"""
+        queue = self.stalled_queue(BLOCK)
+        self.assertFalse(queue.put(6))
+        self.gate.set()
+        self.assertTrue(queue.put(7))
+        queue.close()
+        self.assertEqual(self.store[-1], 7)
+
+    def test_close_flushes_remaining(self):
+        """Test shutdown flushes everything still queued"""
+        queue = WriteBehindQueue(self.flush, batch_size=1000, flush_interval=60)
+        for i in range(10):
+            queue.put(i)
+        queue.close()
+        self.assertEqual(self.store, list(range(10)))
+        self.assertFalse(queue.put(10))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,142 @@
+"""
+Offline Timezone Index
+Derives local time from (timestamp, latitude, longitude) without network calls
+
+Boundaries come from a local GeoJSON file such as the timezone-boundary-builder
+release (features with a "tzid" property and Polygon/MultiPolygon geometry).
+"""
+
+import json
+import math
+from datetime import datetime, timedelta, timezone, tzinfo
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from geo import LatLon, point_in_polygon
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+Rings = List[List[LatLon]]
+
+
+def nautical_timezone(longitude: float) -> tzinfo:
+    """Fixed UTC offset of the 15-degree nautical zone containing a longitude"""
+    hours = max(-12, min(12, int(round(longitude / 15.0))))
+    return timezone(timedelta(hours=hours))
+
+
+class TimezoneIndex:
+    """
+    Precomputed grid over timezone polygons
+
+    Cells that no polygon edge passes through resolve to a single zone at
+    build time. Border cells keep their candidate zones and are refined
+    with point-in-polygon tests; recent refinements are kept in an LRU
+    keyed by ~100 m cells, so repeat lookups cost a dict hit.
+    """
+
+    def __init__(self,
+                 zones: List[Tuple[str, List[Rings]]],
+                 cell_deg: float = 0.5,
+                 cache_size: int = 65536):
+        """
+        Args:
+            zones: (tzid, polygons) pairs; each polygon is an outer ring
+                followed by hole rings of (lat, lon) points
+            cell_deg: Grid cell size in degrees
+            cache_size: Entries in the recent-lookup LRU
+        """
+        self.cell_deg = cell_deg
+        self.zones = zones
+        self._tzinfos: Dict[str, tzinfo] = {}
+
+        interior: Dict[Tuple[int, int], int] = {}
+        border: Dict[Tuple[int, int], Set[int]] = {}
+        for z, (_, polygons) in enumerate(zones):
+            for rings in polygons:
+                edge_cells = set()
+                for ring in rings:
+                    for (lat1, lon1), (lat2, lon2) in zip(ring, ring[1:] + ring[:1]):
+                        edge_cells.update(self._cells_in_box(min(lat1, lat2), min(lon1, lon2),
+                                                             max(lat1, lat2), max(lon1, lon2)))
+                lats = [lat for lat, _ in rings[0]]
+                lons = [lon for _, lon in rings[0]]
+                for cell in self._cells_in_box(min(lats), min(lons), max(lats), max(lons)):
+                    if cell in edge_cells:
+                        border.setdefault(cell, set()).add(z)
+                    else:
+                        row, col = cell
+                        center = ((row + 0.5) * cell_deg, (col + 0.5) * cell_deg)
+                        if point_in_polygon(center[0], center[1], rings):
+                            interior[cell] = z
+
+        self.cells: Dict[Tuple[int, int], Union[int, Tuple[int, ...]]] = dict(interior)
+        for cell, candidates in border.items():
+            if cell in interior:
+                candidates.add(interior[cell])
+            self.cells[cell] = tuple(sorted(candidates))
+
+        self._refine = lru_cache(maxsize=cache_size)(self._refine_uncached)
+
+    def _cells_in_box(self, south: float, west: float, north: float, east: float):
+        c = self.cell_deg
+        for row in range(int(math.floor(south / c)), int(math.floor(north / c)) + 1):
+            for col in range(int(math.floor(west / c)), int(math.floor(east / c)) + 1):
+                yield row, col
+
+    def _refine_uncached(self, latitude: float, longitude: float,
+                         candidates: Tuple[int, ...]) -> Optional[int]:
+        for z in candidates:
+            if any(point_in_polygon(latitude, longitude, rings) for rings in self.zones[z][1]):
+                return z
+        return None
+
+    def zone_at(self, latitude: float, longitude: float) -> Optional[str]:
+        """IANA timezone name at a coordinate, or None outside every zone"""
+        cell = (int(math.floor(latitude / self.cell_deg)), int(math.floor(longitude / self.cell_deg)))
+        entry = self.cells.get(cell)
+        if entry is None:
+            return None
+        if isinstance(entry, tuple):
+            entry = self._refine(round(latitude, 3), round(longitude, 3), entry)
+            if entry is None:
+                return None
+        return self.zones[entry][0]
+
+    def tzinfo_at(self, latitude: float, longitude: float) -> tzinfo:
+        """tzinfo for a coordinate; the nautical zone when no boundary matches"""
+        tzid = self.zone_at(latitude, longitude)
+        if tzid is None or ZoneInfo is None:
+            return nautical_timezone(longitude)
+        tz = self._tzinfos.get(tzid)
+        if tz is None:
+            try:
+                tz = ZoneInfo(tzid)
+            except Exception:
+                tz = nautical_timezone(longitude)
+            self._tzinfos[tzid] = tz
+        return tz
+
+    def local_time(self, timestamp: float, latitude: float, longitude: float) -> datetime:
+        """Aware local datetime for a UNIX timestamp at a coordinate"""
+        return datetime.fromtimestamp(timestamp, self.tzinfo_at(latitude, longitude))
+
+    @classmethod
+    def load(cls, path: str, cell_deg: float = 0.5) -> "TimezoneIndex":
+        """Load a GeoJSON FeatureCollection of timezone boundaries"""
+        with open(path, "r", encoding="utf-8") as f:
+            collection = json.load(f)
+        zones = []
+        for feature in collection["features"]:
+            geometry = feature["geometry"]
+            polygons = geometry["coordinates"]
+            if geometry["type"] == "Polygon":
+                polygons = [polygons]
+            zones.append((
+                feature["properties"]["tzid"],
+                [[[(lat, lon) for lon, lat in ring] for ring in polygon] for polygon in polygons]
+            ))
+        return cls(zones, cell_deg=cell_deg)
@@ -0,0 +1,180 @@
+"""
+Compact Wire Formats
+Binary encodings of /api/assess requests and responses for clients on weak
+networks, negotiated by Content-Type / Accept alongside JSON
+
+application/x-safety-assess is a fixed little-endian struct layout: the
+risk level travels as a code and the threat factors as a bitmask
+(threat_mask), so responses carry no strings. application/msgpack is
+offered when the optional msgpack package is installed. Texts (reasons,
+actions) come from the client's scoring bundle.
+"""
+
+import struct
+from typing import Optional
+
+from safety_analyzer import threat_factors_from_mask, threat_mask
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+JSON_TYPE = "application/json"
+STRUCT_TYPE = "application/x-safety-assess"
+MSGPACK_TYPE = "application/msgpack"
+
+WIRE_VERSION = 1
+CROWD_CODES = ("LOW", "MEDIUM", "HIGH", "AUTO")
+LEVEL_CODES = ("Low", "Medium", "High")
+
+# Request: version, flags, hour, weekday, crowd code, network, crime score,
+# latitude, longitude, movement speed, accuracy, utc timestamp, session id
+# length; the UTF-8 session id follows
+REQUEST = struct.Struct("<BBbbBBhddffdB")
+HAS_HOUR = 1
+HAS_WEEKDAY = 2
+HAS_TIMESTAMP = 4
+HAS_ACCURACY = 8
+
+# Response: version, flags, risk score, level code, threat mask, hour, crowd
+# code, latitude, longitude, next report after (s)
+RESPONSE = struct.Struct("<BBBBHbBddf")
+EMERGENCY = 1       # High: run the emergency actions
+SUPPRESSED = 2      # fix absorbed by the fix filter; last response repeated
+SOS_SENT = 4        # the server dispatched (or is deduplicating) an SOS
+
+
+def content_types() -> tuple:
+    """Binary types this server can decode and encode"""
+    return (STRUCT_TYPE, MSGPACK_TYPE) if msgpack is not None else (STRUCT_TYPE,)
+
+
+def negotiate(accept: Optional[str], content_type: Optional[str] = None) -> str:
+    """
+    Response type for an Accept header
+
+    Falls back to the request's own binary type, then JSON. Quality values
+    are ignored; the first supported type listed wins.
+    """
+    for part in (accept or "").split(","):
+        mime = part.split(";")[0].strip().lower()
+        if mime in content_types() or mime == JSON_TYPE:
+            return mime
+    if content_type in content_types():
+        return content_type
+    return JSON_TYPE
+
+
+def encode_request(data: dict) -> bytes:
+    """Pack a JSON-shaped assess request (client side)"""
+    flags = 0
+    for key, flag in (("hour", HAS_HOUR), ("weekday", HAS_WEEKDAY),
+                      ("utc_timestamp", HAS_TIMESTAMP), ("accuracy", HAS_ACCURACY)):
+        if data.get(key) is not None:
+            flags |= flag
+    session_id = str(data.get("session_id") or "").encode("utf-8")
+    if len(session_id) > 255:
+        raise ValueError("session_id is longer than 255 bytes")
+    network = str(data.get("network_available", True)).lower() in ("true", "1", "yes")
+    return REQUEST.pack(
+        WIRE_VERSION, flags,
+        int(data.get("hour") or 0), int(data.get("weekday") or 0),
+        CROWD_CODES.index(str(data.get("crowd_density", "MEDIUM")).upper()),
+        network,
+        int(data.get("crime_score", 50)),
+        float(data.get("latitude", 0)), float(data.get("longitude", 0)),
+        float(data.get("movement_speed", 1.0)), float(data.get("accuracy") or 0.0),
+        float(data.get("utc_timestamp") or 0.0),
+        len(session_id)
+    ) + session_id
+
+
+def decode_request(body: bytes, content_type: str = STRUCT_TYPE) -> dict:
+    """Unpack a binary assess request into the JSON request fields"""
+    if content_type == MSGPACK_TYPE:
+        if msgpack is None:
+            raise ValueError("msgpack is not installed")
+        data = msgpack.unpackb(body, raw=False)
+        if not isinstance(data, dict):
+            raise ValueError("msgpack request must be a map")
+        return data
+
+    view = memoryview(body)
+    if len(view) < REQUEST.size:
+        raise ValueError("truncated request")
+    (version, flags, hour, weekday, crowd, network, crime_score, latitude, longitude,
+     movement_speed, accuracy, utc_timestamp, id_length) = REQUEST.unpack_from(view)
+    if version != WIRE_VERSION:
+        raise ValueError(f"unsupported wire version {version}")
+    if len(view) < REQUEST.size + id_length:
+        raise ValueError("truncated request")
+    if crowd >= len(CROWD_CODES):
+        raise ValueError(f"unknown crowd density code {crowd}")
+    return {
+        "hour": hour if flags & HAS_HOUR else None,
+        "weekday": weekday if flags & HAS_WEEKDAY else None,
+        "utc_timestamp": utc_timestamp if flags & HAS_TIMESTAMP else None,
+        "accuracy": accuracy if flags & HAS_ACCURACY else None,
+        "crowd_density": CROWD_CODES[crowd],
+        "network_available": bool(network),
+        "crime_score": crime_score,
+        "latitude": latitude,
+        "longitude": longitude,
+        "movement_speed": movement_speed,
+        "session_id": str(view[REQUEST.size:REQUEST.size + id_length], "utf-8") or None
+    }
+
+
+def _response_fields(data: dict) -> tuple:
+    flags = 0
+    if data.get("emergency_actions"):
+        flags |= EMERGENCY
+    if data.get("fix_suppressed"):
+        flags |= SUPPRESSED
+    if data.get("sos_idempotency_key"):
+        flags |= SOS_SENT
+    location = data.get("location") or {}
+    return (
+        WIRE_VERSION, flags, data["risk_score"], LEVEL_CODES.index(data["risk_level"]),
+        threat_mask(data.get("threat_factors")), max(-128, min(127, data.get("hour", 0))),
+        CROWD_CODES.index(data.get("crowd_density", "MEDIUM")),
+        location.get("latitude", 0.0), location.get("longitude", 0.0),
+        data.get("next_report_after") or 0.0
+    )
+
+
+def encode_response(data: dict, content_type: str = STRUCT_TYPE) -> bytes:
+    """Pack the data of an /api/assess response"""
+    fields = _response_fields(data)
+    if content_type == MSGPACK_TYPE:
+        if msgpack is None:
+            raise ValueError("msgpack is not installed")
+        return msgpack.packb(fields)   # array in RESPONSE field order
+    return RESPONSE.pack(*fields)
+
+
+def decode_response(body: bytes, content_type: str = STRUCT_TYPE) -> dict:
+    """Unpack a binary assess response (client side)"""
+    if content_type == MSGPACK_TYPE:
+        if msgpack is None:
+            raise ValueError("msgpack is not installed")
+        fields = msgpack.unpackb(body)
+    else:
+        fields = RESPONSE.unpack_from(memoryview(body))
+    (version, flags, risk_score, level, mask, hour, crowd, latitude, longitude,
+     next_report_after) = fields
+    if version != WIRE_VERSION:
+        raise ValueError(f"unsupported wire version {version}")
+    return {
+        "risk_score": risk_score,
+        "risk_level": LEVEL_CODES[level],
+        "threat_factors": threat_factors_from_mask(mask),
+        "emergency": bool(flags & EMERGENCY),
+        "fix_suppressed": bool(flags & SUPPRESSED),
+        "sos_sent": bool(flags & SOS_SENT),
+        "hour": hour,
+        "crowd_density": CROWD_CODES[crowd],
+        "location": {"latitude": latitude, "longitude": longitude},
+        "next_report_after": next_report_after
+    }
@@ -0,0 +1,155 @@
+"""
+Write-Behind Queue
+Moves persistence off the request path: callers enqueue, a background
+thread flushes batches to the store
+"""
+
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, List, Optional
+
+# What put() does when the queue is full
+DROP_NEWEST = "drop_newest"   # reject the new item
+DROP_OLDEST = "drop_oldest"   # evict the oldest queued item
+BLOCK = "block"               # wait up to block_timeout for room, then reject
+OVERFLOW_POLICIES = (DROP_NEWEST, DROP_OLDEST, BLOCK)
+
+
+class WriteBehindQueue:
+    """Bounded in-memory queue flushed in bulk by a background thread"""
+
+    def __init__(self,
+                 flush: Callable[[List[Any]], None],
+                 maxsize: int = 10000,
+                 batch_size: int = 500,
+                 flush_interval: float = 0.05,
+                 overflow: str = DROP_OLDEST,
+                 block_timeout: float = 0.05,
+                 name: str = "write-behind"):
+        """
+        Args:
+            flush: Called from the writer thread with each batch of items
+            maxsize: Queue bound; beyond it the overflow policy applies
+            batch_size: Most items handed to one flush call
+            flush_interval: Longest an item waits before a partial batch flushes
+            overflow: One of OVERFLOW_POLICIES
+            block_timeout: Longest put() waits under the BLOCK policy
+            name: Writer thread name
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}")
+        self._flush = flush
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+
+        self._items: deque = deque()
+        self._cond = threading.Condition()
+        self._closing = False
+        self._in_flight = 0
+
+        # Metrics
+        self.enqueued = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.flush_errors = 0
+        self.flush_count = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+        self._writer = threading.Thread(target=self._run, name=name, daemon=True)
+        self._writer.start()
+
+    def put(self, item: Any) -> bool:
+        """Enqueue an item; returns False if it was dropped"""
+        with self._cond:
+            if self._closing:
+                self.dropped += 1
+                return False
+            if len(self._items) >= self.maxsize and self.overflow == BLOCK:
+                self._cond.wait_for(lambda: len(self._items) < self.maxsize, self.block_timeout)
+            if len(self._items) >= self.maxsize:
+                self.dropped += 1
+                if self.overflow != DROP_OLDEST:
+                    return False
+                self._items.popleft()
+            self._items.append(item)
+            self.enqueued += 1
+            if len(self._items) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closing or len(self._items) >= self.batch_size,
+                                    self.flush_interval)
+                if not self._items:
+                    if self._closing:
+                        return
+                    continue
+                batch = [self._items.popleft()
+                         for _ in range(min(self.batch_size, len(self._items)))]
+                self._in_flight = len(batch)
+                self._cond.notify_all()   # wake producers blocked on a full queue
+
+            started = time.perf_counter()
+            try:
+                self._flush(batch)
+                ok = True
+            except Exception as e:
+                ok = False
+                print(f"{self._writer.name} flush failed: {e}", file=sys.stderr)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            with self._cond:
+                self._in_flight = 0
+                self.flush_count += 1
+                if ok:
+                    self.flushed += len(batch)
+                else:
+                    self.flush_errors += 1
+                    self.dropped += len(batch)
+                self.last_flush_ms = elapsed_ms
+                self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+                self._total_flush_ms += elapsed_ms
+                self._cond.notify_all()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far has been flushed"""
+        with self._cond:
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._items and not self._in_flight, timeout)
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """Flush what is queued and stop the writer; later puts are dropped"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._writer.join(timeout)
+
+    @property
+    def depth(self) -> int:
+        return len(self._items)
+
+    def metrics(self) -> dict:
+        """Queue depth, throughput and flush latency counters"""
+        with self._cond:
+            return {
+                "depth": len(self._items),
+                "maxsize": self.maxsize,
+                "overflow": self.overflow,
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+                "flushed": self.flushed,
+                "flush_errors": self.flush_errors,
+                "flush_count": self.flush_count,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+                "avg_flush_ms": round(self._total_flush_ms / self.flush_count, 3) if self.flush_count else 0.0,
+                "max_flush_ms": round(self.max_flush_ms, 3)
+            }